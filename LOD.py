@@ -1,7 +1,9 @@
 import requests
 import json
 import time
+from decimal import Decimal
 from typing import Optional, List, Dict, Union
+from normalize import parse_price
 
 class SteamGameFetcher:
     def __init__(self, api_key: str):
@@ -171,20 +173,18 @@ class SteamGameFetcher:
         except Exception as e:
             return {"error": str(e)}
 
-    def _extract_price(self, price_str: str) -> Optional[int]:
+    def _extract_price(self, price_str: str) -> Optional[Decimal]:
         """
         価格文字列から数値を抽出します
-        例: "¥1,980" → 1980
+        例: "¥1,980" → Decimal('1980'), "$19.99" → Decimal('19.99')
         """
-        try:
-            if not price_str or price_str == "価格情報なし" or price_str == "無料":
-                return None
-            # 数字のみを抽出（カンマと小数点を除去）
-            num_str = ''.join(filter(str.isdigit, price_str))
-            return int(num_str) if num_str else None
-        except ValueError:
-            print(f"Warning: Could not parse price string: {price_str}")
+        # 無料のゲームは価格条件の対象外とする
+        if price_str == "無料":
             return None
+        price = parse_price(price_str)
+        if price is None and price_str and price_str != "価格情報なし":
+            print(f"Warning: Could not parse price string: {price_str}")
+        return price
 
     def _get_language_code(self, region: str) -> str:
         language_mapping = {
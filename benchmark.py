@@ -0,0 +1,255 @@
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from catalog_generator import generate_games
+
+BASELINE_FILE = 'benchmark_baselines.json'
+DEFAULT_SIZES = (1000, 10000)
+REPEAT = 3
+
+# 基準値に対してこの倍率を超えたら劣化とみなす（時間は揺れが大きいので緩め）
+TIME_TOLERANCE = 1.25
+MEMORY_TOLERANCE = 1.10
+
+
+class Benchmark(NamedTuple):
+    """
+    計測対象の処理
+
+    setup はゲーム一覧と作業ディレクトリから run に渡す値を作る（計測しない）。
+    enriched=True のものは拡充後の形のゲームデータを使う。
+    """
+    name: str
+    setup: Callable
+    run: Callable
+    enriched: bool = False
+
+
+class Result(NamedTuple):
+    seconds: float
+    peak_bytes: int
+
+
+def _reset_caches() -> None:
+    # 正規化関数のキャッシュが前回の実行から残っていると解析の時間が計測に含まれない
+    import normalize
+    for function in (normalize.parse_price, normalize.detect_currency,
+                     normalize.parse_date, normalize.parse_languages):
+        function.cache_clear()
+
+
+def _filter_setup(games, directory):
+    return games
+
+
+def _filter_run(games):
+    from filter import filter_games
+    filter_games(games)
+
+
+def _max_players_setup(games, directory):
+    from format import SteamGamesLODConverter
+    return SteamGamesLODConverter(), [game['description'] for game in games]
+
+
+def _max_players_run(state):
+    converter, descriptions = state
+    for description in descriptions:
+        converter.extract_max_players(description)
+
+
+def _convert_setup(games, directory):
+    return games
+
+
+def _convert_run(games):
+    from format import SteamGamesLODConverter
+    SteamGamesLODConverter().convert_games(games)
+
+
+def _stream_setup(games, directory):
+    return games, os.path.join(directory, 'stream.ttl')
+
+
+def _stream_run(state):
+    from format import SteamGamesLODConverter
+    games, filename = state
+    SteamGamesLODConverter().stream_games(games, filename)
+
+
+def _save_setup(games, directory):
+    from format import SteamGamesLODConverter
+    converter = SteamGamesLODConverter()
+    converter.convert_games(games)
+    return converter, os.path.join(directory, 'graph.ttl')
+
+
+def _save_run(state):
+    converter, filename = state
+    converter.save_to_file(filename)
+
+
+def _json_save_setup(games, directory):
+    return games, os.path.join(directory, 'games.json')
+
+
+def _json_save_run(state):
+    games, filename = state
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(games, f, ensure_ascii=False, indent=2)
+
+
+def _json_load_setup(games, directory):
+    filename = os.path.join(directory, 'games.json')
+    _json_save_run((games, filename))
+    return filename
+
+
+def _json_load_run(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        json.load(f)
+
+
+def _summary_run(games):
+    from normalize import summarize_games
+    summarize_games(games)
+
+
+BENCHMARKS = (
+    Benchmark('filter', _filter_setup, _filter_run),
+    Benchmark('extract_max_players', _max_players_setup, _max_players_run),
+    Benchmark('convert_games', _convert_setup, _convert_run, enriched=True),
+    Benchmark('stream_games', _stream_setup, _stream_run, enriched=True),
+    Benchmark('save_to_file', _save_setup, _save_run, enriched=True),
+    Benchmark('json_save', _json_save_setup, _json_save_run, enriched=True),
+    Benchmark('json_load', _json_load_setup, _json_load_run, enriched=True),
+    Benchmark('summary', _filter_setup, _summary_run),
+)
+
+
+def measure(benchmark: Benchmark, games: List[dict], repeat: int = REPEAT) -> Result:
+    """
+    最速の実行時間と、1回分の実行のピークメモリ（tracemalloc）を計測する
+
+    tracemalloc は実行を遅くするので、時間とメモリは別々の実行で測る。
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        state = benchmark.setup(games, directory)
+        times = []
+        for _ in range(repeat):
+            _reset_caches()
+            gc.collect()
+            start = time.perf_counter()
+            benchmark.run(state)
+            times.append(time.perf_counter() - start)
+
+        _reset_caches()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            benchmark.run(state)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return Result(min(times), peak)
+
+
+def run_benchmarks(sizes: Sequence[int] = DEFAULT_SIZES, names: Optional[Sequence[str]] = None,
+                   repeat: int = REPEAT) -> Dict[str, Result]:
+    """
+    各ゲーム数の合成データで計測し、"名前@ゲーム数" ごとの結果を返す
+    """
+    benchmarks = [b for b in BENCHMARKS if names is None or b.name in names]
+    results = {}
+    for size in sizes:
+        catalogs = {}
+        for benchmark in benchmarks:
+            if benchmark.enriched not in catalogs:
+                catalogs[benchmark.enriched] = generate_games(size, enriched=benchmark.enriched)
+            key = f"{benchmark.name}@{size}"
+            results[key] = measure(benchmark, catalogs[benchmark.enriched], repeat)
+            print(f"  {key}: {results[key].seconds * 1000:.1f}ms, peak {results[key].peak_bytes / 2 ** 20:.1f}MB")
+    return results
+
+
+def machine_key() -> str:
+    """
+    基準値は計測したマシンとPythonの版ごとに分けて保存する
+    """
+    return f"{platform.node()}-{platform.machine()}-{platform.python_implementation()}{platform.python_version()}"
+
+
+def load_baselines(path: str = BASELINE_FILE) -> Dict[str, Dict[str, Dict]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baselines(results: Dict[str, Result], path: str = BASELINE_FILE) -> None:
+    baselines = load_baselines(path)
+    machine = baselines.setdefault(machine_key(), {})
+    for key, result in results.items():
+        machine[key] = result._asdict()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def compare(results: Dict[str, Result], baselines: Dict[str, Dict]) -> List[str]:
+    """
+    基準値より遅くなった・メモリが増えた計測の説明の一覧を返す
+    """
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        time_ratio = result.seconds / baseline['seconds'] if baseline['seconds'] else 1.0
+        memory_ratio = result.peak_bytes / baseline['peak_bytes'] if baseline['peak_bytes'] else 1.0
+        if time_ratio > TIME_TOLERANCE:
+            regressions.append(f"{key}: 時間 {time_ratio:.2f}倍（{baseline['seconds'] * 1000:.1f}ms → {result.seconds * 1000:.1f}ms）")
+        if memory_ratio > MEMORY_TOLERANCE:
+            regressions.append(f"{key}: メモリ {memory_ratio:.2f}倍（{baseline['peak_bytes'] / 2 ** 20:.1f}MB → {result.peak_bytes / 2 ** 20:.1f}MB）")
+    return regressions
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] not in ('check', 'save'):
+        print("Usage: python benchmark.py [check|save] [sizes] [names]")
+        print("       例: python benchmark.py save 1000,10000,100000 filter,convert_games")
+        return
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    sizes = [int(size) for size in sys.argv[2].split(',')] if len(sys.argv) > 2 else DEFAULT_SIZES
+    names = sys.argv[3].split(',') if len(sys.argv) > 3 else None
+    try:
+        results = run_benchmarks(sizes, names)
+        if command == 'save':
+            save_baselines(results)
+            print(f"基準値を {BASELINE_FILE} に保存しました。（{machine_key()}）")
+            return
+
+        baselines = load_baselines().get(machine_key(), {})
+        if not baselines:
+            print("このマシンの基準値がありません。python benchmark.py save で保存してください。")
+            return
+        regressions = compare(results, baselines)
+        for regression in regressions:
+            print(f"劣化: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("基準値からの劣化はありません。")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+        # CIで劣化と同じく失敗として扱われるよう、0以外で終了する
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import json
+import random
+import sys
+import time
+from typing import Dict, Iterator, List
+
+# Steamストア（日本語）で実際に使われるジャンル・カテゴリ・言語名
+GENRES = (
+    'インディー', 'アクション', 'カジュアル', 'アドベンチャー', 'シミュレーション', 'RPG',
+    'ストラテジー', '早期アクセス', '無料プレイ', 'スポーツ', 'レース', 'MMO', '暴力的', '流血',
+)
+CATEGORIES = (
+    'シングルプレイヤー', 'Steam実績', 'Steamクラウド', 'コントローラ一部対応', 'コントローラ完全対応',
+    'Steamトレーディングカード', 'マルチプレイヤー', 'オンラインPvP', 'オンライン協力プレイ',
+    'ローカル協力プレイ', 'ローカルマルチプレイヤー', 'PvP', '協力プレイ', 'Remote Play Together',
+    'Steamリーダーボード', 'アプリ内購入', 'Steamワークショップ', 'ファミリーシェアリング',
+)
+LANGUAGES = (
+    '英語', '日本語', '簡体字中国語', '繁体字中国語', '韓国語', 'ドイツ語', 'フランス語',
+    'スペイン語 - スペイン', 'ロシア語', 'ポルトガル語 - ブラジル', 'イタリア語', 'ポーランド語', 'トルコ語',
+)
+PRICES = (0, 100, 300, 500, 720, 980, 1200, 1480, 1700, 1980, 2300, 2800, 3400, 4980, 7980)
+
+_TITLE_WORDS = (
+    'Dungeon', 'Star', 'Shadow', 'Legend', 'Tiny', 'Neon', 'Rogue', 'Sky', 'Pixel', 'Dream',
+    'ダンジョン', '星', '影', '伝説', '冒険', '魔法', '迷宮', '夢', '騎士', 'ネオン',
+)
+_DESCRIPTION_PLAYERS = (
+    '最大{n}人でオンライン協力プレイ。', 'up to {n} players online.', '{n}人対戦に対応。',
+    'ローカルで1~{n}人まで遊べます。', '{n}-player co-op.',
+)
+
+
+def _pareto(rng: random.Random, alpha: float, cap: int) -> int:
+    return min(int(rng.paretovariate(alpha)), cap)
+
+
+def _choose(rng: random.Random, values: tuple, count: int) -> List[str]:
+    # 先頭ほど選ばれやすい（実際の分布も一部のジャンル・言語に偏っている）
+    chosen = []
+    while len(chosen) < min(count, len(values)):
+        value = values[min(int(rng.expovariate(4 / len(values))), len(values) - 1)]
+        if value not in chosen:
+            chosen.append(value)
+    return chosen
+
+
+def _release_date(rng: random.Random) -> str:
+    year = rng.choice(range(2010, 2025))
+    return f"{year}年{rng.randint(1, 12)}月{rng.randint(1, 28)}日"
+
+
+def _price(rng: random.Random) -> Dict:
+    initial = rng.choice(PRICES)
+    if initial == 0:
+        return {'initial': '無料', 'final': '無料', 'discount_percent': 0}
+    discount = rng.choice((0, 0, 0, 10, 20, 33, 50, 75))
+    final = initial * (100 - discount) // 100
+    return {'initial': f"¥ {initial:,}", 'final': f"¥ {final:,}", 'discount_percent': discount}
+
+
+def _supported_languages(rng: random.Random) -> str:
+    languages = _choose(rng, LANGUAGES, rng.randint(1, 10))
+    voiced = set(languages[:rng.randint(0, 2)])
+    text = ', '.join(f"{lang}<strong>*</strong>" if lang in voiced else lang for lang in languages)
+    return text + ('<br><strong>*</strong>音声対応言語' if voiced else '')
+
+
+def _review(rng: random.Random, timestamp: int) -> Dict:
+    playtime = _pareto(rng, 1.1, 100000) * 30
+    return {
+        'author': {
+            'steamid': str(76561197960265728 + rng.randrange(10 ** 9)),
+            'playtime_forever': playtime + rng.randrange(600),
+            'playtime_at_review': playtime,
+        },
+        'voted_up': rng.random() < 0.8,
+        'votes_up': _pareto(rng, 1.5, 5000) - 1,
+        'votes_funny': _pareto(rng, 2.5, 500) - 1,
+        'weighted_vote_score': round(rng.random(), 6),
+        'comment_count': _pareto(rng, 3.0, 100) - 1,
+        'steam_purchase': rng.random() < 0.9,
+        'received_for_free': rng.random() < 0.05,
+        'written_during_early_access': rng.random() < 0.1,
+        'timestamp_created': timestamp,
+        'timestamp_updated': timestamp + rng.choice((0, 0, 86400 * rng.randint(1, 90))),
+        'review_text': ' '.join(rng.choice(_TITLE_WORDS) for _ in range(_pareto(rng, 1.3, 400))),
+    }
+
+
+def generate_game(rng: random.Random, index: int, developers: int) -> Dict:
+    """
+    SteamGameFetcher.get_game_details() と同じ形のゲームデータを1件作る
+    """
+    # 開発元のゲーム数はべき分布（少数の開発元が多くのゲームを出す）
+    rank = _pareto(rng, 1.1, developers)
+    developer = f"Studio {rank if rank > 2 else rng.randrange(developers)}"
+    publisher = developer if rng.random() < 0.6 else f"Publisher {_pareto(rng, 0.9, developers // 4 + 1)}"
+    title = ' '.join(rng.choice(_TITLE_WORDS) for _ in range(rng.randint(1, 3)))
+    description = f"{title}は{rng.choice(GENRES)}ゲームです。"
+    if rng.random() < 0.3:
+        description += rng.choice(_DESCRIPTION_PLAYERS).format(n=rng.choice((2, 4, 8, 16, 64)))
+
+    appid = 10 * index + 10
+    return {
+        'title': f"{title} {index}",
+        'description': description,
+        'genres': _choose(rng, GENRES, rng.randint(1, 4)),
+        'categories': _choose(rng, CATEGORIES, rng.randint(1, 8)),
+        'developer': [developer],
+        'publisher': [publisher],
+        'release_date': _release_date(rng),
+        'price': _price(rng),
+        'total_reviews': _pareto(rng, 0.7, 500000) - 1,
+        'header_image': f"https://cdn.akamai.steamstatic.com/steam/apps/{appid}/header.jpg",
+        'steam_appid': appid,
+        'supported_languages': _supported_languages(rng),
+        'platforms': {'windows': True, 'mac': rng.random() < 0.3, 'linux': rng.random() < 0.2},
+    }
+
+
+def enrich_game(rng: random.Random, game_data: Dict, reviews: int) -> Dict:
+    """
+    SteamDataEnricher.enrich_game_data() が追加する項目を付け加える
+    """
+    total = game_data['total_reviews']
+    positive = int(total * rng.betavariate(8, 2))
+    game_data['review_stats'] = {
+        'total_reviews': total,
+        'positive_reviews': positive,
+        'negative_reviews': total - positive,
+        'review_score': round(positive / total * 100, 2) if total else 0,
+        'review_score_desc': 'No reviews' if not total else '非常に好評' if positive / total >= 0.8 else 'やや好評',
+        'recent_reviews': {'total': total, 'positive': positive, 'negative': total - positive},
+    }
+    start = 1262304000 + rng.randrange(14 * 365 * 86400)
+    game_data['detailed_reviews'] = [
+        _review(rng, start + rng.randrange(365 * 86400)) for _ in range(min(total, reviews))
+    ]
+    achievements = [
+        {'name': f"ACH_{i}", 'defaultvalue': 0, 'displayName': f"実績 {i}", 'hidden': 0,
+         'icon': f"https://cdn.akamai.steamstatic.com/steamcommunity/public/images/apps/{i}.jpg"}
+        for i in range(_pareto(rng, 1.2, 200) - 1)
+    ]
+    game_data['achievements'] = {'total_achievements': len(achievements), 'achievements_list': achievements}
+    if rng.random() < 0.1:
+        series = rng.choice(_TITLE_WORDS)
+        game_data['series_info'] = {'is_series': True, 'series_name': f"{series} シリーズ",
+                                    'series_url': f"https://store.steampowered.com/franchise/{series}"}
+    else:
+        game_data['series_info'] = {'is_series': False, 'series_name': None, 'series_url': None}
+    game_data['developer_details'] = [
+        {'name': dev, 'total_games': rng.randint(1, 25),
+         'search_url': f"https://store.steampowered.com/search/?developer={dev}"}
+        for dev in game_data['developer']
+    ]
+    game_data['playtime_stats'] = {'current_players': _pareto(rng, 1.0, 100000) - 1}
+    return game_data
+
+
+def iter_games(count: int, seed: int = 0, enriched: bool = False, reviews: int = 20) -> Iterator[Dict]:
+    """
+    実際の収集結果に近い分布の合成ゲームデータを count 件生成する（同じ seed なら同じ内容）
+
+    enriched=True のときは拡充後の形にし、ゲームごとに最大 reviews 件のレビューを付ける。
+    """
+    rng = random.Random(seed)
+    developers = max(count * 3 // 5, 1)
+    for index in range(count):
+        game_data = generate_game(rng, index, developers)
+        yield enrich_game(rng, game_data, reviews) if enriched else game_data
+
+
+def generate_games(count: int, seed: int = 0, enriched: bool = False, reviews: int = 20) -> List[Dict]:
+    return list(iter_games(count, seed, enriched, reviews))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python catalog_generator.py <count> [output.json] [enriched]")
+        return
+
+    count = int(sys.argv[1])
+    output_file = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_games_{count}.json"
+    enriched = len(sys.argv) > 3 and sys.argv[3] == 'enriched'
+    try:
+        start = time.time()
+        games_data = generate_games(count, enriched=enriched)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(games_data, f, ensure_ascii=False, indent=2)
+        print(f"{count}ゲームを {output_file} に書き出しました。（{time.time() - start:.1f}秒）")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
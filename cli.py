@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+
+# サブコマンドと (実行するモジュール, 説明)。
+# モジュールはサブコマンドを実行するときに初めて読み込むので、requests・bs4・rdflib などの
+# 重い依存は、それを使うサブコマンドでしか読み込まれない
+COMMANDS = {
+    'fetch': ('lod5', 'ストアの検索と詳細情報の取得（discover [件数] [出力] で候補の収集だけ）'),
+    'enrich': ('en', 'レビュー・実績などの拡充（refresh [予算] で古くなった項目だけ更新）'),
+    'filter': ('filter', '日本語対応マルチプレイヤーゲームの抽出 [入力] [出力]'),
+    'convert': ('lod_parallel', 'RDFへの並列変換 [入力] [出力.ttl|.nt] [ワーカー数]'),
+    'serve': ('game_api', 'ゲームカタログのREST API [入力] [ポート]'),
+    'stats': (None, 'ジャンル別・価格帯別のゲーム数 <入力>'),
+    'bench': ('benchmark', 'ベンチマーク [check|save] [ゲーム数] [名前]（startup で起動時間の確認）'),
+}
+
+# 起動時間の予算（Python自体の起動を除いた、サブコマンドの読み込みにかかる時間）
+STARTUP_BUDGET_MS = {'filter': 30, 'stats': 30}
+# 予算のあるサブコマンドで読み込まれてはいけないモジュール
+HEAVY_MODULES = ('requests', 'bs4', 'rdflib', 'numpy', 'asyncio')
+STARTUP_RUNS = 5
+
+
+def load(command: str):
+    """
+    サブコマンドのモジュールを読み込む（stats は標準ライブラリと normalize だけで動く）
+    """
+    module_name = COMMANDS[command][0]
+    if module_name is None:
+        import normalize
+        return normalize
+    return __import__(module_name)
+
+
+def stats(args) -> None:
+    import json
+    from normalize import summarize_games
+
+    if not args:
+        print("Usage: python cli.py stats <games.json>")
+        return
+    with open(args[0], 'r', encoding='utf-8') as f:
+        games_data = json.load(f)
+    genres_count, price_ranges = summarize_games(games_data)
+    print(f"{args[0]}: {len(games_data)}ゲーム")
+    print("\nGenre distribution:")
+    for genre, count in sorted(genres_count.items(), key=lambda x: x[1], reverse=True):
+        print(f"{genre}: {count} games")
+    print("\nPrice range distribution:")
+    for price_range, count in price_ranges.items():
+        print(f"¥{price_range}: {count} games")
+
+
+def _run_child(args) -> float:
+    import subprocess
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def check_startup() -> bool:
+    """
+    各サブコマンドの読み込み時間を別プロセスで計測し、予算と重いモジュールの有無を確かめる
+    """
+    import json
+    import subprocess
+
+    interpreter = min(_run_child(['-c', 'pass']) for _ in range(STARTUP_RUNS))
+    print(f"Python起動: {interpreter * 1000:.0f}ms")
+    ok = True
+    for command in COMMANDS:
+        total = min(_run_child([__file__, '--load-only', command]) for _ in range(STARTUP_RUNS))
+        output = subprocess.run([sys.executable, __file__, '--load-only', command],
+                                check=True, capture_output=True, text=True).stdout
+        heavy = json.loads(output)
+        elapsed = max(total - interpreter, 0) * 1000
+        budget = STARTUP_BUDGET_MS.get(command)
+        status = ''
+        if budget is not None:
+            within = elapsed <= budget and not heavy
+            ok = ok and within
+            status = f"（予算 {budget}ms: {'OK' if within else '超過'}）"
+        print(f"  {command}: +{elapsed:.0f}ms{status}" + (f" 読み込み: {', '.join(heavy)}" if heavy else ''))
+    return ok
+
+
+def usage() -> None:
+    print("Usage: python cli.py <command> [args...] [--profile[=report.json]]")
+    for command, (_, description) in COMMANDS.items():
+        print(f"  {command:8s} {description}")
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS and sys.argv[1] != '--load-only':
+        usage()
+        return
+
+    # 起動時間の計測用: モジュールを読み込み、読み込まれた重いモジュールを出力して終わる
+    if sys.argv[1] == '--load-only':
+        import json
+        load(sys.argv[2])
+        print(json.dumps([name for name in HEAVY_MODULES if name in sys.modules]))
+        return
+
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == 'stats':
+        try:
+            stats(args)
+        except Exception as e:
+            print(f"エラーが発生しました: {e}")
+        return
+    if command == 'bench' and args[:1] == ['startup']:
+        if not check_startup():
+            sys.exit(1)
+        return
+
+    # 各スクリプトの main() は sys.argv を読むので、サブコマンド以降の引数を渡す
+    module = load(command)
+    sys.argv = [os.path.basename(module.__file__)] + args
+    module.main()
+
+if __name__ == "__main__":
+    main()
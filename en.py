@@ -1,9 +1,27 @@
 import json
 import requests
+import sys
 import time
 from typing import Dict, List, Optional
 from bs4 import BeautifulSoup
 import os
+import profiling
+from game_record import GameRecord, dump_records
+from refresh_scheduler import RefreshScheduler
+from text_index import TextIndex
+from timeseries import TimeSeriesStore
+
+# 詳細情報の再取得で更新され、変化の判定に使うキー
+DETAIL_KEYS = ('title', 'description', 'genres', 'developer', 'publisher',
+               'release_date', 'platforms', 'categories', 'supported_languages')
+# 詳細情報以外の項目ごとに、変化の判定に使う値のキー
+FIELD_KEYS = {
+    'price': 'price',
+    'reviews': 'review_stats',
+    'achievements': 'achievements',
+    'series': 'series_info',
+    'developer': 'developer_details',
+}
 
 class SteamDataEnricher:
     def __init__(self, api_key: str):
@@ -11,6 +29,10 @@ class SteamDataEnricher:
         self.steam_api_url = "https://api.steampowered.com"
         self.store_api_url = "https://store.steampowered.com/api"
         self.request_delay = 1.0
+        # 価格・レビュー数・同時接続数の履歴を保存するディレクトリ
+        self.history_dir = "history"
+        # タイトル・説明文・レビュー本文の全文検索索引
+        self.text_index_file = "text_index.sqlite"
     def get_review_stats(self, app_id: str) -> Dict:
         """
         レビュー統計を取得
@@ -227,6 +249,116 @@ class SteamDataEnricher:
             print(f"Error fetching developer details for {developer_name}: {e}")
             return {'name': developer_name, 'total_games': 0, 'search_url': url}
 
+    def get_app_details(self, app_id: str, filters: Optional[str] = None) -> Dict:
+        """
+        ストアAPIからアプリの詳細情報を取得（filters で取得する項目を絞り込める）
+        """
+        params = {'appids': app_id, 'cc': 'jp', 'l': 'japanese'}
+        if filters:
+            params['filters'] = filters
+        response = requests.get(f"{self.store_api_url}/appdetails", params=params)
+        time.sleep(self.request_delay)
+        response.raise_for_status()
+        data = response.json().get(str(app_id), {})
+        if not data.get('success'):
+            raise ValueError(f"App details not found for {app_id}")
+        return data.get('data') or {}
+
+    def _format_price(self, details: Dict) -> Dict:
+        price_info = details.get('price_overview', {})
+        return {
+            'initial': price_info.get('initial_formatted', '価格情報なし'),
+            'final': price_info.get('final_formatted', '価格情報なし'),
+            'discount_percent': price_info.get('discount_percent', 0)
+        }
+
+    def refresh_field(self, game_data: Dict, field: str):
+        """
+        ゲームの1項目だけを取得し直してゲームデータを更新し、変化の判定に使う値を返す
+        """
+        app_id = str(game_data['steam_appid'])
+        if field == 'details':
+            details = self.get_app_details(app_id)
+            game_data.update({
+                'title': details.get('name', game_data.get('title', '')),
+                'description': details.get('short_description', ''),
+                'genres': [genre.get('description', '') for genre in details.get('genres', [])],
+                'developer': details.get('developers', []),
+                'publisher': details.get('publishers', []),
+                'release_date': details.get('release_date', {}).get('date', ''),
+                'platforms': details.get('platforms', {}),
+                'categories': [cat.get('description', '') for cat in details.get('categories', [])],
+                'supported_languages': details.get('supported_languages', ''),
+            })
+        elif field == 'price':
+            game_data['price'] = self._format_price(self.get_app_details(app_id, filters='price_overview'))
+        elif field == 'reviews':
+            game_data['review_stats'] = self.get_review_stats(app_id)
+            game_data['detailed_reviews'] = self.get_detailed_review_data(app_id)
+        elif field == 'achievements':
+            game_data['achievements'] = self.get_achievements(app_id)
+        elif field == 'series':
+            game_data['series_info'] = self.get_series_info(app_id)
+        elif field == 'developer':
+            game_data['developer_details'] = [self.get_developer_details(dev) for dev in game_data.get('developer', [])]
+        else:
+            raise ValueError(f"Unknown field: {field}")
+        return self.field_value(game_data, field)
+
+    def field_value(self, game_data: Dict, field: str):
+        """
+        ゲームデータから、変化の判定に使う項目の値を取り出す（まだ取得していなければ None）
+        """
+        if field == 'details':
+            if 'title' not in game_data:
+                return None
+            return {key: game_data.get(key) for key in DETAIL_KEYS}
+        return game_data.get(FIELD_KEYS[field])
+
+    def refresh_stale(self, input_filename: str, output_filename: str, budget: int = 3600,
+                      state_filename: str = "refresh_state.sqlite"):
+        """
+        全件を取り直す代わりに、古くなった項目だけをリクエスト予算の範囲で更新する
+        """
+        games = self.load_json_data(input_filename)
+        if not games:
+            return
+        # appid の無いゲームは再取得できないので対象にしない（register_games も読み飛ばす）
+        games_by_id = {}
+        for game in games:
+            appid = game.get('steam_appid') or game.get('app_id')
+            if appid is not None:
+                games_by_id[int(appid)] = game
+
+        with RefreshScheduler(state_filename) as scheduler:
+            scheduler.register_games(games)
+            tasks = scheduler.plan(budget)
+            print(f"Refreshing {len(tasks)} stale fields within a budget of {budget} requests...")
+
+            for i, task in enumerate(tasks, 1):
+                game = games_by_id[task.appid]
+                try:
+                    value = self.refresh_field(game, task.field)
+                    changed = scheduler.complete(task.appid, task.field, value)
+                    print(f"[{i}/{len(tasks)}] {game.get('title')} {task.field}: {'changed' if changed else 'unchanged'}")
+                except Exception as e:
+                    print(f"Error refreshing {task.field} for {task.appid}: {e}")
+                    scheduler.fail(task.appid, task.field)
+                # 途中で止まっても済んだ分の取得時刻は残す
+                if i % 100 == 0:
+                    scheduler.commit()
+
+        self.save_json_data(games, output_filename)
+        try:
+            TimeSeriesStore(self.history_dir).record_games(games)
+        except Exception as e:
+            print(f"Error appending history: {e}")
+        try:
+            with TextIndex(self.text_index_file) as index:
+                index.index_games(games)
+        except Exception as e:
+            print(f"Error updating text index: {e}")
+
     def get_playtime_stats(self, app_id: str) -> Dict:
         """
         プレイ時間統計を取得
@@ -280,7 +412,8 @@ class SteamDataEnricher:
         
         return game_data
 
-    def process_json_file(self, input_filename: str, output_filename: str):
+    def process_json_file(self, input_filename: str, output_filename: str,
+                          state_filename: str = "refresh_state.sqlite"):
         """
         JSONファイルを処理して拡充データを追加
         """
@@ -290,31 +423,74 @@ class SteamDataEnricher:
         
         print(f"Processing {len(games)} games...")
         enriched_games = []
+        # ゲームごとの取得時刻（refresh で取り直すまでの期限の起点にする）
+        fetched_at = []
         
-        for i, game in enumerate(games, 1):
-            print(f"\nProcessing game {i}/{len(games)}")
-            enriched_game = self.enrich_game_data(game)
-            enriched_games.append(enriched_game)
-            
-            # 100ゲームごとに中間保存
-            if i % 10 == 0:
-                self.save_json_data(enriched_games, f"enriched_games_progress_{i}.json")
+        with profiling.stage('enrichment'):
+            for i, game in enumerate(games, 1):
+                print(f"\nProcessing game {i}/{len(games)}")
+                enriched_game = self.enrich_game_data(game)
+                # 拡充済みのゲームは省メモリな GameRecord にして持ち、元の辞書は手放す
+                enriched_games.append(GameRecord.from_dict(enriched_game))
+                fetched_at.append(time.time())
+                games[i - 1] = None
+                
+                # 100ゲームごとに中間保存
+                if i % 10 == 0:
+                    self.save_json_data(enriched_games, f"enriched_games_progress_{i}.json")
         
-        self.save_json_data(enriched_games, output_filename)
+        with profiling.stage('serialization'):
+            self.save_json_data(enriched_games, output_filename)
         print(f"\nProcessing completed. Enriched data saved to {output_filename}")
 
+        # 今回のクロール結果を時系列ストアに追記（上書きされる値の履歴を残す）
+        try:
+            counts = TimeSeriesStore(self.history_dir).record_games(record.to_dict() for record in enriched_games)
+            print(f"History appended to {self.history_dir}: {counts}")
+        except Exception as e:
+            print(f"Error appending history: {e}")
+
+        # 内容の変わったゲームだけ全文検索索引を入れ替える
+        try:
+            with TextIndex(self.text_index_file) as index:
+                stats = index.index_games(record.to_dict() for record in enriched_games)
+            print(f"Text index updated in {self.text_index_file}: {stats}")
+        except Exception as e:
+            print(f"Error updating text index: {e}")
+
+        # 全件取得した項目を取得済みとして記録し、直後の refresh で取り直さないようにする
+        try:
+            with RefreshScheduler(state_filename) as scheduler:
+                scheduler.register_games(record.to_dict() for record in enriched_games)
+                for record, now in zip(enriched_games, fetched_at):
+                    game = record.to_dict()
+                    appid = game.get('steam_appid') or game.get('app_id')
+                    if appid is None:
+                        continue
+                    for field in scheduler.policies:
+                        value = self.field_value(game, field)
+                        if value is not None:
+                            scheduler.complete(appid, field, value, now=now)
+            print(f"Fetch times recorded in {state_filename}")
+        except Exception as e:
+            print(f"Error recording fetch times: {e}")
+
     def save_json_data(self, data: List[Dict], filename: str):
         """
         JSONデータを保存
         """
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                if data and isinstance(data[0], GameRecord):
+                    dump_records(data, f)
+                else:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
             print(f"Data saved to {filename}")
         except Exception as e:
             print(f"Error saving JSON data: {e}")
 
 def main():
+    profiling.init()
     try:
         with open("config.json", 'r') as f:
             config = json.load(f)
@@ -327,6 +503,12 @@ def main():
     
     input_file = "output.json"
     output_file = "enriched_indie_games_with_reviews.json"
+
+    # python en.py refresh [budget] で古くなった項目だけを更新する
+    if len(sys.argv) > 1 and sys.argv[1] == "refresh":
+        budget = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
+        enricher.refresh_stale(output_file, output_file, budget=budget)
+        return
     
     print(f"Starting data enrichment process...")
     print(f"Reading from: {input_file}")
@@ -1,8 +1,11 @@
 import json
+import sys
+import profiling
+from normalize import parse_languages
 
 def is_japanese_multiplayer_game(game_data):
     # 日本語対応チェック
-    has_japanese = '日本語' in game_data['supported_languages']
+    has_japanese = '日本語' in parse_languages(game_data['supported_languages'])
     
     # マルチプレイヤー対応チェック
     multiplayer_categories = [
@@ -17,13 +20,26 @@ def is_japanese_multiplayer_game(game_data):
     
     return has_japanese and is_multiplayer
 
-# 入力ファイルを読み込み
-with open('indie_games_progress.json', 'r', encoding='utf-8') as f:
-    games = json.load(f)
+def filter_games(games):
+    # 日本語対応マルチプレイヤーゲームをフィルタリング
+    return [game for game in games if is_japanese_multiplayer_game(game)]
 
-# 日本語対応マルチプレイヤーゲームをフィルタリング
-japanese_multiplayer_games = [game for game in games if is_japanese_multiplayer_game(game)]
+def main():
+    profiling.init()
 
-# 結果を新しいJSONファイルに出力
-with open('output.json', 'w', encoding='utf-8') as f:
-    json.dump(japanese_multiplayer_games, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+    input_file = sys.argv[1] if len(sys.argv) > 1 else 'indie_games_progress.json'
+    output_file = sys.argv[2] if len(sys.argv) > 2 else 'output.json'
+
+    # 入力ファイルを読み込み
+    with open(input_file, 'r', encoding='utf-8') as f:
+        games = json.load(f)
+
+    with profiling.stage('filtering'):
+        japanese_multiplayer_games = filter_games(games)
+
+    # 結果を新しいJSONファイルに出力
+    with profiling.stage('serialization'), open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(japanese_multiplayer_games, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
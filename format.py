@@ -1,43 +1,78 @@
 
 import json
-from datetime import datetime
-from rdflib import Graph, Literal, Namespace, URIRef
-from rdflib.namespace import RDF, RDFS, XSD
+import os
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+import lod_writer
+import profiling
+from normalize import normalize_game, parse_date, parse_price
+from review_analytics import ReviewStatistics, ReviewSummary, analyze_games, summarize_reviews
+from similarity import DEFAULT_INDEX_FILE, SimilarityIndex
+from lod_writer import EX, SCHEMA, XSD, RDF_TYPE, LODStreamWriter, ResourceDictionary, Triple, literal, uri
 
 class SteamGamesLODConverter:
-    def __init__(self):
-        self.g = Graph()
-        self.ex = Namespace("https://example.com/games/")
-        self.schema = Namespace("http://schema.org/")
-        
-        self.g.bind("rdf", RDF)
-        self.g.bind("rdfs", RDFS)
-        self.g.bind("schema", self.schema)
-        self.g.bind("ex", self.ex)
+    def __init__(self, store_path: str = None, similarity_path: str = None):
+        self.store_path = store_path
+        self._graph = None
+        # ジャンル・言語・開発元などを共有リソースとして扱うためのインターン辞書
+        self.resources = ResourceDictionary()
+        # まとめて計算したレビュー統計（無い場合はゲームごとに計算する）
+        self.review_statistics: Optional[ReviewStatistics] = None
+        # 類似ゲームの索引（similarity.py で構築したもの。あれば schema:isSimilarTo を出力する）
+        self.similarity: Optional[SimilarityIndex] = None
+        if similarity_path:
+            self.similarity = SimilarityIndex.load(similarity_path)
+
+    @property
+    def g(self):
+        """
+        変換先のrdflibグラフ（stream_games だけを使うときはrdflibを読み込まない）
+        """
+        if self._graph is None:
+            from rdflib import Graph, Namespace
+            from rdflib.namespace import RDF, RDFS
+            if self.store_path:
+                # 永続トリプルストア（lod_store）に直接書き込む
+                from lod_store import open_game_graph
+                self._graph = open_game_graph(self.store_path)
+            else:
+                self._graph = Graph()
+            self.ex = Namespace(EX)
+            self.schema = Namespace(SCHEMA)
+
+            self._graph.bind("rdf", RDF)
+            self._graph.bind("rdfs", RDFS)
+            self._graph.bind("schema", self.schema, override=True, replace=True)
+            self._graph.bind("ex", self.ex)
 
-        self.define_classes()
+            self.define_classes()
+        return self._graph
 
     def define_classes(self):
-        multiplayer_game = self.ex.MultiplayerGame
-        japanese_multiplayer_game = self.ex.JapaneseMultiplayerGame
+        from rdflib.util import from_n3
+        for s, p, o in self.iter_class_triples():
+            self.g.add((from_n3(s), from_n3(p), from_n3(o)))
 
-        self.g.add((multiplayer_game, RDF.type, RDFS.Class))
-        self.g.add((multiplayer_game, RDFS.subClassOf, self.schema.VideoGame))
-        self.g.add((japanese_multiplayer_game, RDF.type, RDFS.Class))
-        self.g.add((japanese_multiplayer_game, RDFS.subClassOf, multiplayer_game))
+    def iter_class_triples(self) -> Iterator[Triple]:
+        """
+        クラス階層の定義トリプルを生成する
+        """
+        multiplayer_game = uri(EX + 'MultiplayerGame')
+        japanese_multiplayer_game = uri(EX + 'JapaneseMultiplayerGame')
+
+        yield (multiplayer_game, RDF_TYPE, uri(lod_writer.RDFS + 'Class'))
+        yield (multiplayer_game, uri(lod_writer.RDFS + 'subClassOf'), uri(SCHEMA + 'VideoGame'))
+        yield (japanese_multiplayer_game, RDF_TYPE, uri(lod_writer.RDFS + 'Class'))
+        yield (japanese_multiplayer_game, uri(lod_writer.RDFS + 'subClassOf'), multiplayer_game)
+        yield (uri(EX + 'Genre'), RDF_TYPE, uri(lod_writer.RDFS + 'Class'))
+        yield (uri(EX + 'MultiplayerMode'), RDF_TYPE, uri(lod_writer.RDFS + 'Class'))
 
     def parse_date(self, date_str: str) -> str:
-        try:
-            date = datetime.strptime(date_str, '%Y年%m月%d日')
-            return date.strftime('%Y-%m-%d')
-        except:
-            return date_str
-
-    def convert_price(self, price_str: str) -> str:
-        try:
-            return price_str.replace('¥', '').replace(',', '').strip()
-        except:
-            return "0"
+        return parse_date(date_str) or date_str
+
+    def convert_price(self, price_str: str) -> Optional[str]:
+        price = parse_price(price_str)
+        return None if price is None else str(price)
 
     def extract_max_players(self, description: str) -> int:
         """
@@ -77,51 +112,74 @@ class SteamGamesLODConverter:
         """
         if not reviews:
             return None
-            
-        total_time = sum(review['author'].get('playtime_at_review', 0) for review in reviews)
-        return round(total_time / len(reviews), 1) if len(reviews) > 0 else None
+        return summarize_reviews(reviews).average_playtime
+
+    def prepare_reviews(self, games_data: Sequence[dict]) -> None:
+        """
+        ゲーム一覧のレビュー統計をまとめて計算しておく
+        """
+        self.review_statistics = analyze_games(games_data)
+
+    def review_summary(self, game_data: dict) -> Optional[ReviewSummary]:
+        if not game_data.get('detailed_reviews'):
+            return None
+        statistics = self.review_statistics
+        if statistics is not None and game_data['steam_appid'] in statistics:
+            return statistics.summary(game_data['steam_appid'])
+        return summarize_reviews(game_data['detailed_reviews'])
+
+    def iter_game_triples(self, game_data: dict) -> Iterator[Triple]:
+        """
+        1ゲーム分のトリプルをN-Triples形式の項として生成する
+        """
+        game_uri = uri(EX + str(game_data['steam_appid']))
+        fields = normalize_game(game_data)
+
+        yield (game_uri, RDF_TYPE, uri(EX + 'JapaneseMultiplayerGame'))
+        yield (game_uri, uri(SCHEMA + 'name'), literal(game_data['title']))
 
-    def convert_game(self, game_data: dict) -> None:
-        game_uri = self.ex[game_data['steam_appid']]
-        
-        self.g.add((game_uri, RDF.type, self.ex.JapaneseMultiplayerGame))
-        self.g.add((game_uri, self.schema.name, Literal(game_data['title'])))
-        
         # Steam URLをsameAsとして追加
         steam_url = f"https://store.steampowered.com/app/{game_data['steam_appid']}"
-        self.g.add((game_uri, self.schema.sameAs, URIRef(steam_url)))
-        
+        yield (game_uri, uri(SCHEMA + 'sameAs'), uri(steam_url))
+
         # 説明文からプレイヤー数を抽出
         if 'description' in game_data:
             max_players = self.extract_max_players(game_data['description'])
             if max_players:
-                self.g.add((game_uri, self.schema.maxPlayers, Literal(str(max_players), datatype=XSD.integer)))
-        
-        # レビューから平均プレイ時間を計算
-        if 'detailed_reviews' in game_data:
-            avg_playtime = self.calculate_avg_playtime(game_data['detailed_reviews'])
-            if avg_playtime:
-                self.g.add((game_uri, self.ex.averagePlaytime, Literal(str(avg_playtime), datatype=XSD.decimal)))
-        
+                yield (game_uri, uri(SCHEMA + 'maxPlayers'), literal(max_players, datatype=XSD + 'integer'))
+
+        # レビューからプレイ時間と高評価率の統計を計算
+        reviews = self.review_summary(game_data)
+        if reviews is not None:
+            decimal = XSD + 'decimal'
+            if reviews.average_playtime:
+                yield (game_uri, uri(EX + 'averagePlaytime'), literal(reviews.average_playtime, datatype=decimal))
+            if 50 in reviews.playtime_percentiles:
+                yield (game_uri, uri(EX + 'medianPlaytime'), literal(reviews.playtime_percentiles[50], datatype=decimal))
+            if reviews.positive_ratio is not None:
+                yield (game_uri, uri(EX + 'positiveReviewRatio'), literal(reviews.positive_ratio, datatype=decimal))
+            recent = reviews.windowed_positive_ratio.get(30)
+            if recent is not None:
+                yield (game_uri, uri(EX + 'recentPositiveReviewRatio'), literal(recent, datatype=decimal))
+
         if 'developer' in game_data:
             for dev in game_data['developer']:
-                self.g.add((game_uri, self.schema.creator, Literal(dev)))
+                yield (game_uri, uri(SCHEMA + 'creator'), self.resources.intern('organization', dev))
 
             if 'publisher' in game_data:
                 for pub in game_data['publisher']:
-                    self.g.add((game_uri, self.schema.publisher, Literal(pub)))
+                    yield (game_uri, uri(SCHEMA + 'publisher'), self.resources.intern('organization', pub))
 
             if 'release_date' in game_data:
-                release_date = self.parse_date(game_data['release_date'])
-                self.g.add((game_uri, self.schema.datePublished, Literal(release_date)))
+                release_date = fields.release_date or game_data['release_date']
+                yield (game_uri, uri(SCHEMA + 'datePublished'), literal(release_date))
 
-            if 'price' in game_data and 'final' in game_data['price']:
-                price = self.convert_price(game_data['price']['final'])
-                self.g.add((game_uri, self.schema.price, Literal(price)))
+            if fields.price is not None:
+                yield (game_uri, uri(SCHEMA + 'price'), literal(fields.price))
 
             if 'genres' in game_data:
                 for genre in game_data['genres']:
-                    self.g.add((game_uri, self.schema.genre, Literal(genre)))
+                    yield (game_uri, uri(SCHEMA + 'genre'), self.resources.intern('genre', genre))
 
             if 'categories' in game_data:
                 multiplayer_modes = [
@@ -129,60 +187,95 @@ class SteamGamesLODConverter:
                     if any(term in cat for term in ['PvP', 'マルチプレイヤー', '協力'])
                 ]
                 for mode in multiplayer_modes:
-                    self.g.add((game_uri, self.ex.multiplayerModes, Literal(mode)))
+                    yield (game_uri, uri(EX + 'multiplayerModes'), self.resources.intern('multiplayerMode', mode))
 
             if 'platforms' in game_data:
                 platforms = [name for name, supported in game_data['platforms'].items() if supported]
                 for platform in platforms:
-                    self.g.add((game_uri, self.schema.operatingSystem, Literal(platform.capitalize())))
+                    yield (game_uri, uri(SCHEMA + 'operatingSystem'), literal(platform.capitalize()))
 
             if 'review_stats' in game_data:
                 stats = game_data['review_stats']
                 if 'total_reviews' in stats:
-                    self.g.add((game_uri, self.schema.reviewCount, Literal(str(stats['total_reviews']))))
+                    yield (game_uri, uri(SCHEMA + 'reviewCount'), literal(stats['total_reviews']))
                 if 'review_score_desc' in stats:
-                    self.g.add((game_uri, self.schema.aggregateRating, Literal(stats['review_score_desc'])))
-
-            if 'supported_languages' in game_data:
-                langs = game_data['supported_languages'].split(', ')
-                langs = [lang.split('<')[0] for lang in langs]
-                for lang in langs:
-                    if lang.strip():
-                        self.g.add((game_uri, self.schema.inLanguage, Literal(lang.strip())))
+                    yield (game_uri, uri(SCHEMA + 'aggregateRating'), literal(stats['review_score_desc']))
+
+            for lang in fields.languages:
+                yield (game_uri, uri(SCHEMA + 'inLanguage'), self.resources.intern('language', lang))
+
+        series_info = game_data.get('series_info') or {}
+        if series_info.get('is_series') and series_info.get('series_name'):
+            yield (game_uri, uri(SCHEMA + 'isPartOf'), self.resources.intern('series', series_info['series_name']))
+
+        if self.similarity is not None:
+            for other, _ in self.similarity.similar(game_data['steam_appid']):
+                yield (game_uri, uri(SCHEMA + 'isSimilarTo'), uri(EX + str(other)))
+
+    def convert_game(self, game_data: dict) -> None:
+        from rdflib.util import from_n3
+        known = len(self.resources)
+        for s, p, o in self.iter_game_triples(game_data):
+            self.g.add((from_n3(s), from_n3(p), from_n3(o)))
+
+        # このゲームで初めて使われたリソースの定義を追加
+        new_keys = list(self.resources.resources)[known:]
+        for s, p, o in self.resources.iter_triples(new_keys):
+            self.g.add((from_n3(s), from_n3(p), from_n3(o)))
                         
     def convert_games(self, games_data: list) -> None:
-        for game_data in games_data:
-            self.convert_game(game_data)
+        with profiling.stage('conversion'):
+            self.prepare_reviews(games_data)
+            for game_data in games_data:
+                self.convert_game(game_data)
+
+    def stream_games(self, games_data: Iterable[dict], filename: str, format: str = 'turtle') -> int:
+        """
+        グラフを経由せず、変換したゲームを1件ずつファイルへ書き出す
+        """
+        self.resources.clear()
+        # リストならレビュー統計をまとめて計算する（逐次入力ではゲームごとに計算）
+        self.review_statistics = analyze_games(games_data) if isinstance(games_data, list) else None
+        with profiling.stage('conversion'), LODStreamWriter(filename, format=format) as writer:
+            writer.write_triples(self.iter_class_triples())
+            for game_data in games_data:
+                writer.write_triples(self.iter_game_triples(game_data))
+            # 共有リソースの定義は最後に一度だけ書き出す
+            writer.write_triples(self.resources.iter_triples())
+            return writer.triple_count
     
     def save_to_file(self, filename: str, format: str = 'turtle') -> None:
-        # 一時ファイルに書き出し
-        temp_filename = 'temp_' + filename
-        self.g.serialize(destination=temp_filename, format=format)
-        
-        # ファイルを読み込んで置換
-        with open(temp_filename, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # schema1 を schema に置換
-        content = content.replace('schema1:', 'schema:')
-        content = content.replace('@prefix schema1:', '@prefix schema:')
-        
-        # 最終ファイルに書き出し
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        # 一時ファイルを削除
-        import os
-        os.remove(temp_filename)
+        """
+        グラフの内容を正しい接頭辞で直接ファイルに書き出す
+        """
+        if format not in ('turtle', 'nt'):
+            with profiling.stage('serialization'):
+                self.g.serialize(destination=filename, format=format)
+            return
+
+        with profiling.stage('serialization'), LODStreamWriter(filename, format=format) as writer:
+            for subject in sorted(set(self.g.subjects())):
+                pairs = [
+                    (self._to_n3(p), self._to_n3(o))
+                    for p, o in self.g.predicate_objects(subject)
+                ]
+                writer.write_subject(self._to_n3(subject), pairs)
+
+    def _to_n3(self, term) -> str:
+        from rdflib import Literal
+        if isinstance(term, Literal):
+            return literal(str(term), datatype=term.datatype, lang=term.language)
+        return uri(str(term))
 
 if __name__ == "__main__":
+    profiling.init()
     try:
         with open('enriched_games_progress_10.json', 'r', encoding='utf-8') as f:
             games_data = json.load(f)
 
-        converter = SteamGamesLODConverter()
-        converter.convert_games(games_data)
-        converter.save_to_file('steam_games.ttl')
+        similarity_path = DEFAULT_INDEX_FILE if os.path.exists(DEFAULT_INDEX_FILE) else None
+        converter = SteamGamesLODConverter(similarity_path=similarity_path)
+        converter.stream_games(games_data, 'steam_games.ttl')
         
         print("変換が完了しました。")
     except Exception as e:
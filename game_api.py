@@ -0,0 +1,382 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from normalize import normalize_games
+from side_store import REFERENCE_KEY, SideStore, achievements, detailed_reviews, open_store
+from text_index import DEFAULT_INDEX_FILE, TextIndex
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+GZIP_MIN_SIZE = 1024
+# 読み捨てるリクエスト本文の上限（これより大きければ応答後に接続を閉じる）
+MAX_REQUEST_BODY = 64 * 1024
+
+STATUS_TEXT = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+}
+
+
+class GameCatalog:
+    """
+    JSONファイルから読み込んだゲーム一覧と検索用の索引
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.version = None
+        self.games: Dict[int, dict] = {}
+        self.appids: List[int] = []
+        self.prices: Dict[int, Optional[Decimal]] = {}
+        self.index: Dict[str, Dict[str, List[int]]] = {}
+        # レビュー本文・実績一覧の外部ストア（参照されたときに開く）
+        self.stores: Dict[str, SideStore] = {}
+        self.load()
+
+    def stat(self) -> Tuple[int, int]:
+        st = os.stat(self.filename)
+        return st.st_mtime_ns, st.st_size
+
+    def load(self) -> None:
+        with open(self.filename, 'r', encoding='utf-8') as f:
+            games = json.load(f)
+
+        self.version = self.stat()
+        self.games = {}
+        self.prices = {}
+        self.close_stores()
+        index = {'genre': {}, 'category': {}, 'language': {}}
+        for game in games:
+            # appid の無いゲームは引けないので載せない
+            appid = game.get('steam_appid') or game.get('app_id')
+            if appid is None:
+                continue
+            self.games[int(appid)] = game
+        self.appids = sorted(self.games)
+
+        fields = normalize_games(self.games[appid] for appid in self.appids)
+        for appid, game_fields in zip(self.appids, fields):
+            game = self.games[appid]
+            self.prices[appid] = game_fields.price
+            for genre in game.get('genres', []):
+                index['genre'].setdefault(genre.lower(), []).append(appid)
+            for category in game.get('categories', []):
+                index['category'].setdefault(category.lower(), []).append(appid)
+            for lang in game_fields.languages:
+                index['language'].setdefault(lang.lower(), []).append(appid)
+        # 索引の各リストはappid昇順（キーセットページングに使う）
+        self.index = index
+
+    def store(self, game: dict) -> Optional[SideStore]:
+        reference = game.get(REFERENCE_KEY)
+        if not reference:
+            return None
+        store = self.stores.get(reference['path'])
+        if store is None:
+            try:
+                store = self.stores[reference['path']] = open_store(self.filename, game)
+            except OSError:
+                return None
+        return store
+
+    def close_stores(self) -> None:
+        for store in self.stores.values():
+            store.close()
+        self.stores = {}
+
+    def reload_if_changed(self) -> bool:
+        try:
+            if self.stat() != self.version:
+                self.load()
+                return True
+        except (OSError, ValueError):
+            pass
+        return False
+
+    def search(self, filters: Dict[str, str], min_price: Optional[int], max_price: Optional[int],
+               after: int, limit: int) -> Tuple[List[int], Optional[int]]:
+        """
+        条件に合うゲームをappid順に after より後ろから最大 limit 件返す
+        """
+        candidates = self.appids
+        others = []
+        for field, value in filters.items():
+            postings = self.index[field].get(value.lower(), [])
+            if len(postings) < len(candidates):
+                if candidates is not self.appids:
+                    others.append(set(candidates))
+                candidates = postings
+            else:
+                others.append(set(postings))
+
+        results = []
+        start = bisect_right(candidates, after)
+        for appid in candidates[start:]:
+            if any(appid not in other for other in others):
+                continue
+            if min_price is not None or max_price is not None:
+                price = self.prices.get(appid)
+                if price is None:
+                    continue
+                if min_price is not None and price < min_price:
+                    continue
+                if max_price is not None and price > max_price:
+                    continue
+            results.append(appid)
+            if len(results) > limit:
+                break
+
+        next_cursor = results[limit - 1] if len(results) > limit else None
+        return results[:limit], next_cursor
+
+
+def game_summary(game: dict) -> dict:
+    """
+    一覧用に大きなレビュー本文や実績一覧を除いたゲーム情報
+    """
+    return {
+        key: value for key, value in game.items()
+        if key not in ('detailed_reviews', 'achievements', 'developer_details', 'detailed_description')
+    }
+
+
+class GameAPI:
+    """
+    ゲームカタログを配信する非同期HTTPサービス
+
+    GET /games                      検索（genre, category, language, min_price, max_price, after, limit）
+    GET /games/{appid}              ゲーム詳細
+    GET /games/{appid}/reviews      レビュー統計と詳細レビュー
+    GET /games/{appid}/achievements 実績
+    GET /search                     全文検索（q, fields, offset, limit。text_index がある場合）
+    """
+
+    def __init__(self, catalog: GameCatalog, cache_size: int = 4096, reload_interval: float = 1.0,
+                 text_index: Optional[TextIndex] = None):
+        self.catalog = catalog
+        self.text_index = text_index
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self._cache: OrderedDict = OrderedDict()
+        self._checked_at = 0.0
+
+    def _check_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            if self.catalog.reload_if_changed():
+                self._cache.clear()
+
+    def route(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, object]:
+        parts = [unquote(p) for p in path.strip('/').split('/') if p]
+        if parts == ['search'] and self.text_index is not None:
+            return self._text_search(query)
+        if not parts or parts[0] != 'games' or len(parts) > 3:
+            return 404, {'error': 'Not Found'}
+
+        if len(parts) == 1:
+            return self._search(query)
+
+        try:
+            appid = int(parts[1])
+        except ValueError:
+            return 400, {'error': 'Invalid appid'}
+        game = self.catalog.games.get(appid)
+        if game is None:
+            return 404, {'error': 'Game not found'}
+
+        if len(parts) == 2:
+            return 200, game_summary(game)
+        if parts[2] == 'reviews':
+            return 200, {
+                'steam_appid': appid,
+                'review_stats': game.get('review_stats', {}),
+                'detailed_reviews': detailed_reviews(game, self.catalog.store(game)),
+            }
+        if parts[2] == 'achievements':
+            return 200, {'steam_appid': appid, 'achievements': achievements(game, self.catalog.store(game))}
+        return 404, {'error': 'Not Found'}
+
+    def _search(self, query: Dict[str, List[str]]) -> Tuple[int, object]:
+        try:
+            limit = min(int(query.get('limit', [DEFAULT_LIMIT])[0]), MAX_LIMIT)
+            after = int(query.get('after', [0])[0])
+            min_price = int(query['min_price'][0]) if 'min_price' in query else None
+            max_price = int(query['max_price'][0]) if 'max_price' in query else None
+        except ValueError:
+            return 400, {'error': 'Invalid numeric parameter'}
+        if limit <= 0:
+            return 400, {'error': 'limit must be positive'}
+
+        filters = {field: query[field][0] for field in ('genre', 'category', 'language') if field in query}
+        appids, next_cursor = self.catalog.search(filters, min_price, max_price, after, limit)
+        return 200, {
+            'games': [game_summary(self.catalog.games[appid]) for appid in appids],
+            'next': next_cursor,
+        }
+
+    def _text_search(self, query: Dict[str, List[str]]) -> Tuple[int, object]:
+        try:
+            limit = min(int(query.get('limit', [DEFAULT_LIMIT])[0]), MAX_LIMIT)
+            offset = int(query.get('offset', [0])[0])
+        except ValueError:
+            return 400, {'error': 'Invalid numeric parameter'}
+        if limit <= 0 or offset < 0:
+            return 400, {'error': 'limit must be positive'}
+
+        fields = query['fields'][0].split(',') if 'fields' in query else None
+        try:
+            results = self.text_index.search(query.get('q', [''])[0], limit + 1, offset, fields)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+
+        games = [
+            dict(game_summary(self.catalog.games[appid]), score=round(score, 4))
+            for appid, score in results[:limit] if appid in self.catalog.games
+        ]
+        return 200, {'games': games, 'next': offset + limit if len(results) > limit else None}
+
+    def respond(self, target: str) -> Tuple[int, bytes, str, Optional[bytes]]:
+        """
+        リクエストに対する (ステータス, 本文, ETag, gzip本文) を返す（キャッシュ利用）
+        """
+        self._check_reload()
+        url = urlparse(target)
+        query = parse_qs(url.query)
+        key = (url.path, tuple(sorted((k, tuple(v)) for k, v in query.items())))
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        status, payload = self.route(url.path, query)
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        compressed = gzip.compress(body, compresslevel=5) if len(body) >= GZIP_MIN_SIZE else None
+        entry = (status, body, etag, compressed)
+
+        if status == 200:
+            self._cache[key] = entry
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                # 本文は使わないが、読み捨てないと次のリクエスト行として解釈されてしまう。
+                # 長さの分からない本文や大きすぎる本文は読まずに、応答後に接続を閉じる
+                length = headers.get('content-length', '0')
+                if 'transfer-encoding' in headers or not length.isdigit() or int(length) > MAX_REQUEST_BODY:
+                    keep_alive = False
+                elif int(length):
+                    await reader.readexactly(int(length))
+                writer.write(self._build_response(method, target, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _build_response(self, method: str, target: str, headers: Dict[str, str], keep_alive: bool) -> bytes:
+        if method not in ('GET', 'HEAD'):
+            status, body, etag, compressed = 405, b'{"error":"Method Not Allowed"}', None, None
+        else:
+            try:
+                status, body, etag, compressed = self.respond(target)
+            except Exception as e:
+                # 1つのリクエストの失敗で接続を切らず、500を返して処理を続ける
+                print(f"エラーが発生しました: {e}")
+                status, body, etag, compressed = 500, b'{"error":"Internal Server Error"}', None, None
+
+        extra = []
+        if status == 405:
+            extra.append("Allow: GET, HEAD")
+        use_gzip = compressed is not None and 'gzip' in headers.get('accept-encoding', '')
+        if etag:
+            # gzip本文はバイト列が違うので、強いETagも別のものにする
+            gzip_etag = etag[:-1] + '-gzip"'
+            extra.append(f"ETag: {gzip_etag if use_gzip else etag}")
+            if_none_match = headers.get('if-none-match', '')
+            tags = {tag.strip() for tag in if_none_match.split(',')}
+            # どちらの表現のETagでも、内容が同じなら304を返す
+            if status == 200 and (etag in tags or gzip_etag in tags or if_none_match == '*'):
+                status, body, use_gzip = 304, b'', False
+
+        if use_gzip:
+            body = compressed
+            extra.append("Content-Encoding: gzip")
+        if etag:
+            extra.append("Vary: Accept-Encoding")
+
+        lines = [
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ] + extra
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        return head if method == 'HEAD' or status == 304 else head + body
+
+
+async def serve(filename: str, host: str = '127.0.0.1', port: int = 8080,
+                text_index_path: Optional[str] = None) -> asyncio.AbstractServer:
+    text_index = TextIndex(text_index_path) if text_index_path else None
+    api = GameAPI(GameCatalog(filename), text_index=text_index)
+    return await asyncio.start_server(api.handle, host, port)
+
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'indie_games_final.json'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
+
+    async def run():
+        text_index_path = DEFAULT_INDEX_FILE if os.path.exists(DEFAULT_INDEX_FILE) else None
+        server = await serve(filename, port=port, text_index_path=text_index_path)
+        print(f"Game API: http://127.0.0.1:{port}/games （{filename}）")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
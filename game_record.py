@@ -0,0 +1,427 @@
+import json
+import sys
+from array import array
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, TextIO
+
+from normalize import normalize_game
+
+# 凍結した値の種類（タプルの先頭に置く）
+_DICT = 'd'
+_LIST = 'l'
+
+# 列の格納形式（同じ形式の列は1つの配列に続けて詰める）
+_BOOL, _INT, _FLOAT, _DIGITS, _OBJECT = range(5)
+_TYPECODES = ('b', 'q', 'd', 'Q', None)
+
+# これ以下の長さの文字列はインターンする（レビュー本文など長いものは共有されないので除く）
+INTERN_MAX_LENGTH = 64
+
+# 取りうる値の種類が少なく、ゲーム間で同じ値をそのまま共有できる項目
+SHARED_FIELDS = ('price', 'platforms', 'series_info')
+
+REVIEW_STATS_KEYS = ('total_reviews', 'positive_reviews', 'negative_reviews', 'review_score',
+                     'review_score_desc', 'recent_reviews')
+RECENT_REVIEWS_KEYS = ('total', 'positive', 'negative')
+
+_shared: Dict[tuple, tuple] = {}
+
+
+def _intern(value):
+    if type(value) is str and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def intern_strings(values) -> Optional[tuple]:
+    """
+    文字列のリストをインターンしたタプルにする（同じ組み合わせのタプルは共有する）
+
+    文字列以外が含まれていれば None を返す。
+    """
+    if type(values) is not list or any(type(value) is not str for value in values):
+        return None
+    return _share(tuple(sys.intern(value) for value in values))
+
+
+def freeze(value, share: bool = False):
+    """
+    JSONの値を、インターンした文字列とタプルだけの不変な形にする（thaw() で元に戻す）
+    """
+    if type(value) is dict:
+        frozen = (_DICT, tuple(sys.intern(key) for key in value), tuple(freeze(v) for v in value.values()))
+    elif type(value) is list:
+        frozen = (_LIST, tuple(freeze(v) for v in value))
+    else:
+        return _intern(value)
+    return _share(frozen) if share else frozen
+
+
+def _share(value: tuple) -> tuple:
+    try:
+        return _shared.setdefault(value, value)
+    except TypeError:
+        return value
+
+
+def thaw(value):
+    if type(value) is not tuple:
+        return value
+    if value[0] == _DICT:
+        return dict(zip(value[1], map(thaw, value[2])))
+    return [thaw(v) for v in value[1]]
+
+
+def _column_kind(values: list) -> int:
+    kinds = {type(value) for value in values}
+    if kinds == {bool}:
+        return _BOOL
+    if kinds == {int} and all(-2 ** 63 <= value < 2 ** 63 for value in values):
+        return _INT
+    if kinds == {float}:
+        return _FLOAT
+    # steamid のような数字だけの文字列
+    if kinds == {str} and all(value.isdecimal() and value == str(int(value)) and int(value) < 2 ** 64 for value in values):
+        return _DIGITS
+    return _OBJECT
+
+
+class Columns:
+    """
+    同じ形の辞書（1段までの入れ子を含む）のリストを、項目ごとの列で持つ
+
+    レビューや実績のように同じキーを持つ辞書が並ぶリストは、辞書ごとのハッシュ表と
+    数値オブジェクトが大半のメモリを占める。真偽値・整数・小数・数字だけの文字列の
+    列は形式ごとに1つの array に続けて詰め、それ以外の値の列は1つのタプルに詰める。
+    列の並び（キーと形式）はゲーム間で共有する。
+    """
+    __slots__ = ('layout', 'blocks', 'length')
+
+    def __init__(self, layout: tuple, blocks: tuple, length: int):
+        self.layout = layout
+        self.blocks = blocks
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    @classmethod
+    def from_records(cls, records) -> Optional['Columns']:
+        """
+        すべての辞書が同じキー（入れ子の辞書も同じキー）を持つときだけ列形式にする
+
+        空の辞書は列に分けられない（分けると列が無くなり、戻すとキーごと消える）ので、
+        値のまま1つの列に持つ。
+        """
+        if type(records) is not list or not records or type(records[0]) is not dict:
+            return None
+        first = records[0]
+        keys = tuple(first)
+        nested = {key: tuple(value) for key, value in first.items() if type(value) is dict and value}
+        paths = []
+        for key in keys:
+            if key in nested:
+                paths.extend((key, subkey) for subkey in nested[key])
+            else:
+                paths.append((key, None))
+
+        for record in records:
+            if type(record) is not dict or tuple(record) != keys:
+                return None
+            for key in nested:
+                value = record[key]
+                if type(value) is not dict or tuple(value) != nested[key]:
+                    return None
+
+        layout = []
+        blocks = [[] for _ in _TYPECODES]
+        for key, subkey in paths:
+            values = [record[key] if subkey is None else record[key][subkey] for record in records]
+            kind = _column_kind(values)
+            if kind == _DIGITS:
+                values = [int(value) for value in values]
+            elif kind == _OBJECT:
+                values = [_intern(value) for value in values]
+            blocks[kind].extend(values)
+            layout.append((sys.intern(key), None if subkey is None else sys.intern(subkey), kind))
+
+        packed = tuple(
+            None if not block else tuple(block) if typecode is None else array(typecode, block)
+            for typecode, block in zip(_TYPECODES, blocks)
+        )
+        return cls(_share(tuple(layout)), packed, len(records))
+
+    def to_records(self) -> List[dict]:
+        n = self.length
+        offsets = [0] * len(_TYPECODES)
+        columns = []
+        for _, _, kind in self.layout:
+            values = self.blocks[kind][offsets[kind]:offsets[kind] + n]
+            offsets[kind] += n
+            if kind == _BOOL:
+                values = [bool(value) for value in values]
+            elif kind == _DIGITS:
+                values = [str(value) for value in values]
+            columns.append(values)
+
+        records = []
+        for row in range(n):
+            record = {}
+            for (key, subkey, _), column in zip(self.layout, columns):
+                if subkey is None:
+                    record[key] = column[row]
+                else:
+                    record.setdefault(key, {})[subkey] = column[row]
+            records.append(record)
+        return records
+
+
+class ReviewStats:
+    """
+    SteamDataEnricher.get_review_stats() の結果
+    """
+    __slots__ = ('total_reviews', 'positive_reviews', 'negative_reviews', 'review_score',
+                 'review_score_desc', 'recent_total', 'recent_positive', 'recent_negative')
+
+    def __init__(self, total_reviews: int = 0, positive_reviews: int = 0, negative_reviews: int = 0,
+                 review_score: float = 0, review_score_desc: str = 'No reviews',
+                 recent_total: int = 0, recent_positive: int = 0, recent_negative: int = 0):
+        self.total_reviews = total_reviews
+        self.positive_reviews = positive_reviews
+        self.negative_reviews = negative_reviews
+        self.review_score = review_score
+        self.review_score_desc = sys.intern(review_score_desc)
+        self.recent_total = recent_total
+        self.recent_positive = recent_positive
+        self.recent_negative = recent_negative
+
+    @classmethod
+    def from_dict(cls, stats) -> Optional['ReviewStats']:
+        """
+        get_review_stats() と同じ形の辞書なら変換する（それ以外は None）
+        """
+        if type(stats) is not dict or tuple(stats) != REVIEW_STATS_KEYS:
+            return None
+        recent = stats['recent_reviews']
+        if type(recent) is not dict or tuple(recent) != RECENT_REVIEWS_KEYS or type(stats['review_score_desc']) is not str:
+            return None
+        return cls(stats['total_reviews'], stats['positive_reviews'], stats['negative_reviews'],
+                   stats['review_score'], stats['review_score_desc'],
+                   recent['total'], recent['positive'], recent['negative'])
+
+    def to_dict(self) -> dict:
+        return {
+            'total_reviews': self.total_reviews,
+            'positive_reviews': self.positive_reviews,
+            'negative_reviews': self.negative_reviews,
+            'review_score': self.review_score,
+            'review_score_desc': self.review_score_desc,
+            'recent_reviews': {
+                'total': self.recent_total,
+                'positive': self.recent_positive,
+                'negative': self.recent_negative,
+            },
+        }
+
+
+class GameRecord:
+    """
+    1ゲーム分のデータを __slots__ の属性で持つ省メモリな表現
+
+    ジャンル・カテゴリ・言語・開発元などの文字列はインターンし、同じ組み合わせの
+    タプルはゲーム間で共有する。価格は最小単位（1/100）の整数、発売日は序数
+    （date.toordinal()）にしたものも持つ。元のJSONの形には to_dict() で戻せる
+    （キーの順序も含めて同じになる）。想定と違う形の値や未知のキーは extras に
+    そのまま持つ。
+    """
+    __slots__ = ('keys', 'appid', 'title', 'description', 'header_image', 'genres', 'categories',
+                 'developers', 'publishers', 'release_date', 'release_ordinal', 'price_info',
+                 'price_minor', 'initial_price_minor', 'discount_percent', 'currency',
+                 'supported_languages', 'languages', 'total_reviews', 'review_stats',
+                 'detailed_reviews', 'achievements_total', 'achievements', 'frozen', 'extras')
+
+    # JSONのキーと、それを持つ属性
+    _LIST_FIELDS = {'genres': 'genres', 'categories': 'categories', 'developer': 'developers', 'publisher': 'publishers'}
+    _SCALAR_FIELDS = {'steam_appid': ('appid', int), 'title': ('title', str), 'description': ('description', str),
+                      'header_image': ('header_image', str), 'total_reviews': ('total_reviews', int)}
+
+    def __init__(self):
+        # 元のJSONに無い項目は None のまま（to_dict() は keys にあるものだけを戻す）
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    @classmethod
+    def from_dict(cls, game_data: dict) -> 'GameRecord':
+        record = cls()
+        record.keys = freeze(list(game_data), share=True)[1]
+        frozen = []
+        extras = {}
+        for key, value in game_data.items():
+            if key in cls._SCALAR_FIELDS:
+                name, kind = cls._SCALAR_FIELDS[key]
+                if type(value) is kind:
+                    setattr(record, name, value)
+                    continue
+            elif key in cls._LIST_FIELDS:
+                values = intern_strings(value)
+                if values is not None:
+                    setattr(record, cls._LIST_FIELDS[key], values)
+                    continue
+            elif key == 'release_date' and type(value) is str:
+                record.release_date = _intern(value)
+                continue
+            elif key == 'supported_languages' and type(value) is str:
+                record.supported_languages = _intern(value)
+                continue
+            elif key == 'review_stats':
+                stats = ReviewStats.from_dict(value)
+                if stats is not None:
+                    record.review_stats = stats
+                    continue
+            elif key == 'detailed_reviews':
+                columns = Columns.from_records(value)
+                if columns is not None:
+                    record.detailed_reviews = columns
+                    continue
+            elif key == 'achievements' and type(value) is dict and tuple(value) == ('total_achievements', 'achievements_list'):
+                columns = Columns.from_records(value['achievements_list'])
+                if columns is not None:
+                    record.achievements_total = value['total_achievements']
+                    record.achievements = columns
+                    continue
+            elif key == 'price':
+                record.price_info = freeze(value, share=True)
+                continue
+
+            if type(value) in (dict, list):
+                frozen.append((sys.intern(key), freeze(value, share=key in SHARED_FIELDS)))
+            else:
+                extras[key] = value
+
+        # 正規化した数値（価格・発売日・対応言語）
+        fields = normalize_game(game_data)
+        record.price_minor = None if fields.price is None else int(fields.price * 100)
+        record.initial_price_minor = None if fields.initial_price is None else int(fields.initial_price * 100)
+        record.discount_percent = fields.discount_percent
+        record.currency = fields.currency
+        record.release_ordinal = date.fromisoformat(fields.release_date).toordinal() if _valid_date(fields.release_date) else None
+        record.languages = fields.languages
+        # platforms だけのような組み合わせはゲーム間で同じタプルを共有する
+        record.frozen = _share(tuple(frozen)) if frozen else None
+        record.extras = extras or None
+        return record
+
+    def _value(self, key: str):
+        if self.extras is not None and key in self.extras:
+            return self.extras[key]
+        if self.frozen is not None:
+            for frozen_key, value in self.frozen:
+                if frozen_key == key:
+                    return thaw(value)
+        if key in self._SCALAR_FIELDS:
+            return getattr(self, self._SCALAR_FIELDS[key][0])
+        if key in self._LIST_FIELDS:
+            return list(getattr(self, self._LIST_FIELDS[key]))
+        if key == 'release_date':
+            return self.release_date
+        if key == 'supported_languages':
+            return self.supported_languages
+        if key == 'review_stats':
+            return self.review_stats.to_dict()
+        if key == 'detailed_reviews':
+            return self.detailed_reviews.to_records()
+        if key == 'achievements':
+            return {'total_achievements': self.achievements_total, 'achievements_list': self.achievements.to_records()}
+        if key == 'price':
+            return thaw(self.price_info)
+        raise KeyError(key)
+
+    def to_dict(self) -> dict:
+        """
+        元のJSONと同じ形の辞書に戻す
+        """
+        return {key: self._value(key) for key in self.keys}
+
+    @property
+    def price(self) -> Optional[Decimal]:
+        return None if self.price_minor is None else Decimal(self.price_minor) / 100
+
+    @property
+    def release_day(self) -> Optional[date]:
+        return None if self.release_ordinal is None else date.fromordinal(self.release_ordinal)
+
+    def __repr__(self) -> str:
+        return f"GameRecord(appid={self.appid!r}, title={self.title!r})"
+
+
+def _valid_date(value: Optional[str]) -> bool:
+    try:
+        return value is not None and date.fromisoformat(value) is not None
+    except ValueError:
+        return False
+
+
+def to_records(games_data: Iterable[dict]) -> List[GameRecord]:
+    return [GameRecord.from_dict(game_data) for game_data in games_data]
+
+
+def load_records(filename: str) -> List[GameRecord]:
+    """
+    ゲームJSONを読み込み、省メモリな GameRecord のリストにする
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        games_data = json.load(f)
+    records = []
+    # 変換した辞書から順に手放し、読み込み直後の大きさを超えないようにする
+    for i, game_data in enumerate(games_data):
+        records.append(GameRecord.from_dict(game_data))
+        games_data[i] = None
+    return records
+
+
+def dump_records(records: Iterable[GameRecord], f: TextIO) -> None:
+    """
+    json.dump(..., ensure_ascii=False, indent=2) と同じ内容を、1件ずつ辞書に戻しながら書き出す
+    """
+    first = True
+    for record in records:
+        f.write('[\n  ' if first else ',\n  ')
+        f.write(json.dumps(record.to_dict(), ensure_ascii=False, indent=2).replace('\n', '\n  '))
+        first = False
+    f.write('[]' if first else '\n]')
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python game_record.py <games.json>")
+        return
+
+    import time
+    import tracemalloc
+    try:
+        # 読み込んだ辞書のまま持つ場合と、GameRecord にして辞書を手放した場合の使用量を比べる
+        tracemalloc.start()
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            games_data = json.load(f)
+        dict_bytes = tracemalloc.get_traced_memory()[0]
+        del games_data
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        start = time.time()
+        records = load_records(sys.argv[1])
+        elapsed = time.time() - start
+        record_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            games_data = json.load(f)
+        mismatched = sum(record.to_dict() != game_data for record, game_data in zip(records, games_data))
+        print(f"{len(records)}ゲーム: 辞書 {dict_bytes / 2 ** 20:.1f}MB → GameRecord {record_bytes / 2 ** 20:.1f}MB"
+              f"（{dict_bytes / max(record_bytes, 1):.1f}分の1, 変換 {elapsed:.1f}秒, 不一致 {mismatched}件）")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,15 @@ import json
 import time
 from datetime import datetime
 import os
+from negative_cache import NegativeCache, reason_for_type
+from normalize import parse_price
 
 class SteamGameFetcher:
     def __init__(self, api_key):
         self.api_key = api_key
         self.base_url = "https://api.steampowered.com"
+        # ゲームではない・存在しないappidを記録し、次回以降の走査で問い合わせない
+        self.negative_cache = NegativeCache("negative_appids.bin")
         
     def get_all_apps(self):
         """
@@ -37,6 +41,7 @@ class SteamGameFetcher:
         """
         filtered_games = []
         processed_count = 0
+        skipped_count = 0
         
         try:
             # 全アプリのリストを取得
@@ -54,11 +59,21 @@ class SteamGameFetcher:
                     # 途中経過を保存
                     if filtered_games:
                         self.save_to_json(filtered_games, "indie_games_progress.json")
+                    if self.negative_cache.dirty:
+                        self.negative_cache.save()
+
+                # 以前ゲームではない・存在しないと分かったアプリは再確認の時期まで飛ばす
+                if self.negative_cache.should_skip(app_id):
+                    skipped_count += 1
+                    continue
                 
                 # ゲームの詳細情報を取得
                 details = self.get_game_details(app_id)
-                
-                if "error" not in details:
+
+                if "rejected" in details:
+                    self.negative_cache.add(app_id, details["rejected"])
+                elif "error" not in details:
+                    self.negative_cache.remove(app_id)
                     # インディーゲームかどうかをチェック
                     is_indie = any(genre.lower() == "インディー" for genre in details.get("genres", []))
                     
@@ -80,11 +95,15 @@ class SteamGameFetcher:
                 
                 time.sleep(1)  # APIレート制限を考慮
                 
+            print(f"Skipped {skipped_count} known non-game apps")
             return filtered_games
             
         except Exception as e:
             print(f"Error during indie game filtering: {e}")
             return filtered_games
+        finally:
+            if self.negative_cache.dirty:
+                self.negative_cache.save()
 
     def get_game_details(self, app_id):
         """
@@ -107,7 +126,7 @@ class SteamGameFetcher:
                 
                 # ゲームタイプをチェック
                 if game_data.get("type") != "game":
-                    return {"error": "Not a game"}
+                    return {"error": "Not a game", "rejected": reason_for_type(game_data.get("type"))}
                 
                 # レビュー情報を取得
                 reviews_url = f"https://store.steampowered.com/appreviews/{app_id}"
@@ -146,7 +165,7 @@ class SteamGameFetcher:
                 
                 return formatted_data
             else:
-                return {"error": "Game information not found"}
+                return {"error": "Game information not found", "rejected": "not_found"}
                 
         except requests.exceptions.RequestException as e:
             return {"error": f"API request failed: {str(e)}"}
@@ -159,12 +178,7 @@ class SteamGameFetcher:
         """
         価格文字列から数値を抽出します
         """
-        try:
-            if not price_str or price_str == "価格情報なし":
-                return None
-            return int(''.join(filter(str.isdigit, price_str)))
-        except ValueError:
-            return None
+        return parse_price(price_str)
 
     def save_to_json(self, data, filename="indie_games_data.json"):
         """
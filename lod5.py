@@ -1,67 +1,173 @@
 import requests
 import json
+import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import count as count_from
 import os
+import profiling
+from normalize import summarize_games
+
+SEARCH_URL = "https://store.steampowered.com/api/storesearch/"
+SEARCH_PAGE_SIZE = 100
+
+# ストアAPI全体で守るリクエスト数（1秒あたり）と同時リクエスト数
+DEFAULT_RATE = 2.0
+DEFAULT_CONCURRENCY = 4
+MAX_RETRIES = 3
+
+
+class RateLimiter:
+    """
+    複数スレッドで共有する、1秒あたりのリクエスト数の上限
+    """
+
+    def __init__(self, rate, burst=1):
+        self.interval = 1.0 / rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            # しばらく空いていた分は burst 回まで続けて送れる
+            slot = max(self._next, now - (self.burst - 1) * self.interval)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def prefetch(executor, func, items, window):
+    """
+    items の各要素に func を並行して適用し、結果を元の順番で返すジェネレータ
+
+    先読みするのは window 件までなので、items は無限のイテレータでもよい。
+    """
+    items = iter(items)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            if len(pending) >= window:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+    finally:
+        # 途中で打ち切られたときは、まだ始まっていない先読みを取り消す
+        for _, future in pending:
+            future.cancel()
+
 
 class SteamGameFetcher:
-    def __init__(self, api_key):
+    def __init__(self, api_key, rate=DEFAULT_RATE, concurrency=DEFAULT_CONCURRENCY):
         self.api_key = api_key
         self.base_url = "https://store.steampowered.com/api"
-        
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate, burst=concurrency)
+        self._local = threading.local()
+        # get_games_list で取得した詳細情報（get_multiple_games_data で再利用する）
+        self.details_cache = {}
+
+    def _get(self, url, params):
+        """
+        レート制限を守ってGETリクエストを送る（429と5xxは間隔を空けて再試行する）
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        for attempt in range(MAX_RETRIES + 1):
+            self.limiter.wait()
+            response = session.get(url, params=params, timeout=30)
+            if response.status_code != 429 and response.status_code < 500 or attempt == MAX_RETRIES:
+                break
+            time.sleep(2 ** attempt * 5)
+        response.raise_for_status()
+        return response
+
+    def fetch_search_page(self, start_index, max_price=2000, page_size=SEARCH_PAGE_SIZE):
+        """
+        storesearch の1ページ分の検索結果を取得します
+        """
+        search_params = {
+            "start": start_index,
+            "count": page_size,
+            "maxprice": max_price,
+            "category1": 998,  # ゲームカテゴリ
+            "l": "japanese",
+            "cc": "jp"
+        }
+        return self._get(SEARCH_URL, search_params).json().get("items") or []
+
+    def discover_app_ids(self, max_price=2000, limit=None, page_size=SEARCH_PAGE_SIZE):
+        """
+        検索結果のapp_idを重複なく順に返すジェネレータ
+
+        検索ページは同時リクエスト数の分だけ先読みし、空のページが返るか
+        limit 件に達した時点で終了します。
+        """
+        seen = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pages = prefetch(
+                executor,
+                lambda start: self.fetch_search_page(start, max_price, page_size),
+                count_from(0, page_size),
+                self.concurrency
+            )
+            try:
+                for start_index, items in pages:
+                    if not items:
+                        print("No more games found")
+                        break
+                    print(f"Fetched search results {start_index + 1} to {start_index + len(items)}")
+                    for game in items:
+                        app_id = str(game['id'])
+                        if app_id not in seen:  # 重複を避ける
+                            seen.add(app_id)
+                            yield app_id
+                            if limit is not None and len(seen) >= limit:
+                                return
+            finally:
+                pages.close()
+
     def get_games_list(self, max_price=2000, min_reviews=1, count=10000):
         """
         指定した条件に合うゲームのリストを取得します
+
+        検索で見つかったapp_idを順に詳細取得へ流し、検索ページの先読みと
+        詳細情報の取得を並行して進めます。
         """
         filtered_games = []
-        
+
         try:
-            # Steam の検索APIを使用してより多くのゲームを取得
-            for start_index in range(0, count, 100):  # 100件ずつ取得
-                search_url = "https://store.steampowered.com/api/storesearch/"
-                search_params = {
-                    "start": start_index,
-                    "count": 100,
-                    "maxprice": max_price,
-                    "category1": 998,  # ゲームカテゴリ
-                    "l": "japanese",
-                    "cc": "jp"
-                }
-                
-                print(f"Fetching games {start_index + 1} to {start_index + 100}...")
-                
-                response = requests.get(search_url, params=search_params)
-                response.raise_for_status()
-                search_data = response.json()
-                
-                if not search_data.get("items"):
-                    print("No more games found")
-                    break
-                
-                for game in search_data["items"]:
-                    app_id = str(game['id'])
-                    if app_id not in filtered_games:  # 重複を避ける
-                        details = self.get_game_details(app_id)
-                        
-                        if "error" not in details:
-                            if details.get("total_reviews", 0) >= min_reviews:
-                                filtered_games.append(app_id)
-                                price = details["price"]["final"]
-                                print(f"Found game: {details.get('title')} - {price}")
-                                
-                                if len(filtered_games) >= count:
-                                    return filtered_games
-                        
-                        time.sleep(1)  # APIレート制限を考慮
-                
-                time.sleep(2)  # ページ間の待機時間
-            
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                candidates = self.discover_app_ids(max_price)
+                results = prefetch(executor, self.get_game_details, candidates, self.concurrency)
+                for app_id, details in results:
+                    if "error" in details:
+                        continue
+                    self.details_cache[app_id] = details
+                    if details.get("total_reviews", 0) >= min_reviews:
+                        filtered_games.append(app_id)
+                        price = details["price"]["final"]
+                        print(f"Found game: {details.get('title')} - {price}")
+
+                        if len(filtered_games) >= count:
+                            results.close()
+                            candidates.close()
+                            break
+
             print(f"Found {len(filtered_games)} games matching criteria")
             return filtered_games
-            
+
         except requests.exceptions.RequestException as e:
             print(f"Error fetching games list: {e}")
-            return []
+            return filtered_games
 
     def get_game_details(self, app_id):
         """
@@ -75,9 +181,7 @@ class SteamGameFetcher:
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get(url, params).json()
             
             if data[str(app_id)]["success"]:
                 game_data = data[str(app_id)]["data"]
@@ -90,8 +194,7 @@ class SteamGameFetcher:
                     "purchase_type": "all"
                 }
                 
-                reviews_response = requests.get(reviews_url, params=reviews_params)
-                reviews_data = reviews_response.json()
+                reviews_data = self._get(reviews_url, reviews_params).json()
                 total_reviews = reviews_data.get("query_summary", {}).get("total_reviews", 0)
                 
                 price_info = game_data.get("price_overview", {})
@@ -132,19 +235,22 @@ class SteamGameFetcher:
         """
         games_data = []
         total = len(app_ids)
-        
-        for i, app_id in enumerate(app_ids, 1):
-            print(f"Fetching data for game {app_id}... ({i}/{total})")
-            game_data = self.get_game_details(app_id)
-            if "error" not in game_data:
-                games_data.append(game_data)
-                # 100ゲームごとにファイルに保存（途中経過を保存）
-                if i % 100 == 0:
-                    self.save_to_json(games_data, f"games_data_partial_{i}.json")
-                    print(f"Saved partial data for {i} games")
-            
-            time.sleep(1)  # APIレート制限を考慮
-            
+
+        def fetch(app_id):
+            # 一覧の取得時に詳細を取得済みのものはそれを使う
+            return self.details_cache.get(app_id) or self.get_game_details(app_id)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = prefetch(executor, fetch, app_ids, self.concurrency)
+            for i, (app_id, game_data) in enumerate(results, 1):
+                print(f"Fetched data for game {app_id} ({i}/{total})")
+                if "error" not in game_data:
+                    games_data.append(game_data)
+                    # 100ゲームごとにファイルに保存（途中経過を保存）
+                    if i % 100 == 0:
+                        self.save_to_json(games_data, f"games_data_partial_{i}.json")
+                        print(f"Saved partial data for {i} games")
+
         return games_data
             
     def save_to_json(self, data, filename="game_data.json"):
@@ -175,6 +281,9 @@ def load_config(config_file="config.json"):
         return None
 
 def main():
+    # LOD_PROFILE または --profile でステージごとのプロファイルを取る
+    profiling.init()
+
     # 設定ファイルからAPIキーを読み込み
     api_key = load_config()
     if not api_key:
@@ -182,6 +291,21 @@ def main():
         return
     
     fetcher = SteamGameFetcher(api_key)
+
+    # python lod5.py discover [件数] [出力ファイル] で候補のapp_idだけを集める
+    if len(sys.argv) > 1 and sys.argv[1] == "discover":
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+        output_file = sys.argv[3] if len(sys.argv) > 3 else "candidate_app_ids.json"
+        start = time.time()
+        try:
+            with profiling.stage("discovery"):
+                app_ids = list(fetcher.discover_app_ids(max_price=20000, limit=limit))
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching games list: {e}")
+            return
+        fetcher.save_to_json(app_ids, output_file)
+        print(f"Discovered {len(app_ids)} games in {time.time() - start:.1f}s -> {output_file}")
+        return
     
     # フィルタリング条件を設定
     MAX_PRICE = 20000
@@ -190,11 +314,12 @@ def main():
     
     # 条件に合うゲームのリストを取得
     print(f"Searching for games under ¥{MAX_PRICE} with at least {MIN_REVIEWS} reviews...")
-    game_ids = fetcher.get_games_list(
-        max_price=MAX_PRICE,
-        min_reviews=MIN_REVIEWS,
-        count=GAME_COUNT
-    )
+    with profiling.stage("discovery"):
+        game_ids = fetcher.get_games_list(
+            max_price=MAX_PRICE,
+            min_reviews=MIN_REVIEWS,
+            count=GAME_COUNT
+        )
     
     if not game_ids:
         print("No games found matching the criteria")
@@ -202,11 +327,13 @@ def main():
     
     # 取得したゲームの詳細情報を取得
     print(f"\nFetching detailed information for {len(game_ids)} games...")
-    games_data = fetcher.get_multiple_games_data(game_ids)
+    with profiling.stage("detail_fetch"):
+        games_data = fetcher.get_multiple_games_data(game_ids)
     
     # 最終的なJSONファイルに保存
     output_file = "filtered_games_data_final.json"
-    fetcher.save_to_json(games_data, output_file)
+    with profiling.stage("serialization"):
+        fetcher.save_to_json(games_data, output_file)
     
     # 結果を表示
     print(f"\nSuccessfully retrieved data for {len(games_data)} games")
@@ -214,24 +341,7 @@ def main():
     
     # サマリー表示
     print("\nSummary of retrieved games:")
-    genres_count = {}
-    price_ranges = {"0-1000": 0, "1001-5000": 0, "5001-10000": 0, "10001+": 0}
-    
-    for game in games_data:
-        # ジャンルのカウント
-        for genre in game["genres"]:
-            genres_count[genre] = genres_count.get(genre, 0) + 1
-        
-        # 価格帯のカウント
-        price = int(''.join(filter(str.isdigit, game["price"]["final"]))) if game["price"]["final"] != "価格情報なし" else 0
-        if price <= 1000:
-            price_ranges["0-1000"] += 1
-        elif price <= 5000:
-            price_ranges["1001-5000"] += 1
-        elif price <= 10000:
-            price_ranges["5001-10000"] += 1
-        else:
-            price_ranges["10001+"] += 1
+    genres_count, price_ranges = summarize_games(games_data)
     
     print("\nGenre distribution:")
     for genre, count in sorted(genres_count.items(), key=lambda x: x[1], reverse=True):
@@ -0,0 +1,267 @@
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lod_writer import LODStreamWriter, ResourceDictionary
+
+# 変換ロジックを変更したら上げる（マニフェストが無効になり全件再変換される）
+CONVERTER_VERSION = 6
+# 改行で埋めた（使われていない）部分が出力のこの割合を超えたら、差分更新をやめて全体を書き直す
+COMPACT_RATIO = 0.25
+
+
+def source_hash(game_data: dict) -> str:
+    """
+    ゲームの元レコードの内容ハッシュを計算する
+    """
+    payload = json.dumps(game_data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class IncrementalLODConverter:
+    """
+    ゲームごとの内容ハッシュを記録し、変更・追加されたゲームだけを再変換するRDF出力器
+
+    出力ファイルと並べてマニフェスト（JSON）を保存する。マニフェストには
+    ゲームごとの元レコードのハッシュ、出力ブロックのハッシュとファイル内の
+    バイト位置・確保した大きさ、使用した共有リソースが入っており、変更のない
+    ゲームの出力ブロックはそのまま残す。共有リソースの定義は毎回末尾に書き直す。
+
+    similarity_path を渡すと schema:isSimilarTo も出力する。類似ゲームの一覧は
+    元レコードの外にあるので、ゲームごとのハッシュに含めて、一覧が変わったゲームも
+    再変換する。
+    """
+
+    def __init__(self, output_file: str, format: str = 'turtle', manifest_file: Optional[str] = None,
+                 similarity_path: Optional[str] = None):
+        from format import SteamGamesLODConverter
+
+        self.output_file = output_file
+        self.format = format
+        self.manifest_file = manifest_file or output_file + '.manifest.json'
+        self.converter = SteamGamesLODConverter(similarity_path=similarity_path)
+
+    def game_hash(self, game_data: dict) -> str:
+        """
+        出力ブロックを決める入力（元レコードと類似ゲームの一覧）のハッシュ
+        """
+        digest = source_hash(game_data)
+        if self.converter.similarity is None:
+            return digest
+        similar = [other for other, _ in self.converter.similarity.similar(game_data['steam_appid'])]
+        return hashlib.sha1(f"{digest}:{similar}".encode('utf-8')).hexdigest()
+
+    def load_manifest(self) -> Dict:
+        """
+        前回のマニフェストを読み込む（出力ファイルと整合しない場合は空を返す）
+        """
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+        if manifest.get('version') != CONVERTER_VERSION or manifest.get('format') != self.format:
+            return {}
+        try:
+            if os.path.getsize(self.output_file) != manifest.get('size'):
+                return {}
+        except OSError:
+            return {}
+        return manifest
+
+    def render_game(self, game_data: dict) -> Tuple[bytes, List[Tuple[str, str]]]:
+        """
+        1ゲーム分のトリプルを出力ブロックとしてバイト列に変換し、使用した共有リソースと共に返す
+        """
+        buffer = io.StringIO()
+        writer = LODStreamWriter(buffer, format=self.format, header=False)
+        self.converter.resources.clear()
+        writer.write_triples(self.converter.iter_game_triples(game_data))
+        return buffer.getvalue().encode('utf-8'), list(self.converter.resources.resources)
+
+    def render_resources(self, resources: ResourceDictionary) -> bytes:
+        buffer = io.StringIO()
+        writer = LODStreamWriter(buffer, format=self.format, header=False)
+        writer.write_triples(resources.iter_triples())
+        return buffer.getvalue().encode('utf-8')
+
+    def render_header(self) -> bytes:
+        buffer = io.StringIO()
+        writer = LODStreamWriter(buffer, format=self.format)
+        writer.write_triples(self.converter.iter_class_triples())
+        return buffer.getvalue().encode('utf-8')
+
+    def update(self, games_data: Iterable[dict]) -> Dict[str, int]:
+        """
+        出力ファイルを差分更新し、追加・変更・削除・未変更の件数を返す
+
+        前回の出力があれば、その場で書き換える。変更のないゲームの出力ブロックには
+        触れず、変更されたゲームは元の位置に収まればそこへ、収まらなければ末尾へ書き、
+        空いた位置と削除されたゲームの位置は改行で埋める。末尾の共有リソースの定義だけは
+        毎回書き直す。改行で埋めた分が COMPACT_RATIO を超えたときと、前回の出力が無い
+        ときは、ファイル全体を書き直す（stats['compacted'] が 1）。
+        """
+        old = self.load_manifest()
+        old_games = old.get('games', {})
+        stats = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0, 'rewritten': 0, 'compacted': 0}
+
+        # 変換し直したブロックは一時ファイルに溜める（メモリ使用量を変更量によらず一定にする）
+        directory = os.path.dirname(os.path.abspath(self.output_file))
+        with tempfile.TemporaryFile(dir=directory) as spool:
+            new_games = {}
+            for game_data in games_data:
+                appid = str(game_data['steam_appid'])
+                if appid in new_games:
+                    continue
+                digest = self.game_hash(game_data)
+                entry = old_games.get(appid)
+
+                if entry and entry['source'] == digest:
+                    new_games[appid] = dict(entry)
+                    stats['unchanged'] += 1
+                    continue
+
+                block, resource_keys = self.render_game(game_data)
+                triples_digest = hashlib.sha1(block).hexdigest()
+                if entry is None:
+                    stats['added'] += 1
+                else:
+                    stats['changed'] += 1
+                if entry is None or entry['triples'] != triples_digest:
+                    stats['rewritten'] += 1
+                new_games[appid] = {
+                    'source': digest,
+                    'triples': triples_digest,
+                    'length': len(block),
+                    'resources': resource_keys,
+                    'spool': spool.tell(),
+                }
+                spool.write(block)
+
+            removed = [appid for appid in old_games if appid not in new_games]
+            stats['removed'] = len(removed)
+            resources = ResourceDictionary()
+            for entry in new_games.values():
+                resources.update(tuple(key) for key in entry['resources'])
+            trailer = self.render_resources(resources)
+
+            # 書き換えの途中で失敗しても壊れた出力を差分の元にしないよう、先にマニフェストを消す
+            if os.path.exists(self.manifest_file):
+                os.remove(self.manifest_file)
+            layout = self._patch(old, new_games, removed, spool, trailer) if old else None
+            if layout is None:
+                layout = self._rewrite(old_games, new_games, spool, trailer)
+                stats['compacted'] = 1
+
+        for entry in new_games.values():
+            entry.pop('spool', None)
+        manifest = dict(layout, version=CONVERTER_VERSION, format=self.format, games=new_games)
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        return stats
+
+    def _patch(self, old: Dict, new_games: Dict[str, Dict], removed: List[str], spool,
+               trailer: bytes) -> Optional[Dict]:
+        """
+        前回の出力をその場で書き換える（改行で埋めた分が多すぎるときは何もせず None を返す）
+        """
+        old_games = old['games']
+        end = old['end']
+        dead = old['dead']
+        blanks = [old_games[appid] for appid in removed]
+        placed = []
+        for appid, entry in new_games.items():
+            if 'spool' not in entry:
+                continue
+            previous = old_games.get(appid)
+            if previous is not None and entry['length'] <= previous['space']:
+                entry['offset'], entry['space'] = previous['offset'], previous['space']
+                dead -= previous['space'] - previous['length']
+                dead += entry['space'] - entry['length']
+            else:
+                if previous is not None:
+                    blanks.append(previous)
+                entry['offset'], entry['space'] = end, entry['length']
+                end += entry['length']
+            placed.append(entry)
+        for entry in blanks:
+            dead += entry['length']
+
+        size = end + len(trailer)
+        if dead > COMPACT_RATIO * size:
+            return None
+
+        with open(self.output_file, 'r+b') as out:
+            for entry in blanks:
+                out.seek(entry['offset'])
+                out.write(b'\n' * entry['space'])
+            for entry in placed:
+                spool.seek(entry['spool'])
+                out.seek(entry['offset'])
+                out.write(spool.read(entry['length']))
+                out.write(b'\n' * (entry['space'] - entry['length']))
+            out.seek(end)
+            out.write(trailer)
+            out.truncate(size)
+        return {'size': size, 'end': end, 'dead': dead}
+
+    def _rewrite(self, old_games: Dict[str, Dict], new_games: Dict[str, Dict], spool,
+                 trailer: bytes) -> Dict:
+        """
+        出力ファイル全体を書き直す（変更のないブロックは前回の出力から、他は一時ファイルからコピーする）
+        """
+        temp_file = self.output_file + '.tmp'
+        old_fp = open(self.output_file, 'rb') if old_games else None
+        try:
+            with open(temp_file, 'wb') as out:
+                offset = out.write(self.render_header())
+                for entry in new_games.values():
+                    if 'spool' in entry:
+                        spool.seek(entry['spool'])
+                        block = spool.read(entry['length'])
+                    else:
+                        old_fp.seek(entry['offset'])
+                        block = old_fp.read(entry['length'])
+                    out.write(block)
+                    entry['offset'], entry['space'] = offset, len(block)
+                    offset += len(block)
+                end = offset
+                offset += out.write(trailer)
+            os.replace(temp_file, self.output_file)
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        finally:
+            if old_fp:
+                old_fp.close()
+        return {'size': offset, 'end': end, 'dead': 0}
+
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else 'enriched_games_progress_10.json'
+    output_file = sys.argv[2] if len(sys.argv) > 2 else 'steam_games.ttl'
+
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            games_data = json.load(f)
+
+        from similarity import DEFAULT_INDEX_FILE
+        format = 'nt' if output_file.endswith('.nt') else 'turtle'
+        similarity_path = DEFAULT_INDEX_FILE if os.path.exists(DEFAULT_INDEX_FILE) else None
+        stats = IncrementalLODConverter(output_file, format=format,
+                                        similarity_path=similarity_path).update(games_data)
+        print(f"差分変換が完了しました。追加: {stats['added']}, 変更: {stats['changed']}, "
+              f"削除: {stats['removed']}, 未変更: {stats['unchanged']}"
+              + ("（全体を書き直しました）" if stats['compacted'] else ""))
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
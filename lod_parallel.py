@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Tuple
+
+import profiling
+from lod_writer import LODStreamWriter
+
+# 1シャードあたりのゲーム数（ワーカー数に依存させないことで出力を決定的にする）
+DEFAULT_CHUNK_SIZE = 500
+
+_converter = None
+
+
+def _init_worker(similarity_path: Optional[str] = None):
+    """
+    ワーカープロセスごとに変換器を1つだけ生成する
+    """
+    global _converter
+    from format import SteamGamesLODConverter
+    _converter = SteamGamesLODConverter(similarity_path=similarity_path)
+
+
+def _convert_chunk(task: Tuple[int, List[dict], str, str]) -> Tuple[int, str, int, list]:
+    """
+    ゲームのチャンクを1つのシャードファイルに変換し、使われた共有リソースも返す
+    """
+    index, games, shard_dir, format = task
+    ext = 'nt' if format == 'nt' else 'ttl'
+    shard_path = os.path.join(shard_dir, f"shard_{index:06d}.{ext}")
+    _converter.resources.clear()
+    _converter.prepare_reviews(games)
+    with LODStreamWriter(shard_path, format=format, header=False) as writer:
+        for game_data in games:
+            writer.write_triples(_converter.iter_game_triples(game_data))
+        return index, shard_path, writer.triple_count, list(_converter.resources.resources)
+
+
+def _chunks(games_data: List[dict], chunk_size: int, shard_dir: str, format: str) -> Iterator[Tuple[int, List[dict], str, str]]:
+    for index, start in enumerate(range(0, len(games_data), chunk_size)):
+        yield index, games_data[start:start + chunk_size], shard_dir, format
+
+
+def convert_games_parallel(games_data: List[dict],
+                           filename: str,
+                           format: str = 'turtle',
+                           workers: Optional[int] = None,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           similarity_path: Optional[str] = None) -> int:
+    """
+    ゲームをチャンクに分割してプロセスプールで並列にRDFへ変換し、1ファイルに結合する
+
+    シャードは入力順に結合するため、ワーカー数に関係なく逐次変換と同じ出力になる。
+    クラス定義トリプルはシャードには含めず、結合時に先頭へ一度だけ書き出す。
+    ジャンルや言語などの共有リソースの定義も各シャードから集めて重複を除き、末尾に書き出す。
+    similarity_path を渡すと、各ワーカーが類似ゲームの索引を読み込んで schema:isSimilarTo も出力する。
+    """
+    from format import SteamGamesLODConverter
+
+    workers = workers or os.cpu_count() or 1
+    shard_dir = tempfile.mkdtemp(prefix='lod_shards_', dir=os.path.dirname(os.path.abspath(filename)))
+    total = 0
+
+    try:
+        with open(filename, 'w', encoding='utf-8') as out:
+            converter = SteamGamesLODConverter()
+            with LODStreamWriter(out, format=format) as writer:
+                writer.write_triples(converter.iter_class_triples())
+                total += writer.triple_count
+
+            tasks = _chunks(games_data, chunk_size, shard_dir, format)
+            with Pool(processes=workers, initializer=_init_worker, initargs=(similarity_path,)) as pool:
+                # imap は入力順に結果を返すので、届いた順に結合してシャードを削除する
+                for index, shard_path, count, resource_keys in pool.imap(_convert_chunk, tasks):
+                    with open(shard_path, 'r', encoding='utf-8') as shard:
+                        shutil.copyfileobj(shard, out)
+                    os.remove(shard_path)
+                    converter.resources.update(resource_keys)
+                    total += count
+
+            with LODStreamWriter(out, format=format, header=False) as writer:
+                writer.write_triples(converter.resources.iter_triples())
+                total += writer.triple_count
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+    return total
+
+
+def main():
+    profiling.init()
+    input_file = sys.argv[1] if len(sys.argv) > 1 else 'enriched_games_progress_10.json'
+    output_file = sys.argv[2] if len(sys.argv) > 2 else 'steam_games.ttl'
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            games_data = json.load(f)
+
+        format = 'nt' if output_file.endswith('.nt') else 'turtle'
+        from similarity import DEFAULT_INDEX_FILE
+        similarity_path = DEFAULT_INDEX_FILE if os.path.exists(DEFAULT_INDEX_FILE) else None
+        # ワーカープロセス内の処理は cProfile に現れないので、時間の内訳はワーカー数1で確認する
+        with profiling.stage('conversion'):
+            count = convert_games_parallel(games_data, output_file, format=format, workers=workers,
+                                           similarity_path=similarity_path)
+        print(f"変換が完了しました。（{len(games_data)}ゲーム, {count}トリプル）")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
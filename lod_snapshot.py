@@ -0,0 +1,317 @@
+import mmap
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Tuple
+
+from lod_writer import LODStreamWriter, Triple
+
+MAGIC = b'LODSNAP\x01'
+_HEADER = struct.Struct('<8sQQQQQQ')
+# 前方一致圧縮（Front Coding）の1ブロックあたりの項数
+BLOCK_SIZE = 16
+
+# 並べ替え順ごとに、元の (s, p, o) の位置をどの順で並べたか
+_ORDERS = {
+    'spo': (0, 1, 2),
+    'pos': (1, 2, 0),
+    'osp': (2, 0, 1),
+}
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buf, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def write_snapshot(triples: Iterable[Triple], path: str) -> int:
+    """
+    N-Triples形式の項の組からバイナリスナップショットを作成する
+
+    項は整列した辞書に前方一致圧縮で格納し、トリプルは整数IDの配列として
+    SPO/POS/OSPの3通りの順に並べて保存する。
+    """
+    unique = set(triples)
+    terms = sorted({term.encode('utf-8') for triple in unique for term in triple})
+    ids = {term.decode('utf-8'): i for i, term in enumerate(terms)}
+
+    # 辞書（ブロックの先頭は完全な文字列、以降は直前との共通接頭辞長と差分）
+    data = bytearray()
+    block_offsets = array('Q')
+    previous = b''
+    for i, term in enumerate(terms):
+        if i % BLOCK_SIZE == 0:
+            block_offsets.append(len(data))
+            _write_varint(data, len(term))
+            data += term
+        else:
+            shared = _common_prefix(previous, term)
+            _write_varint(data, shared)
+            _write_varint(data, len(term) - shared)
+            data += term[shared:]
+        previous = term
+
+    encoded = [(ids[s], ids[p], ids[o]) for s, p, o in unique]
+
+    index_offset = _HEADER.size
+    data_offset = index_offset + len(block_offsets) * 8
+    triples_offset = data_offset + len(data)
+    triples_offset += -triples_offset % 8
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(terms), len(encoded), BLOCK_SIZE,
+                             index_offset, data_offset, triples_offset))
+        f.write(block_offsets.tobytes())
+        f.write(data)
+        f.write(b'\0' * (triples_offset - data_offset - len(data)))
+        for order in _ORDERS.values():
+            rows = sorted(tuple(t[i] for i in order) for t in encoded)
+            flat = array('I')
+            for row in rows:
+                flat.extend(row)
+            f.write(flat.tobytes())
+
+    return len(encoded)
+
+
+class LODSnapshot:
+    """
+    バイナリスナップショットをメモリマップで開き、解析せずにトリプルパターンを検索する
+
+    ファイルは読み取り専用でマップするため、複数プロセスで同じページキャッシュを共有できる。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.term_count, self.triple_count, self.block_size,
+         index_offset, data_offset, triples_offset) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"スナップショットの形式が正しくありません: {path}")
+
+        view = memoryview(self._mm)
+        block_count = (self.term_count + self.block_size - 1) // self.block_size
+        self._blocks = view[index_offset:index_offset + block_count * 8].cast('Q')
+        self._data = view[data_offset:triples_offset]
+        size = self.triple_count * 3 * 4
+        self._perms = {}
+        for i, name in enumerate(_ORDERS):
+            start = triples_offset + i * size
+            self._perms[name] = view[start:start + size].cast('I')
+        self.term = lru_cache(maxsize=65536)(self._term)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.triple_count
+
+    def close(self) -> None:
+        self._blocks.release()
+        self._data.release()
+        for perm in self._perms.values():
+            perm.release()
+        self._perms = {}
+        self._mm.close()
+        self._file.close()
+
+    # 辞書
+
+    def _block_terms(self, block: int, limit: Optional[int] = None) -> Iterator[bytes]:
+        data = self._data
+        pos = self._blocks[block]
+        length, pos = _read_varint(data, pos)
+        term = bytes(data[pos:pos + length])
+        pos += length
+        yield term
+        count = min(self.block_size, self.term_count - block * self.block_size)
+        if limit is not None:
+            count = min(count, limit)
+        for _ in range(count - 1):
+            shared, pos = _read_varint(data, pos)
+            length, pos = _read_varint(data, pos)
+            term = term[:shared] + bytes(data[pos:pos + length])
+            pos += length
+            yield term
+
+    def _term(self, term_id: int) -> str:
+        if not 0 <= term_id < self.term_count:
+            raise IndexError(term_id)
+        block, offset = divmod(term_id, self.block_size)
+        for i, term in enumerate(self._block_terms(block, offset + 1)):
+            if i == offset:
+                return term.decode('utf-8')
+
+    def term_id(self, term: str) -> Optional[int]:
+        """
+        項（N-Triples形式）のIDを返す。辞書に無ければ None
+        """
+        key = term.encode('utf-8')
+        lo, hi = 0, len(self._blocks)
+        # 先頭の項が key 以下である最後のブロックを探す
+        while lo < hi:
+            mid = (lo + hi) // 2
+            first = next(self._block_terms(mid, 1))
+            if first <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        block = lo - 1
+        if block < 0:
+            return None
+        for i, candidate in enumerate(self._block_terms(block)):
+            if candidate == key:
+                return block * self.block_size + i
+            if candidate > key:
+                break
+        return None
+
+    # トリプル検索
+
+    def _range(self, perm, prefix: Tuple[int, ...]) -> Tuple[int, int]:
+        """
+        整列済み配列の中で prefix に一致する行の範囲 [start, end) を二分探索で求める
+        """
+        width = len(prefix)
+
+        def row_key(i):
+            return tuple(perm[i * 3 + j] for j in range(width))
+
+        lo, hi = 0, self.triple_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if row_key(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo
+        hi = self.triple_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if row_key(mid) <= prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def triple_ids(self, s: Optional[int] = None, p: Optional[int] = None,
+                   o: Optional[int] = None) -> Iterator[Tuple[int, int, int]]:
+        """
+        IDで指定したトリプルパターンに一致する (s, p, o) のIDの組を返す
+        """
+        if s is not None and p is None and o is not None:
+            name, prefix = 'osp', (o, s)
+        elif s is not None:
+            name, prefix = 'spo', (s,) if p is None else tuple(x for x in (s, p, o) if x is not None)
+        elif p is not None:
+            name, prefix = 'pos', (p,) if o is None else (p, o)
+        elif o is not None:
+            name, prefix = 'osp', (o,)
+        else:
+            name, prefix = 'spo', ()
+
+        perm = self._perms[name]
+        order = _ORDERS[name]
+        start, end = self._range(perm, prefix) if prefix else (0, self.triple_count)
+        for i in range(start, end):
+            row = perm[i * 3:i * 3 + 3]
+            triple = [0, 0, 0]
+            for j, position in enumerate(order):
+                triple[position] = row[j]
+            yield tuple(triple)
+
+    def triples(self, s: Optional[str] = None, p: Optional[str] = None,
+                o: Optional[str] = None) -> Iterator[Triple]:
+        """
+        N-Triples形式の項で指定したトリプルパターンに一致するトリプルを返す
+        """
+        ids = []
+        for term in (s, p, o):
+            if term is None:
+                ids.append(None)
+                continue
+            term_id = self.term_id(term)
+            if term_id is None:
+                return
+            ids.append(term_id)
+        for triple in self.triple_ids(*ids):
+            yield tuple(self.term(i) for i in triple)
+
+    def count(self, s: Optional[str] = None, p: Optional[str] = None, o: Optional[str] = None) -> int:
+        return sum(1 for _ in self.triples(s, p, o))
+
+    def export(self, filename: str, format: str = 'turtle') -> int:
+        """
+        スナップショットをTurtle/N-Triplesに書き戻す
+        """
+        with LODStreamWriter(filename, format=format) as writer:
+            subject, pairs = None, []
+            for s, p, o in self.triple_ids():
+                if s != subject:
+                    if pairs:
+                        writer.write_subject(self.term(subject), pairs)
+                    subject, pairs = s, []
+                pairs.append((self.term(p), self.term(o)))
+            if pairs:
+                writer.write_subject(self.term(subject), pairs)
+            return writer.triple_count
+
+
+def read_rdf(filename: str, format: Optional[str] = None) -> Iterator[Triple]:
+    """
+    Turtle/N-Triplesファイルを読み込み、N-Triples形式の項の組を返す
+    """
+    from rdflib import Graph
+    from lod_store import encode_term
+
+    graph = Graph().parse(filename, format=format)
+    for s, p, o in graph:
+        yield encode_term(s), encode_term(p), encode_term(o)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python lod_snapshot.py <input.ttl|input.nt|input.lodsnap> <output>")
+        return
+
+    input_file, output_file = sys.argv[1], sys.argv[2]
+    try:
+        if input_file.endswith('.lodsnap'):
+            format = 'nt' if output_file.endswith('.nt') else 'turtle'
+            with LODSnapshot(input_file) as snapshot:
+                count = snapshot.export(output_file, format=format)
+        else:
+            count = write_snapshot(read_rdf(input_file), output_file)
+        print(f"{input_file} を {output_file} に変換しました。（{count}トリプル）")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+import csv
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain, islice
+from queue import Empty, Queue
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from rdflib import BNode, Graph, Literal
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.evaluate import evalQuery
+from rdflib.query import ResultRow
+
+from lod_writer import PREFIXES
+
+JSON_TYPE = 'application/sparql-results+json'
+CSV_TYPE = 'text/csv'
+NT_TYPE = 'application/n-triples'
+
+# 文字列リテラル・IRI・コメントと、それ以外の空白を切り分ける
+_QUERY_TOKEN_RE = re.compile(r'"""(?:[^\\]|\\.)*?"""|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|<[^<>"{}|^`\\\s]*>|#[^\n]*|\s+')
+
+
+def normalize_query(query: str) -> str:
+    """
+    キャッシュキー用にクエリを正規化する（コメント除去と空白の圧縮）
+    """
+    parts = []
+    last = 0
+    for match in _QUERY_TOKEN_RE.finditer(query):
+        parts.append(query[last:match.start()])
+        token = match.group(0)
+        if token.startswith('#') or token.isspace():
+            parts.append(' ')
+        else:
+            parts.append(token)
+        last = match.end()
+    parts.append(query[last:])
+    return re.sub(r' {2,}', ' ', ''.join(parts)).strip()
+
+
+def _json_term(term) -> dict:
+    if isinstance(term, Literal):
+        value = {'type': 'literal', 'value': str(term)}
+        if term.datatype:
+            value['datatype'] = str(term.datatype)
+        if term.language:
+            value['xml:lang'] = term.language
+        return value
+    if isinstance(term, BNode):
+        return {'type': 'bnode', 'value': str(term)}
+    return {'type': 'uri', 'value': str(term)}
+
+
+class QueryTimeout(Exception):
+    """
+    クエリの実行が制限時間を超えた
+    """
+
+
+class EndpointBusy(Exception):
+    """
+    同時に実行できるクエリの数を超えた
+    """
+
+
+class _DeadlineGraph(Graph):
+    """
+    トリプルを読み出すたびに期限を確かめるグラフ（同じストアを共有する）
+
+    rdflibのSPARQL評価は、結合・並べ替え・集約も含めてすべて triples() の読み出しで
+    進むので、ここで例外を送出すれば評価の途中でも打ち切れる。
+    """
+
+    def __init__(self, graph: Graph, deadline: float):
+        super().__init__(store=graph.store, identifier=graph.identifier,
+                         namespace_manager=graph.namespace_manager)
+        self.deadline = deadline
+
+    def triples(self, triple):
+        deadline = self.deadline
+        if time.monotonic() > deadline:
+            raise QueryTimeout()
+        for found in super().triples(triple):
+            if time.monotonic() > deadline:
+                raise QueryTimeout()
+            yield found
+
+
+class SPARQLEndpoint:
+    """
+    ゲームLODに対するSPARQLクエリの実行とキャッシュを担う
+
+    結果はバイト列として (正規化クエリ, グラフのバージョン, 出力形式) をキーに
+    LRUキャッシュへ保存する。グラフのファイルが更新されるとバージョンが変わり、
+    古いキャッシュは参照されなくなる。
+
+    クエリは要求を受けたスレッドで評価し、結果の行は評価しながら逐次出力する。
+    timeout 秒を超えたクエリは評価の途中で打ち切り、同時に max_concurrent を超える
+    クエリは待たせずに EndpointBusy で断る。
+    """
+
+    def __init__(self, source: str, cache_size: int = 256, timeout: float = 10.0,
+                 max_cached_bytes: int = 8 * 1024 * 1024, chunk_rows: int = 1000,
+                 max_concurrent: int = 4):
+        self.source = source
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.max_cached_bytes = max_cached_bytes
+        self.chunk_rows = chunk_rows
+
+        self._cache: OrderedDict = OrderedDict()
+        self._prepared: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._graph_lock = threading.Lock()
+        self._graph: Optional[Graph] = None
+        self._version: Optional[Tuple] = None
+        self.hits = 0
+        self.misses = 0
+
+        # 実行枠。SQLiteのストアは接続を同時に使えないので枠ごとにグラフを開き、
+        # ファイルから読んだグラフは読み出し専用で全枠から共有する
+        self._slots: Queue = Queue()
+        for _ in range(max_concurrent):
+            self._slots.put(self._open_store() if self.source.endswith('.sqlite') else None)
+        # 起動時にグラフを読み込んでおく（初回クエリの遅延とバージョン変化を避ける）
+        if not self.source.endswith('.sqlite'):
+            self._load_graph()
+
+    def version(self) -> Tuple:
+        """
+        グラフの元ファイル（SQLiteの場合はWALも含む）の更新時刻とサイズ
+        """
+        stamps = []
+        for path in (self.source, self.source + '-wal'):
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _open_store(self) -> Graph:
+        from lod_store import open_game_graph
+        graph = open_game_graph(self.source, create=False)
+        # 接頭辞の登録を確定させ、他の枠の接続が書き込みロックで待たないようにする
+        graph.commit()
+        return graph
+
+    def _load_graph(self) -> Graph:
+        # ファイルが更新されていれば読み直す（実行中のクエリは古いグラフを使い続ける）
+        with self._graph_lock:
+            version = self.version()
+            if self._graph is None or version != self._version:
+                self._graph = Graph().parse(self.source)
+                self._version = version
+            return self._graph
+
+    def _prepare(self, normalized: str):
+        with self._lock:
+            prepared = self._prepared.get(normalized)
+            if prepared is not None:
+                self._prepared.move_to_end(normalized)
+                return prepared
+        prepared = prepareQuery(normalized, initNs=PREFIXES)
+        with self._lock:
+            self._prepared[normalized] = prepared
+            while len(self._prepared) > self.cache_size:
+                self._prepared.popitem(last=False)
+        return prepared
+
+    def _evaluate(self, prepared, graph: Graph):
+        # SELECT の行は評価しながら返す（Result を経由すると全行が溜まるので直接評価する）
+        result = evalQuery(graph, prepared)
+        kind = result['type_']
+        if kind == 'SELECT':
+            variables = result['vars_']
+            rows = (ResultRow(b, variables) for b in result['bindings'] if b)
+            return kind, [str(v) for v in variables], rows
+        if kind == 'ASK':
+            return kind, [], bool(result['askAnswer'])
+        return kind, [], iter(result['graph'])
+
+    def _batches(self, rows: Iterable) -> Iterator[list]:
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.chunk_rows))
+            if not batch:
+                return
+            yield batch
+
+    def _releasing(self, slot, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        try:
+            yield from chunks
+        finally:
+            self._slots.put(slot)
+
+    def execute(self, query: str, accept: str = JSON_TYPE) -> Tuple[str, Iterator[bytes], Optional[Tuple]]:
+        """
+        クエリを実行し、(Content-Type, 出力チャンク列, キャッシュキー) を返す
+
+        キャッシュに無い場合は結果を評価しながら逐次シリアライズし、上限以下の
+        大きさなら出力し終えた時点でキャッシュに登録する。チャンク列を読み進める間も
+        評価が続くので、QueryTimeout はチャンク列からも送出されうる。同時実行数を
+        超えていれば EndpointBusy を送出する。
+        """
+        normalized = normalize_query(query)
+        content_type = CSV_TYPE if CSV_TYPE in accept else JSON_TYPE
+        key = (normalized, self.version(), content_type)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[0], iter([cached[1]]), None
+            self.misses += 1
+
+        prepared = self._prepare(normalized)
+        try:
+            slot = self._slots.get_nowait()
+        except Empty:
+            raise EndpointBusy()
+        try:
+            graph = _DeadlineGraph(slot or self._load_graph(), time.monotonic() + self.timeout)
+            kind, variables, rows = self._evaluate(prepared, graph)
+
+            if kind == 'SELECT':
+                chunks = self._csv_chunks(variables, rows) if content_type == CSV_TYPE else self._json_chunks(variables, rows)
+            elif kind == 'ASK':
+                content_type = JSON_TYPE
+                chunks = iter([json.dumps({'head': {}, 'boolean': rows}).encode('utf-8')])
+            else:
+                content_type = NT_TYPE
+                chunks = self._nt_chunks(rows)
+        except BaseException:
+            self._slots.put(slot)
+            raise
+
+        # 最初のチャンクまではここで評価する（並べ替えや集約はここで評価し終わるので、
+        # 誤りや打ち切りを応答を始める前に送出できる）。以降は読み終えるか捨てた時点で実行枠を返す
+        stream = self._releasing(slot, self._caching(key, content_type, chunks))
+        first = next(stream, b'')
+        return content_type, chain([first], stream), key
+
+    def _caching(self, key: Tuple, content_type: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        buffer: Optional[List[bytes]] = []
+        size = 0
+        for chunk in chunks:
+            if buffer is not None:
+                size += len(chunk)
+                if size > self.max_cached_bytes:
+                    buffer = None
+                else:
+                    buffer.append(chunk)
+            yield chunk
+        if buffer is not None:
+            with self._lock:
+                self._cache[key] = (content_type, b''.join(buffer))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def _json_chunks(self, variables: List[str], rows: Iterable) -> Iterator[bytes]:
+        # 先頭のチャンクは最初の行の組まで含める（評価の誤りを応答の前に検出するため）
+        prefix = '{"head": {"vars": %s}, "results": {"bindings": [' % json.dumps(variables)
+        for batch in self._batches(rows):
+            bindings = []
+            for row in batch:
+                binding = {
+                    var: _json_term(row[var]) for var in variables if row[var] is not None
+                }
+                bindings.append(json.dumps(binding, ensure_ascii=False))
+            yield (prefix + ', '.join(bindings)).encode('utf-8')
+            prefix = ', '
+        yield ('' if prefix == ', ' else prefix).encode('utf-8') + b']}}'
+
+    def _csv_chunks(self, variables: List[str], rows: Iterable) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\r\n')
+        writer.writerow(variables)
+        for batch in self._batches(rows):
+            for row in batch:
+                writer.writerow(['' if row[var] is None else str(row[var]) for var in variables])
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def _nt_chunks(self, triples: Iterable) -> Iterator[bytes]:
+        from lod_store import encode_term
+        for batch in self._batches(triples):
+            lines = [
+                f"{encode_term(s)} {encode_term(p)} {encode_term(o)} .\n"
+                for s, p, o in batch
+            ]
+            yield ''.join(lines).encode('utf-8')
+
+
+class SPARQLRequestHandler(BaseHTTPRequestHandler):
+    endpoint: SPARQLEndpoint = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/sparql':
+            self._send_error(404, 'Not Found')
+            return
+        query = parse_qs(url.query).get('query', [None])[0]
+        self._handle_query(query)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/sparql':
+            self._send_error(404, 'Not Found')
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('utf-8')
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('application/sparql-query'):
+            query = body
+        else:
+            query = parse_qs(body).get('query', [None])[0]
+        self._handle_query(query)
+
+    def _handle_query(self, query: Optional[str]):
+        if not query:
+            self._send_error(400, 'Missing query parameter')
+            return
+        accept = self.headers.get('Accept', JSON_TYPE)
+        try:
+            content_type, chunks, _ = self.endpoint.execute(query, accept)
+        except QueryTimeout:
+            self._send_error(503, 'Query timed out')
+            return
+        except EndpointBusy:
+            self._send_error(503, 'Too many concurrent queries')
+            return
+        except Exception as e:
+            self._send_error(400, f"Query error: {e}")
+            return
+
+        # 大きな結果でもメモリに溜めないよう chunked で逐次送信する
+        self.send_response(200)
+        self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        except Exception:
+            # タイムアウト・結果生成中のエラー・クライアントの切断（BrokenPipeError など）。
+            # 送信を始めた後は状態を変えられないので、終端を送らずに接続を切る
+            self.close_connection = True
+            return
+
+    def _send_error(self, status: int, message: str):
+        body = message.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(source: str, host: str = '127.0.0.1', port: int = 3030, **options) -> ThreadingHTTPServer:
+    """
+    SPARQLエンドポイントのHTTPサーバーを生成する（serve_forever() で起動）
+    """
+    handler = type('GameSPARQLRequestHandler', (SPARQLRequestHandler,), {
+        'endpoint': SPARQLEndpoint(source, **options),
+        'protocol_version': 'HTTP/1.1',
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else 'steam_games_LOD.ttl'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 3030
+
+    server = serve(source, port=port)
+    print(f"SPARQL endpoint: http://127.0.0.1:{port}/sparql （{source}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import os
+import sqlite3
+import sys
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Tuple
+
+from rdflib import Graph, Literal, plugin
+from rdflib.store import NO_STORE, VALID_STORE, Store
+from rdflib.term import BNode
+from rdflib.util import from_n3
+
+from lod_writer import PREFIXES, Triple, literal, uri
+
+STORE_NAME = 'SQLiteGames'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    n3 TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri TEXT NOT NULL
+);
+"""
+
+
+def encode_term(term) -> str:
+    """
+    rdflibの項をN-Triples形式の文字列に変換する
+    """
+    if isinstance(term, Literal):
+        return literal(str(term), datatype=term.datatype, lang=term.language)
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    return uri(str(term))
+
+
+class SQLiteTripleStore(Store):
+    """
+    SQLiteに保存する永続トリプルストア（rdflibのストアプラグイン）
+
+    項はN-Triples形式の文字列として辞書化し、トリプルは整数IDの組として
+    SPO/POS/OSPの3つの索引で管理する。起動のたびにTurtleを解析し直す必要がない。
+    変更は commit() または close() の時点で確定する。
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    def __init__(self, configuration: Optional[str] = None, identifier=None):
+        self._conn: Optional[sqlite3.Connection] = None
+        self._term_ids = {}
+        self._decode = lru_cache(maxsize=200000)(self._decode_uncached)
+        super().__init__(configuration, identifier)
+
+    def open(self, configuration: str, create: bool = True) -> int:
+        if not create and not os.path.exists(configuration):
+            return NO_STORE
+        # 接続はスレッド間で共有されうるが、同時に使うのは1スレッドだけとする
+        self._conn = sqlite3.connect(configuration, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False) -> None:
+        # スクリプトから使いやすいよう、閉じる時は常に確定させる
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+        self._term_ids.clear()
+        self._decode.cache_clear()
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+        # 取り消した項のidは再利用されるので、idから項を引くキャッシュも捨てる
+        self._term_ids.clear()
+        self._decode.cache_clear()
+
+    def destroy(self, configuration: str) -> None:
+        self.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(configuration + suffix):
+                os.remove(configuration + suffix)
+
+    # 項の辞書化
+
+    def _term_id(self, n3: str, create: bool) -> Optional[int]:
+        term_id = self._term_ids.get(n3)
+        if term_id is not None:
+            return term_id
+        row = self._conn.execute("SELECT id FROM terms WHERE n3 = ?", (n3,)).fetchone()
+        if row:
+            term_id = row[0]
+        elif create:
+            term_id = self._conn.execute("INSERT INTO terms (n3) VALUES (?)", (n3,)).lastrowid
+        else:
+            return None
+        self._term_ids[n3] = term_id
+        return term_id
+
+    def _decode_uncached(self, term_id: int):
+        n3 = self._conn.execute("SELECT n3 FROM terms WHERE id = ?", (term_id,)).fetchone()[0]
+        return from_n3(n3)
+
+    # トリプルの追加・削除・検索
+
+    def add(self, triple, context, quoted: bool = False) -> None:
+        s, p, o = triple
+        self.add_encoded([(encode_term(s), encode_term(p), encode_term(o))])
+        Store.add(self, triple, context, quoted)
+
+    def add_encoded(self, triples: Iterable[Triple]) -> int:
+        """
+        N-Triples形式の項の組をまとめて追加する（lod_writerの出力をそのまま受け付ける）
+        """
+        rows = [
+            (self._term_id(s, True), self._term_id(p, True), self._term_id(o, True))
+            for s, p, o in triples
+        ]
+        self._conn.executemany("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def _where(self, pattern) -> Optional[Tuple[str, list]]:
+        clauses, params = [], []
+        for column, term in zip(('s', 'p', 'o'), pattern):
+            if term is None:
+                continue
+            term_id = self._term_id(encode_term(term), False)
+            if term_id is None:
+                return None
+            clauses.append(f"{column} = ?")
+            params.append(term_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def remove(self, triple, context=None) -> None:
+        where = self._where(triple)
+        if where is None:
+            return
+        self._conn.execute(f"DELETE FROM triples{where[0]}", where[1])
+
+    def triples(self, triple_pattern, context=None) -> Iterator:
+        where = self._where(triple_pattern)
+        if where is None:
+            return
+        # SQLiteが束縛された列に応じてSPO/POS/OSPの索引を選ぶ
+        cursor = self._conn.execute(f"SELECT s, p, o FROM triples{where[0]}", where[1])
+        for s, p, o in cursor:
+            yield (self._decode(s), self._decode(p), self._decode(o)), iter(())
+
+    def __len__(self, context=None) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # 名前空間
+
+    def bind(self, prefix: str, namespace, override: bool = True) -> None:
+        verb = "INSERT OR REPLACE" if override else "INSERT OR IGNORE"
+        self._conn.execute(f"{verb} INTO namespaces (prefix, uri) VALUES (?, ?)", (prefix, str(namespace)))
+
+    def namespace(self, prefix: str):
+        from rdflib import URIRef
+        row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace) -> Optional[str]:
+        row = self._conn.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        from rdflib import URIRef
+        for prefix, ns in self._conn.execute("SELECT prefix, uri FROM namespaces").fetchall():
+            yield prefix, URIRef(ns)
+
+
+plugin.register(STORE_NAME, Store, 'lod_store', 'SQLiteTripleStore')
+
+
+def open_game_graph(path: str, create: bool = True) -> Graph:
+    """
+    永続ストアを開いてrdflibのGraphとして返す
+    """
+    graph = Graph(store=STORE_NAME)
+    graph.open(path, create=create)
+    for prefix, ns in PREFIXES.items():
+        graph.bind(prefix, ns, override=True, replace=True)
+    return graph
+
+
+def load_file(path: str, store_path: str, format: Optional[str] = None) -> int:
+    """
+    Turtle/N-Triplesファイルを永続ストアに一度だけ取り込む
+    """
+    graph = open_game_graph(store_path)
+    try:
+        # 1トリプルずつストアに追加するより、解析後にまとめて登録する方が速い
+        parsed = Graph().parse(path, format=format)
+        graph.store.add_encoded(
+            (encode_term(s), encode_term(p), encode_term(o)) for s, p, o in parsed
+        )
+        return len(graph)
+    finally:
+        graph.close()
+
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else 'steam_games_LOD.ttl'
+    store_path = sys.argv[2] if len(sys.argv) > 2 else 'steam_games.sqlite'
+
+    try:
+        count = load_file(input_file, store_path)
+        print(f"{input_file} を {store_path} に取り込みました。（{count}トリプル）")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
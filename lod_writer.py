@@ -0,0 +1,273 @@
+import re
+from typing import Dict, IO, Iterable, List, Optional, Tuple, Union
+
+# 名前空間の定義
+EX = "https://example.com/games/"
+SCHEMA = "http://schema.org/"
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+# 出力時に使用する接頭辞（最初から正しい名前で書き出す）
+PREFIXES = {
+    "ex": EX,
+    "genre": EX + "genre/",
+    "language": EX + "language/",
+    "mode": EX + "multiplayerMode/",
+    "org": EX + "organization/",
+    "series": EX + "series/",
+    "rdf": RDF,
+    "rdfs": RDFS,
+    "schema": SCHEMA,
+    "xsd": XSD,
+}
+
+# 共有リソース化する値の種類ごとの (名前空間, クラス)
+RESOURCE_KINDS = {
+    "genre": (EX + "genre/", EX + "Genre"),
+    "language": (EX + "language/", SCHEMA + "Language"),
+    "multiplayerMode": (EX + "multiplayerMode/", EX + "MultiplayerMode"),
+    "organization": (EX + "organization/", SCHEMA + "Organization"),
+    "series": (EX + "series/", SCHEMA + "VideoGameSeries"),
+}
+
+RDF_TYPE = f"<{RDF}type>"
+
+# トリプルの各項はN-Triples形式でエンコード済みの文字列で表す
+Triple = Tuple[str, str, str]
+
+_ESCAPES = {
+    '\\': '\\\\',
+    '"': '\\"',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\t': '\\t',
+}
+_ESCAPE_RE = re.compile(r'[\\"\n\r\t]')
+_INTEGER_RE = re.compile(r'^[+-]?[0-9]+$')
+_DECIMAL_RE = re.compile(r'^[+-]?[0-9]*\.[0-9]+$')
+
+# TurtleのPN_CHARS_BASEのうちASCII以外の範囲
+_PN_CHARS_RANGES = (
+    (0x00C0, 0x00D6), (0x00D8, 0x00F6), (0x00F8, 0x02FF), (0x0370, 0x037D),
+    (0x037F, 0x1FFF), (0x200C, 0x200D), (0x2070, 0x218F), (0x2C00, 0x2FEF),
+    (0x3001, 0xD7FF), (0xF900, 0xFDCF), (0xFDF0, 0xFFFD), (0x10000, 0xEFFFF),
+)
+_LOCAL_NAME_CHARS = ('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_')
+_PERCENT_RE = re.compile(r'%[0-9A-Fa-f]{2}')
+
+
+def _is_name_char(ch: str) -> bool:
+    if ch in _LOCAL_NAME_CHARS:
+        return True
+    code = ord(ch)
+    return any(lo <= code <= hi for lo, hi in _PN_CHARS_RANGES)
+
+
+def _is_local_name(local: str) -> bool:
+    """
+    接頭辞付き名前のローカル部として使えるかどうか
+    """
+    # パーセントエンコードは1文字分として扱う
+    chars = _PERCENT_RE.sub('_', local)
+    if not chars or chars[0] == '-':
+        return False
+    return all(_is_name_char(ch) or ch == '-' for ch in chars)
+
+
+def resource_name(label: str) -> str:
+    """
+    ラベルをIRIのローカル名に変換する
+
+    Turtleの接頭辞付き名前にそのまま使える文字は残し、それ以外（空白や記号）は
+    UTF-8のパーセントエンコードにする。同じラベルは常に同じ名前になる。
+    """
+    parts = []
+    for i, ch in enumerate(label):
+        if _is_name_char(ch) or (ch == '-' and i > 0):
+            parts.append(ch)
+        else:
+            parts.append(''.join(f"%{b:02X}" for b in ch.encode('utf-8')))
+    return ''.join(parts)
+
+
+def uri(value: str) -> str:
+    """
+    IRIをN-Triples形式の項に変換する
+    """
+    return f"<{value}>"
+
+
+def literal(value, datatype: Optional[str] = None, lang: Optional[str] = None) -> str:
+    """
+    値をN-Triples形式のリテラルに変換する
+    """
+    text = _ESCAPE_RE.sub(lambda m: _ESCAPES[m.group(0)], str(value))
+    if datatype:
+        return f'"{text}"^^<{datatype}>'
+    if lang:
+        return f'"{text}"@{lang}'
+    return f'"{text}"'
+
+
+class ResourceDictionary:
+    """
+    ジャンル・言語・開発元などのラベルを共有リソースのIRIに対応づけるインターン辞書
+
+    変換中に使われたリソースを記録しておき、最後に rdf:type と rdfs:label の
+    定義トリプルを一度だけ書き出す。
+    """
+
+    def __init__(self):
+        self.resources: Dict[Tuple[str, str], str] = {}
+
+    def __len__(self) -> int:
+        return len(self.resources)
+
+    def intern(self, kind: str, label: str) -> str:
+        key = (kind, label)
+        resource = self.resources.get(key)
+        if resource is None:
+            namespace = RESOURCE_KINDS[kind][0]
+            resource = uri(namespace + resource_name(label))
+            self.resources[key] = resource
+        return resource
+
+    def update(self, keys: Iterable[Tuple[str, str]]) -> None:
+        for kind, label in keys:
+            self.intern(kind, label)
+
+    def clear(self) -> None:
+        self.resources.clear()
+
+    def iter_triples(self, keys: Optional[Iterable[Tuple[str, str]]] = None) -> Iterable[Triple]:
+        """
+        リソースの定義トリプルをIRI順に生成する
+        """
+        if keys is None:
+            items = self.resources.items()
+        else:
+            items = [(key, self.intern(*key)) for key in keys]
+        for (kind, label), resource in sorted(items, key=lambda item: item[1]):
+            yield (resource, RDF_TYPE, uri(RESOURCE_KINDS[kind][1]))
+            yield (resource, uri(RDFS + 'label'), literal(label))
+
+
+class LODStreamWriter:
+    """
+    トリプルをグラフに保持せず、ゲーム単位でN-Triples/Turtleとして書き出すライター
+    """
+
+    def __init__(self, destination: Union[str, IO[str]], format: str = 'turtle',
+                 prefixes: Optional[Dict[str, str]] = None, header: bool = True):
+        if format not in ('turtle', 'nt'):
+            raise ValueError(f"未対応の出力形式です: {format}")
+        self.format = format
+        self.prefixes = dict(PREFIXES if prefixes is None else prefixes)
+        # 長い名前空間から順に照合する
+        self._namespaces = sorted(
+            ((ns, prefix) for prefix, ns in self.prefixes.items()),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+        if isinstance(destination, str):
+            self._fp = open(destination, 'w', encoding='utf-8')
+            self._owns_fp = True
+        else:
+            self._fp = destination
+            self._owns_fp = False
+        self.triple_count = 0
+        # シャード出力など接頭辞宣言が不要な場合は header=False を指定する
+        self._header_written = not header
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write_header(self) -> None:
+        """
+        Turtleの接頭辞宣言を書き出す（N-Triplesでは何もしない）
+        """
+        if self._header_written:
+            return
+        self._header_written = True
+        if self.format == 'turtle':
+            for prefix, ns in self.prefixes.items():
+                self._fp.write(f"@prefix {prefix}: <{ns}> .\n")
+            self._fp.write("\n")
+
+    def write_triples(self, triples: Iterable[Triple]) -> None:
+        """
+        トリプル列を主語ごとにまとめて書き出す
+        """
+        groups: Dict[str, List[Tuple[str, str]]] = {}
+        for s, p, o in triples:
+            groups.setdefault(s, []).append((p, o))
+        for subject, pairs in groups.items():
+            self.write_subject(subject, pairs)
+
+    def write_subject(self, subject: str, pairs: Iterable[Tuple[str, str]]) -> None:
+        """
+        1つの主語に属する述語・目的語をまとめて書き出す
+        """
+        self.write_header()
+        predicates: Dict[str, set] = {}
+        for p, o in pairs:
+            predicates.setdefault(p, set()).add(o)
+        if not predicates:
+            return
+
+        # rdflibと同じく rdf:type を先頭にし、残りはIRI順に並べる
+        ordered = sorted(predicates, key=lambda p: (p != RDF_TYPE, p))
+
+        if self.format == 'nt':
+            lines = []
+            for p in ordered:
+                for o in sorted(predicates[p]):
+                    lines.append(f"{subject} {p} {o} .\n")
+            self._fp.write(''.join(lines))
+            self.triple_count += len(lines)
+            return
+
+        parts = []
+        for p in ordered:
+            objects = sorted(predicates[p])
+            self.triple_count += len(objects)
+            name = 'a' if p == RDF_TYPE else self._shorten(p)
+            rendered = ",\n        ".join(self._turtle_term(o) for o in objects)
+            parts.append(f"{name} {rendered}")
+        self._fp.write(f"{self._shorten(subject)} " + " ;\n    ".join(parts) + " .\n\n")
+
+    def close(self) -> None:
+        self.write_header()
+        if self._owns_fp:
+            self._fp.close()
+        else:
+            self._fp.flush()
+
+    def _shorten(self, term: str) -> str:
+        """
+        IRIを接頭辞付きの名前に短縮する（短縮できなければそのまま）
+        """
+        iri = term[1:-1]
+        for ns, prefix in self._namespaces:
+            if iri.startswith(ns):
+                local = iri[len(ns):]
+                if _is_local_name(local):
+                    return f"{prefix}:{local}"
+        return term
+
+    def _turtle_term(self, term: str) -> str:
+        if term.startswith('<'):
+            return self._shorten(term)
+        if term.endswith('>') and '"^^<' in term:
+            lexical, datatype = term.rsplit('^^', 1)
+            value = lexical[1:-1]
+            if datatype == f"<{XSD}integer>" and _INTEGER_RE.match(value):
+                return value
+            if datatype == f"<{XSD}decimal>" and _DECIMAL_RE.match(value):
+                return value
+            return f"{lexical}^^{self._shorten(datatype)}"
+        return term
@@ -0,0 +1,134 @@
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, Optional
+
+MAGIC = b'NEGAPP\x00\x01'
+_HEADER = struct.Struct('<8sQ')
+
+# 除外理由（0は未登録）。ストアAPIの type が game 以外のものと、存在しないアプリ
+REASONS = ('not_found', 'dlc', 'music', 'video', 'demo', 'mod', 'advertising', 'application', 'tool', 'hardware', 'other')
+_REASON_CODES = {reason: code for code, reason in enumerate(REASONS, 1)}
+
+# 理由ごとの再確認までの日数（公開前のアプリは存在しない扱いになるので短め）
+REVERIFY_DAYS = {
+    'not_found': 30,
+    'demo': 90,
+    'other': 90,
+}
+DEFAULT_REVERIFY_DAYS = 180
+
+
+def reason_for_type(app_type: Optional[str]) -> str:
+    """
+    appdetails の type から除外理由を決める
+    """
+    app_type = (app_type or '').lower()
+    if app_type in ('series', 'episode'):
+        return 'video'
+    return app_type if app_type in _REASON_CODES else 'other'
+
+
+class NegativeCache:
+    """
+    ゲームではない・存在しないappidを、理由と確認日と共に保存する永続キャッシュ
+
+    appidをそのまま添字にした2つの配列（理由コード1バイト、確認日2バイト）で持つため、
+    数百万件のappidでも十数MBに収まり、参照は配列の添字アクセスだけで済む。
+    確認日はUNIX時間の日数で保存する。
+    """
+
+    def __init__(self, path: str = 'negative_appids.bin'):
+        self.path = path
+        self.reasons = array('B')
+        self.days = array('H')
+        self.dirty = False
+        try:
+            with open(path, 'rb') as f:
+                magic, size = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != MAGIC:
+                    raise ValueError(f"除外キャッシュの形式が正しくありません: {path}")
+                self.reasons.fromfile(f, size)
+                self.days.fromfile(f, size)
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, appid) -> bool:
+        appid = int(appid)
+        return appid < len(self.reasons) and self.reasons[appid] != 0
+
+    def __len__(self) -> int:
+        return len(self.reasons) - self.reasons.count(0)
+
+    def _grow(self, appid: int) -> None:
+        if appid >= len(self.reasons):
+            extra = appid + 1 - len(self.reasons)
+            # 追加のたびに伸ばさないよう、余裕を持って確保する
+            extra = max(extra, len(self.reasons) // 4)
+            self.reasons.extend(bytes(extra))
+            self.days.frombytes(bytes(extra * self.days.itemsize))
+
+    def add(self, appid, reason: str, now: Optional[float] = None) -> None:
+        appid = int(appid)
+        now = time.time() if now is None else now
+        self._grow(appid)
+        self.reasons[appid] = _REASON_CODES[reason]
+        self.days[appid] = int(now // 86400)
+        self.dirty = True
+
+    def remove(self, appid) -> None:
+        appid = int(appid)
+        if appid in self:
+            self.reasons[appid] = 0
+            self.days[appid] = 0
+            self.dirty = True
+
+    def reason(self, appid) -> Optional[str]:
+        appid = int(appid)
+        if appid not in self:
+            return None
+        return REASONS[self.reasons[appid] - 1]
+
+    def checked_at(self, appid) -> Optional[float]:
+        appid = int(appid)
+        return self.days[appid] * 86400.0 if appid in self else None
+
+    def should_skip(self, appid, now: Optional[float] = None) -> bool:
+        """
+        除外済みで、まだ再確認の時期になっていなければ True
+        """
+        appid = int(appid)
+        if appid >= len(self.reasons):
+            return False
+        code = self.reasons[appid]
+        if code == 0:
+            return False
+        now = time.time() if now is None else now
+        reverify = REVERIFY_DAYS.get(REASONS[code - 1], DEFAULT_REVERIFY_DAYS)
+        return now // 86400 - self.days[appid] < reverify
+
+    def counts(self) -> Dict[str, int]:
+        return {reason: self.reasons.count(code) for reason, code in _REASON_CODES.items()}
+
+    def save(self) -> None:
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(self.reasons)))
+            self.reasons.tofile(f)
+            self.days.tofile(f)
+        os.replace(temp_file, self.path)
+        self.dirty = False
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else 'negative_appids.bin'
+    cache = NegativeCache(path)
+    print(f"{path}: {len(cache)}件")
+    for reason, count in cache.counts().items():
+        if count:
+            print(f"  {reason}: {count}")
+
+if __name__ == "__main__":
+    main()
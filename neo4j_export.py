@@ -0,0 +1,381 @@
+import csv
+import json
+import os
+import re
+import sys
+import time
+from datetime import date
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from lod_writer import EX, RDFS, RESOURCE_KINDS, SCHEMA
+from normalize import normalize_game
+
+# ノードの種類ごとの (IDスペース兼ラベル, ファイル名)
+NODE_KINDS = {
+    'organization': ('Organization', 'organizations'),
+    'genre': ('Genre', 'genres'),
+    'category': ('Category', 'categories'),
+    'language': ('Language', 'languages'),
+    'series': ('Series', 'series'),
+}
+
+# 関係の種類ごとの (終点のノードの種類, 追加の列)。始点はすべてゲーム
+RELATIONSHIPS = {
+    'DEVELOPED_BY': ('organization', ()),
+    'PUBLISHED_BY': ('organization', ()),
+    'HAS_GENRE': ('genre', ()),
+    'HAS_CATEGORY': ('category', ()),
+    'SUPPORTS_LANGUAGE': ('language', ()),
+    'PART_OF': ('series', ()),
+    'SIMILAR_TO': ('game', ('score:float',)),
+}
+
+GAME_HEADER = ['appid:ID(Game)', 'title', 'price:float', 'currency', 'release_date:date',
+               'review_count:int', 'review_score:float', ':LABEL']
+
+# 開発元・販売元は同じ会社が両方を兼ねることが多いので、1つのノードに役割のラベルを付ける
+ROLE_LABELS = {'DEVELOPED_BY': 'Developer', 'PUBLISHED_BY': 'Publisher'}
+
+DEFAULT_CHUNK_SIZE = 10000
+
+_NT_LINE = re.compile(r'^(<[^>]*>) (<[^>]*>) (.*) \.$')
+_NT_ESCAPES = {'\\"': '"', '\\\\': '\\', '\\n': '\n', '\\r': '\r', '\\t': '\t'}
+
+
+class GraphRecord(NamedTuple):
+    """
+    1ゲーム分のノードの属性と、他のノードへの関係 (関係の種類, 終点のキー, 追加の値)
+    """
+    appid: int
+    properties: Tuple
+    relations: Tuple[Tuple[str, str, Tuple], ...]
+
+
+class NodeDictionary:
+    """
+    共有ノード（開発元・ジャンルなど）のキーを整数IDに対応づける辞書
+
+    同じキーのノードは1つにまとめ、ファイルに書き出すときの名前と、
+    開発元・販売元の役割のラベルも記録する。
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, Dict[str, int]] = {kind: {} for kind in NODE_KINDS}
+        self.names: Dict[str, Dict[str, str]] = {kind: {} for kind in NODE_KINDS}
+        self.roles: Dict[str, set] = {}
+
+    def add(self, kind: str, key: str, relation: Optional[str] = None) -> int:
+        ids = self.ids[kind]
+        node_id = ids.get(key)
+        if node_id is None:
+            node_id = ids[key] = len(ids) + 1
+        if relation in ROLE_LABELS:
+            self.roles.setdefault(key, set()).add(ROLE_LABELS[relation])
+        return node_id
+
+    def add_record(self, record: GraphRecord) -> None:
+        for relation, key, _ in record.relations:
+            kind = RELATIONSHIPS[relation][0]
+            if kind != 'game':
+                self.add(kind, key, relation)
+
+    def rows(self, kind: str) -> Iterator[List]:
+        label = NODE_KINDS[kind][0]
+        names = self.names[kind]
+        for key, node_id in self.ids[kind].items():
+            labels = [label] + sorted(self.roles.get(key, ())) if kind == 'organization' else [label]
+            yield [node_id, names.get(key, key), ';'.join(labels)]
+
+
+def _iso_date(value: Optional[str]) -> str:
+    try:
+        return date.fromisoformat(value).isoformat() if value else ''
+    except ValueError:
+        return ''
+
+
+def _clean(text) -> str:
+    # 改行を含む値は --multiline-fields が必要になるため空白にする
+    return ' '.join(str(text).split()) if text is not None else ''
+
+
+def game_record(game_data: dict, similar: Iterable[Tuple[int, float]] = ()) -> Optional[GraphRecord]:
+    """
+    カタログのゲームレコードをノードの属性と関係に変換する（appid が無ければ None）
+    """
+    appid = game_data.get('steam_appid') or game_data.get('app_id')
+    if appid is None:
+        return None
+    fields = normalize_game(game_data)
+    stats = game_data.get('review_stats') or {}
+    properties = (
+        _clean(game_data.get('title') or game_data.get('name')),
+        '' if fields.price is None else str(fields.price),
+        fields.currency or '',
+        _iso_date(fields.release_date),
+        stats.get('total_reviews', game_data.get('total_reviews', '')),
+        stats.get('review_score', ''),
+    )
+
+    relations = []
+    for relation, values in (
+        ('DEVELOPED_BY', game_data.get('developer') or []),
+        ('PUBLISHED_BY', game_data.get('publisher') or []),
+        ('HAS_GENRE', game_data.get('genres') or []),
+        ('HAS_CATEGORY', game_data.get('categories') or []),
+        ('SUPPORTS_LANGUAGE', fields.languages),
+    ):
+        relations.extend((relation, value, ()) for value in dict.fromkeys(values) if value)
+
+    series_info = game_data.get('series_info') or {}
+    if series_info.get('is_series') and series_info.get('series_name'):
+        relations.append(('PART_OF', series_info['series_name'], ()))
+    relations.extend(('SIMILAR_TO', str(other), (round(score, 4),)) for other, score in similar)
+
+    return GraphRecord(int(appid), properties, tuple(relations))
+
+
+def _literal_value(term: str) -> str:
+    lexical = term[1:term.rindex('"')]
+    return re.sub(r'\\["\\nrt]', lambda m: _NT_ESCAPES[m.group(0)], lexical)
+
+
+# N-Triplesの述語と (関係の種類, ゲームの属性の位置)
+_NT_RELATIONS = {
+    f"<{SCHEMA}creator>": 'DEVELOPED_BY',
+    f"<{SCHEMA}publisher>": 'PUBLISHED_BY',
+    f"<{SCHEMA}genre>": 'HAS_GENRE',
+    f"<{EX}multiplayerModes>": 'HAS_CATEGORY',
+    f"<{SCHEMA}inLanguage>": 'SUPPORTS_LANGUAGE',
+    f"<{SCHEMA}isPartOf>": 'PART_OF',
+    f"<{SCHEMA}isSimilarTo>": 'SIMILAR_TO',
+}
+_NT_PROPERTIES = {
+    f"<{SCHEMA}name>": 0,
+    f"<{SCHEMA}price>": 1,
+    f"<{SCHEMA}datePublished>": 3,
+    f"<{SCHEMA}reviewCount>": 4,
+}
+
+
+def _ntriples_groups(filename: str) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+    """
+    主語ごとにまとまったN-Triples（LODStreamWriterの出力）を (主語, [(述語, 目的語)]) の列として読む
+    """
+    subject, pairs = None, []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = _NT_LINE.match(line.rstrip('\n'))
+            if not match:
+                continue
+            s, p, o = match.groups()
+            if s != subject:
+                if subject is not None:
+                    yield subject, pairs
+                subject, pairs = s, []
+            pairs.append((p, o))
+    if subject is not None:
+        yield subject, pairs
+
+
+def read_ntriples(filename: str, nodes: NodeDictionary) -> Iterator[GraphRecord]:
+    """
+    RDF出力（N-Triples）からゲームの記録を読み出し、共有ノードの名前を nodes に登録する
+
+    共有ノードのキーにはIRIを使い、名前には rdfs:label を使う。
+    """
+    label = f"<{RDFS}label>"
+    namespaces = [(namespace, kind) for kind, (namespace, _) in RESOURCE_KINDS.items()]
+    for subject, pairs in _ntriples_groups(filename):
+        local = subject[1:-1][len(EX):] if subject.startswith(f"<{EX}") else ''
+        if local.isdigit():
+            properties = ['', '', '', '', '', '']
+            relations = []
+            for p, o in pairs:
+                if p in _NT_PROPERTIES and o.startswith('"'):
+                    properties[_NT_PROPERTIES[p]] = _literal_value(o)
+                elif p in _NT_RELATIONS:
+                    key = o[1:-1]
+                    if _NT_RELATIONS[p] == 'SIMILAR_TO':
+                        # N-Triplesには類似度が無いので空欄にする
+                        relations.append(('SIMILAR_TO', key[len(EX):], ('',)))
+                    else:
+                        relations.append((_NT_RELATIONS[p], key, ()))
+            properties[0] = _clean(properties[0])
+            properties[3] = _iso_date(properties[3])
+            yield GraphRecord(int(local), tuple(properties), tuple(relations))
+            continue
+
+        for p, o in pairs:
+            if p == label:
+                for namespace, kind in namespaces:
+                    if subject[1:-1].startswith(namespace):
+                        # multiplayerMode はカテゴリのノードとして扱う
+                        kind = 'category' if kind == 'multiplayerMode' else kind
+                        nodes.names[kind][subject[1:-1]] = _literal_value(o)
+                        break
+
+
+_ids: Optional[Dict[str, Dict[str, int]]] = None
+
+
+def _init_worker(ids: Dict[str, Dict[str, int]]) -> None:
+    global _ids
+    _ids = ids
+
+
+def _write_part(task: Tuple[int, List[GraphRecord], str]) -> Dict[str, int]:
+    """
+    ゲームのチャンクを、ゲームノードと関係ごとのCSVの断片に書き出す
+    """
+    index, records, directory = task
+    counts = {}
+    writers, handles = {}, []
+    try:
+        for name in ['games'] + list(RELATIONSHIPS):
+            handle = open(os.path.join(directory, f"{name.lower()}_part{index:04d}.csv"), 'w', encoding='utf-8', newline='')
+            handles.append(handle)
+            writers[name] = csv.writer(handle)
+            counts[name] = 0
+
+        for record in records:
+            writers['games'].writerow((record.appid,) + record.properties + ('Game',))
+            counts['games'] += 1
+            for relation, key, extra in record.relations:
+                kind = RELATIONSHIPS[relation][0]
+                end = int(key) if kind == 'game' else _ids[kind][key]
+                writers[relation].writerow((record.appid, end, relation) + extra)
+                counts[relation] += 1
+    finally:
+        for handle in handles:
+            handle.close()
+    return counts
+
+
+def drop_dangling(records: List[GraphRecord]) -> List[GraphRecord]:
+    """
+    出力に含まれないゲームへの類似関係を除く（neo4j-admin は終点の無い関係をエラーにする）
+    """
+    appids = {record.appid for record in records}
+    return [
+        record._replace(relations=tuple(
+            relation for relation in record.relations
+            if relation[0] != 'SIMILAR_TO' or int(relation[1]) in appids
+        ))
+        for record in records
+    ]
+
+
+def write_import_files(records: List[GraphRecord], nodes: NodeDictionary, directory: str,
+                       workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, List[str]]:
+    """
+    neo4j-admin database import 用のCSVを書き出し、ラベル・関係の種類ごとのファイル一覧を返す
+
+    ヘッダーは別ファイルにし、ゲームと関係の本体はチャンクごとにプロセスプールで並列に書き出す。
+    """
+    os.makedirs(directory, exist_ok=True)
+    for record in records:
+        nodes.add_record(record)
+
+    def write_csv(name: str, rows: Iterable) -> str:
+        path = os.path.join(directory, f"{name}.csv")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerows(rows)
+        return path
+
+    files: Dict[str, List[str]] = {'nodes:Game': [write_csv('games_header', [GAME_HEADER])]}
+    for kind, (label, filename) in NODE_KINDS.items():
+        header = write_csv(f"{filename}_header", [[f"id:ID({label})", 'name', ':LABEL']])
+        files[f"nodes:{label}"] = [header, write_csv(filename, nodes.rows(kind))]
+    for relation, (kind, extra) in RELATIONSHIPS.items():
+        end = 'Game' if kind == 'game' else NODE_KINDS[kind][0]
+        header = [':START_ID(Game)', f":END_ID({end})", ':TYPE'] + list(extra)
+        files[f"relationships:{relation}"] = [write_csv(f"{relation.lower()}_header", [header])]
+
+    tasks = [(index, records[start:start + chunk_size], directory)
+             for index, start in enumerate(range(0, len(records), chunk_size))]
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers > 1:
+        with Pool(processes=workers, initializer=_init_worker, initargs=(nodes.ids,)) as pool:
+            list(pool.imap(_write_part, tasks))
+    else:
+        _init_worker(nodes.ids)
+        for task in tasks:
+            _write_part(task)
+
+    for index, _, _ in tasks:
+        files['nodes:Game'].append(os.path.join(directory, f"games_part{index:04d}.csv"))
+        for relation in RELATIONSHIPS:
+            files[f"relationships:{relation}"].append(os.path.join(directory, f"{relation.lower()}_part{index:04d}.csv"))
+    return files
+
+
+def import_command(files: Dict[str, List[str]], database: str = 'neo4j') -> str:
+    """
+    書き出したファイルを読み込む neo4j-admin のコマンド
+    """
+    options = [f"--{key.split(':')[0]}={key.split(':')[1]}={','.join(paths)}" for key, paths in files.items()]
+    return ' '.join(['neo4j-admin database import full', '--id-type=integer', '--overwrite-destination'] + options + [database])
+
+
+def export_catalog(games_data: List[dict], directory: str, workers: Optional[int] = None,
+                   similarity_path: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    ゲームJSONをNeo4jの一括インポート用CSVに変換する（類似索引があれば SIMILAR_TO も書き出す）
+    """
+    similarity = None
+    if similarity_path:
+        from similarity import SimilarityIndex
+        similarity = SimilarityIndex.load(similarity_path)
+    appids = set()
+    records = []
+    for game_data in games_data:
+        appid = game_data.get('steam_appid') or game_data.get('app_id')
+        # appid の無いゲームはノードのidを決められないので書き出さない
+        if appid is None:
+            continue
+        appid = int(appid)
+        if appid in appids:
+            continue
+        appids.add(appid)
+        similar = similarity.similar(appid) if similarity is not None else ()
+        records.append(game_record(game_data, similar))
+
+    return write_import_files(drop_dangling(records), NodeDictionary(), directory, workers)
+
+
+def export_ntriples(filename: str, directory: str, workers: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    RDF出力（N-Triples）をNeo4jの一括インポート用CSVに変換する
+    """
+    nodes = NodeDictionary()
+    records = drop_dangling(list(read_ntriples(filename, nodes)))
+    return write_import_files(records, nodes, directory, workers)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python neo4j_export.py <games.json | steam_games.nt> [output_dir] [workers]")
+        return
+
+    input_file = sys.argv[1]
+    directory = sys.argv[2] if len(sys.argv) > 2 else 'neo4j_import'
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    try:
+        start = time.time()
+        if input_file.endswith('.nt'):
+            files = export_ntriples(input_file, directory, workers)
+        else:
+            with open(input_file, 'r', encoding='utf-8') as f:
+                games_data = json.load(f)
+            from similarity import DEFAULT_INDEX_FILE
+            similarity_path = DEFAULT_INDEX_FILE if os.path.exists(DEFAULT_INDEX_FILE) else None
+            files = export_catalog(games_data, directory, workers, similarity_path)
+        print(f"{directory} に書き出しました。（{time.time() - start:.1f}秒）")
+        print(import_command(files))
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import re
+import sys
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# 価格が無いことを表す文字列
+NO_PRICE = {'', '価格情報なし', 'N/A'}
+
+# 無料を表す文字列（小文字で比較）
+FREE_PRICES = {
+    '無料', '基本プレイ無料', 'free', 'free to play', 'free to play!', '免費', '免费',
+    '免费开玩', '무료', 'kostenlos', 'gratuit', 'gratis', 'бесплатно', 'darmowe',
+}
+
+# 通貨記号（長いものから順に照合する）
+CURRENCY_SYMBOLS = (
+    ('NT$', 'TWD'), ('HK$', 'HKD'), ('R$', 'BRL'), ('A$', 'AUD'), ('C$', 'CAD'),
+    ('CDN$', 'CAD'), ('Mex$', 'MXN'), ('CHF', 'CHF'), ('pуб', 'RUB'), ('руб', 'RUB'),
+    ('zł', 'PLN'), ('¥', 'JPY'), ('￥', 'JPY'), ('€', 'EUR'), ('£', 'GBP'),
+    ('₩', 'KRW'), ('₹', 'INR'), ('₺', 'TRY'), ('$', 'USD'),
+)
+
+ENGLISH_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+_NUMBER_RE = re.compile(r'\d[\d.,\s\u00a0\u202f\']*')
+# 日本語・中国語・韓国語の「年月日」表記
+_CJK_DATE_RE = re.compile(r'(\d{4})\s*[年년]\s*(\d{1,2})\s*[月월]\s*(\d{1,2})\s*[日일]?')
+_ISO_DATE_RE = re.compile(r'(\d{4})[-/.]\s*(\d{1,2})[-/.]\s*(\d{1,2})\.?$')
+_DMY_DATE_RE = re.compile(r'(\d{1,2})[./](\d{1,2})[./](\d{4})$')
+_DAY_MONTH_YEAR_RE = re.compile(r'(\d{1,2})\s+([A-Za-z]{3})[A-Za-z]*\.?,?\s+(\d{4})$')
+_MONTH_DAY_YEAR_RE = re.compile(r'([A-Za-z]{3})[A-Za-z]*\.?\s+(\d{1,2}),?\s+(\d{4})$')
+_TAG_RE = re.compile(r'<[^>]*>')
+
+# 各正規化関数のキャッシュの上限件数。価格・日付・言語の文字列は種類が限られるので
+# 通常はすべて収まるが、常駐プロセスで未知の文字列が増え続けても使用量が際限なく増えないようにする
+CACHE_SIZE = 16384
+
+
+class GameFields(NamedTuple):
+    """
+    ゲームデータから正規化した型付きの値
+    """
+    price: Optional[Decimal]
+    initial_price: Optional[Decimal]
+    discount_percent: int
+    currency: Optional[str]
+    release_date: Optional[str]
+    languages: Tuple[str, ...]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_price(raw: Optional[str]) -> Optional[Decimal]:
+    """
+    価格文字列を数値に変換します
+    例: "¥ 1,200" → 1200, "19,99€" → 19.99, "無料" → 0, "価格情報なし" → None
+    """
+    if raw is None:
+        return None
+    text = raw.strip()
+    if text in NO_PRICE:
+        return None
+    if text.lower() in FREE_PRICES:
+        return Decimal(0)
+
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return None
+    number = re.sub(r'[\s\u00a0\u202f\']', '', match.group(0)).rstrip('.,')
+
+    # 最後の区切り文字の後ろが2桁以下なら小数点、3桁なら桁区切りとみなす
+    last = max(number.rfind('.'), number.rfind(','))
+    if last >= 0 and len(number) - last - 1 <= 2:
+        integer = re.sub(r'[.,]', '', number[:last])
+        number = f"{integer}.{number[last + 1:]}"
+    else:
+        number = re.sub(r'[.,]', '', number)
+
+    try:
+        value = Decimal(number)
+    except InvalidOperation:
+        return None
+    if value == value.to_integral_value():
+        value = value.quantize(Decimal(1))
+    return value
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def detect_currency(raw: Optional[str]) -> Optional[str]:
+    """
+    価格文字列の通貨記号から通貨コードを推定します
+    """
+    if not raw:
+        return None
+    for symbol, code in CURRENCY_SYMBOLS:
+        if symbol in raw:
+            return code
+    return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(raw: Optional[str]) -> Optional[str]:
+    """
+    Steamの発売日表記を YYYY-MM-DD に変換します（解釈できなければ None）
+    例: "2023年5月30日", "30 May, 2023", "May 30, 2023", "2023년 5월 30일", "30.05.2023"
+    """
+    if not raw:
+        return None
+    text = raw.strip()
+
+    match = _CJK_DATE_RE.search(text)
+    if match:
+        year, month, day = (int(x) for x in match.groups())
+    else:
+        match = _ISO_DATE_RE.match(text)
+        if match:
+            year, month, day = (int(x) for x in match.groups())
+        elif _DMY_DATE_RE.match(text):
+            day, month, year = (int(x) for x in _DMY_DATE_RE.match(text).groups())
+        elif _DAY_MONTH_YEAR_RE.match(text):
+            day, month_name, year = _DAY_MONTH_YEAR_RE.match(text).groups()
+            month = ENGLISH_MONTHS.get(month_name.lower())
+            day, year = int(day), int(year)
+        elif _MONTH_DAY_YEAR_RE.match(text):
+            month_name, day, year = _MONTH_DAY_YEAR_RE.match(text).groups()
+            month = ENGLISH_MONTHS.get(month_name.lower())
+            day, year = int(day), int(year)
+        else:
+            return None
+
+    if not month or not 1 <= month <= 12 or not 1 <= day <= 31:
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_languages(raw: Optional[str]) -> Tuple[str, ...]:
+    """
+    supported_languages のHTMLを言語名のタプルに変換します
+    例: "英語<strong>*</strong>, 日本語<br><strong>*</strong>音声対応言語" → ("英語", "日本語")
+    """
+    if not raw:
+        return ()
+    # <br> 以降は「*音声対応言語」などの注記
+    text = re.split(r'<br\s*/?>', raw, maxsplit=1)[0]
+    text = _TAG_RE.sub('', text)
+    languages = []
+    for lang in text.split(','):
+        lang = lang.strip().rstrip('*').strip()
+        if lang and lang not in languages:
+            # 言語名は種類が少ないので、ゲームごとに別の文字列を持たないようにする
+            languages.append(sys.intern(lang))
+    return tuple(languages)
+
+
+def _price_strings(price) -> Tuple[Optional[str], Optional[str], int]:
+    """
+    収集スクリプトごとに異なる price の形から (最終価格, 定価, 割引率) を取り出す
+    """
+    if not isinstance(price, dict):
+        return (price if isinstance(price, str) else None), None, 0
+    final = price.get('final_formatted') or price.get('final')
+    initial = price.get('initial_formatted') or price.get('initial')
+    # Steam APIの price_overview そのままの場合、数値は100倍された最小単位
+    if not isinstance(final, str):
+        final = None if final is None else str(Decimal(final) / 100)
+    if not isinstance(initial, str):
+        initial = None if initial is None else str(Decimal(initial) / 100)
+    return final, initial, int(price.get('discount_percent') or 0)
+
+
+def normalize_game(game_data: dict) -> GameFields:
+    """
+    1ゲーム分の価格・発売日・対応言語を正規化する（同じ生文字列は一度しか解析しない）
+    """
+    final, initial, discount = _price_strings(game_data.get('price'))
+    release_date = game_data.get('release_date')
+    if isinstance(release_date, dict):
+        release_date = release_date.get('date')
+    currency = detect_currency(final)
+    if currency is None and isinstance(game_data.get('price'), dict):
+        currency = game_data['price'].get('currency')
+    return GameFields(
+        price=parse_price(final),
+        initial_price=parse_price(initial),
+        discount_percent=discount,
+        currency=currency,
+        release_date=parse_date(release_date),
+        languages=parse_languages(game_data.get('supported_languages')),
+    )
+
+
+def normalize_games(games_data: Iterable[dict]) -> List[GameFields]:
+    """
+    ゲーム一覧をまとめて正規化する
+
+    価格・日付・言語の生文字列は重複が多いため、先に一意な値だけを解析してから
+    各ゲームに割り当てる。
+    """
+    games_data = list(games_data)
+    prices, dates, languages = set(), set(), set()
+    for game_data in games_data:
+        final, initial, _ = _price_strings(game_data.get('price'))
+        prices.update((final, initial))
+        release_date = game_data.get('release_date')
+        dates.add(release_date.get('date') if isinstance(release_date, dict) else release_date)
+        languages.add(game_data.get('supported_languages'))
+
+    for raw in prices:
+        parse_price(raw)
+        detect_currency(raw)
+    for raw in dates:
+        parse_date(raw)
+    for raw in languages:
+        parse_languages(raw)
+
+    return [normalize_game(game_data) for game_data in games_data]
+
+
+def summarize_games(games_data: Iterable[dict]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    ジャンルごと・価格帯ごとのゲーム数を数えます
+    """
+    games_data = list(games_data)
+    genres_count: Dict[str, int] = {}
+    price_ranges = {"0-1000": 0, "1001-5000": 0, "5001-10000": 0, "10001+": 0}
+
+    for game, fields in zip(games_data, normalize_games(games_data)):
+        for genre in game.get("genres") or []:
+            genres_count[genre] = genres_count.get(genre, 0) + 1
+
+        price = fields.price or 0
+        if price <= 1000:
+            price_ranges["0-1000"] += 1
+        elif price <= 5000:
+            price_ranges["1001-5000"] += 1
+        elif price <= 10000:
+            price_ranges["5001-10000"] += 1
+        else:
+            price_ranges["10001+"] += 1
+
+    return genres_count, price_ranges
+
+
+def cache_info() -> Dict[str, object]:
+    """
+    各正規化関数のキャッシュ状況
+    """
+    return {
+        'price': parse_price.cache_info(),
+        'currency': detect_currency.cache_info(),
+        'date': parse_date.cache_info(),
+        'languages': parse_languages.cache_info(),
+    }
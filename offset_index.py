@@ -0,0 +1,274 @@
+import json
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterator, List, Optional, Tuple
+
+MAGIC = b'APPOFS\x00\x01'
+# マジック、元ファイルの大きさ、更新時刻（ナノ秒）、ゲーム数
+_HEADER = struct.Struct('<8sQqQ')
+INDEX_SUFFIX = '.offsets'
+
+_APPID_PATTERN = re.compile(rb'"(?:steam_appid|app_id)"\s*:\s*"?(\d+)')
+# json.dump(..., indent=2) で書いた配列の、最上位のオブジェクトの始まりと終わりの行
+_INDENTED_OBJECT = re.compile(rb'\n  ([{}])')
+# 汎用の走査で一度に復号する大きさ（オブジェクトがこれより大きければ広げる）
+SCAN_WINDOW = 1 << 24
+_SEPARATOR = re.compile(r'[\s,]*')
+
+
+def _appid(buf, start: int, end: int) -> Optional[int]:
+    match = _APPID_PATTERN.search(buf, start, end)
+    return int(match.group(1)) if match else None
+
+
+def _scan_jsonl(buf) -> Iterator[Tuple[int, int]]:
+    start, size = 0, len(buf)
+    while start < size:
+        end = buf.find(b'\n', start)
+        end = size if end < 0 else end
+        if buf[start:end].strip():
+            yield start, end
+        start = end + 1
+
+
+def _scan_indented_array(buf) -> Iterator[Tuple[int, int]]:
+    # 文字列中の改行は \n とエスケープされるので、生の改行は整形にしか現れない
+    start = None
+    for match in _INDENTED_OBJECT.finditer(buf):
+        if match.group(1) == b'{':
+            start = match.start(1)
+        elif start is not None:
+            yield start, match.end(1)
+            start = None
+
+
+def _scan_array(buf) -> Iterator[Tuple[int, int]]:
+    # 窓ごとに復号して raw_decode で要素を1つずつ読み、文字数をバイト数に換算する
+    decoder = json.JSONDecoder()
+    size = len(buf)
+    pos = buf.find(b'[') + 1
+    window = SCAN_WINDOW
+    while pos < size:
+        end = min(pos + window, size)
+        # UTF-8の文字の途中で切らない
+        while end < size and buf[end] & 0xC0 == 0x80:
+            end -= 1
+        text = bytes(buf[pos:end]).decode('utf-8')
+        i, consumed = 0, 0
+        while True:
+            # 区切りの空白とカンマはASCIIなので文字数とバイト数が同じ
+            j = _SEPARATOR.match(text, i).end()
+            consumed += j - i
+            i = j
+            if i >= len(text) or text[i] == ']':
+                if i < len(text):
+                    return
+                break
+            try:
+                _, element_end = decoder.raw_decode(text, i)
+            except json.JSONDecodeError:
+                break
+            length = len(text[i:element_end].encode('utf-8'))
+            if text[i] == '{':
+                yield pos + consumed, pos + consumed + length
+            consumed += length
+            i = element_end
+        if consumed == 0:
+            if end >= size:
+                return
+            window *= 2
+        pos += consumed
+
+
+def scan_objects(buf) -> Iterator[Tuple[int, int]]:
+    """
+    JSON配列またはJSONLの、ゲームごとのオブジェクトのバイト範囲 (開始, 終了) を順に返す
+    """
+    head = bytes(buf[:64]).lstrip()
+    if not head.startswith(b'['):
+        return _scan_jsonl(buf)
+    if bytes(buf[:64]).startswith(b'[\n  {'):
+        return _scan_indented_array(buf)
+    return _scan_array(buf)
+
+
+def build_index(data_path: str, index_path: Optional[str] = None) -> int:
+    """
+    結果ファイルを走査し、appid からバイト範囲を引く索引ファイルを作る（ゲーム数を返す）
+
+    同じappidが複数ある場合は最初のものを使う。
+    """
+    index_path = index_path or data_path + INDEX_SUFFIX
+    stat = os.stat(data_path)
+    entries = []
+    with open(data_path, 'rb') as f:
+        if stat.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                for start, end in scan_objects(buf):
+                    appid = _appid(buf, start, end)
+                    if appid is not None:
+                        entries.append((appid, len(entries), start, end - start))
+
+    entries.sort()
+    appids, offsets, lengths = array('Q'), array('Q'), array('Q')
+    for appid, _, offset, length in entries:
+        if appids and appids[-1] == appid:
+            continue
+        appids.append(appid)
+        offsets.append(offset)
+        lengths.append(length)
+
+    temp_file = index_path + '.tmp'
+    with open(temp_file, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, stat.st_size, stat.st_mtime_ns, len(appids)))
+        appids.tofile(f)
+        offsets.tofile(f)
+        lengths.tofile(f)
+    os.replace(temp_file, index_path)
+    return len(appids)
+
+
+class OffsetIndex:
+    """
+    結果ファイル（JSON配列・JSONL）をメモリマップで開き、appid で1ゲームだけを読み出す
+
+    索引は <ファイル名>.offsets に、appid の昇順の配列と、各ゲームのバイト位置・長さの
+    配列として保存する。引くときは索引もメモリマップして二分探索するだけなので、
+    ファイル全体を解析しない。元ファイルの大きさか更新時刻が索引の作成時と違えば
+    自動で作り直す。
+    """
+
+    def __init__(self, data_path: str, index_path: Optional[str] = None, auto_refresh: bool = True):
+        self.data_path = data_path
+        self.index_path = index_path or data_path + INDEX_SUFFIX
+        self.auto_refresh = auto_refresh
+        self._files = []
+        self._maps = []
+        self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _is_fresh(self, stat: os.stat_result) -> bool:
+        try:
+            with open(self.index_path, 'rb') as f:
+                magic, size, mtime_ns, _ = _HEADER.unpack(f.read(_HEADER.size))
+        except (FileNotFoundError, struct.error):
+            return False
+        return magic == MAGIC and size == stat.st_size and mtime_ns == stat.st_mtime_ns
+
+    def _open(self) -> None:
+        stat = os.stat(self.data_path)
+        if not self._is_fresh(stat):
+            build_index(self.data_path, self.index_path)
+        self._stat = (stat.st_size, stat.st_mtime_ns)
+
+        index_file = open(self.index_path, 'rb')
+        data_file = open(self.data_path, 'rb')
+        self._files = [index_file, data_file]
+        index_map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps = [index_map]
+        self._data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+        if stat.st_size:
+            self._maps.append(self._data)
+
+        count = _HEADER.unpack_from(index_map, 0)[3]
+        view = memoryview(index_map)[_HEADER.size:]
+        self._appids = view[:count * 8].cast('Q')
+        self._offsets = view[count * 8:count * 16].cast('Q')
+        self._lengths = view[count * 16:count * 24].cast('Q')
+        self._views = [view, self._appids, self._offsets, self._lengths]
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+        for f in self._files:
+            f.close()
+        self._files = []
+
+    def refresh(self) -> bool:
+        """
+        元ファイルが変わっていれば索引を作り直して開き直す（作り直したら True）
+        """
+        stat = os.stat(self.data_path)
+        if (stat.st_size, stat.st_mtime_ns) == self._stat:
+            return False
+        self.close()
+        self._open()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._appids)
+
+    def __contains__(self, appid) -> bool:
+        return self._position(int(appid)) is not None
+
+    def _position(self, appid: int) -> Optional[int]:
+        if self.auto_refresh:
+            self.refresh()
+        appids = self._appids
+        i = bisect_left(appids, appid)
+        return i if i < len(appids) and appids[i] == appid else None
+
+    def appids(self) -> Iterator[int]:
+        return iter(self._appids)
+
+    def get_bytes(self, appid) -> Optional[bytes]:
+        i = self._position(int(appid))
+        if i is None:
+            return None
+        offset = self._offsets[i]
+        return self._data[offset:offset + self._lengths[i]]
+
+    def get(self, appid) -> Optional[dict]:
+        """
+        1ゲーム分のデータを返す（無ければ None）
+        """
+        raw = self.get_bytes(appid)
+        return None if raw is None else json.loads(raw)
+
+    def sample(self, k: int, seed: Optional[int] = None) -> List[dict]:
+        """
+        無作為に選んだ k ゲームを読み出す
+        """
+        rng = random.Random(seed)
+        positions = rng.sample(range(len(self._appids)), min(k, len(self._appids)))
+        return [self.get(self._appids[i]) for i in positions]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python offset_index.py <games.json | games.jsonl> [appid ...]")
+        return
+
+    try:
+        start = time.perf_counter()
+        with OffsetIndex(sys.argv[1]) as index:
+            print(f"{sys.argv[1]}: {len(index)}ゲーム（索引の準備 {time.perf_counter() - start:.2f}秒）")
+            for appid in sys.argv[2:]:
+                start = time.perf_counter()
+                game_data = index.get(appid)
+                elapsed = (time.perf_counter() - start) * 1e6
+                if game_data is None:
+                    print(f"  {appid}: 見つかりません（{elapsed:.0f}µs）")
+                else:
+                    print(f"  {appid}: {game_data.get('title') or game_data.get('name')}（{elapsed:.0f}µs）")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
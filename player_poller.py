@@ -0,0 +1,275 @@
+import asyncio
+import heapq
+import json
+import random
+import ssl
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from timeseries import TimeSeriesStore
+
+API_HOST = 'api.steampowered.com'
+API_PATH = '/ISteamUserStats/GetNumberOfCurrentPlayers/v1/?appid={appid}'
+
+DEFAULT_INTERVAL = 15 * 60
+DEFAULT_CONCURRENCY = 32
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class KeepAliveConnection:
+    """
+    1本のTCP(TLS)接続を使い回してGETリクエストを送る最小限のHTTP/1.1クライアント
+    """
+
+    def __init__(self, host: str, port: int = 443, use_ssl: bool = True, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.ssl = ssl.create_default_context() if use_ssl else None
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def get(self, path: str) -> Tuple[int, bytes]:
+        try:
+            return await asyncio.wait_for(self._request(path), self.timeout)
+        except BaseException:
+            # 応答の途中で失敗した接続は再利用しない
+            self.close()
+            raise
+
+    async def _request(self, path: str) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+        self._writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\nAccept: application/json\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode('latin-1')
+        )
+        await self._writer.drain()
+
+        reader = self._reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed')
+        # 空行や壊れた行は ValueError にし、呼び出し側で接続ごと捨てて再試行させる
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b'HTTP/') or not parts[1].isdigit():
+            raise ValueError(f"invalid status line: {status_line[:80]!r}")
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b''.join(chunks)
+        else:
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, body
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class PlayerCountPoller:
+    """
+    カタログ全体の同時接続数を一定周期で取得し、時系列ストアに記録する常駐プロセス
+
+    各appidには周期内の固定の位相（appidから決まる）を割り当てて負荷を均し、
+    さらに毎回わずかなゆらぎを加えてから取得する。同時リクエスト数は
+    ワーカー数（＝接続数）で制限し、429や5xxが返ったときは全体を一時停止する。
+    結果はメモリに溜めて flush_interval ごとにまとめて追記する。
+    """
+
+    def __init__(self, appids: Iterable[int], store: TimeSeriesStore,
+                 interval: float = DEFAULT_INTERVAL,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 jitter: float = 0.05,
+                 timeout: float = 10.0,
+                 flush_interval: float = 60.0,
+                 max_retries: int = 2,
+                 host: str = API_HOST, port: int = 443, use_ssl: bool = True):
+        self.appids = sorted(set(int(appid) for appid in appids))
+        self.store = store
+        self.interval = interval
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.timeout = timeout
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.host, self.port, self.use_ssl = host, port, use_ssl
+
+        self._buffer: List[Tuple[int, int, int]] = []
+        self._paused_until = 0.0
+        self.stats = {'polled': 0, 'recorded': 0, 'failed': 0, 'throttled': 0, 'max_lag': 0.0}
+
+    def phase(self, appid: int) -> float:
+        """
+        周期内でのappidの取得位置（秒）。乗算ハッシュで周期全体に散らす
+        """
+        return (appid * 2654435761 % 2 ** 32) / 2 ** 32 * self.interval
+
+    async def run(self, cycles: Optional[int] = None) -> Dict[str, float]:
+        """
+        ポーリングを開始する（cycles を指定するとその周期数で終了する）
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 4)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        flusher = asyncio.create_task(self._flush_periodically())
+        try:
+            await self._schedule(queue, cycles)
+            await queue.join()
+        finally:
+            for task in workers + [flusher]:
+                task.cancel()
+            await asyncio.gather(*workers, flusher, return_exceptions=True)
+            self.flush()
+        return self.stats
+
+    async def _schedule(self, queue: asyncio.Queue, cycles: Optional[int]) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # (実際の取得時刻, 本来の取得時刻, appid)。本来の時刻は周期ごとに interval ずつ進め、ずれを溜めない
+        heap = [(start + self.phase(appid), start + self.phase(appid), appid) for appid in self.appids]
+        heapq.heapify(heap)
+        end = None if cycles is None else start + cycles * self.interval
+
+        while heap:
+            due, base, appid = heapq.heappop(heap)
+            if end is not None and base >= end:
+                # 指定した周期を終えたappidはもう予定に戻さない
+                continue
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await queue.put((appid, due))
+
+            base += self.interval
+            spread = self.jitter * self.interval
+            heapq.heappush(heap, (base + random.uniform(-spread, spread), base, appid))
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        connection = KeepAliveConnection(self.host, self.port, self.use_ssl, self.timeout)
+        try:
+            while True:
+                appid, due = await queue.get()
+                try:
+                    self.stats['max_lag'] = max(self.stats['max_lag'], loop.time() - due)
+                    count = await self._fetch(connection, appid)
+                    self.stats['polled'] += 1
+                    if count is not None:
+                        self._buffer.append((appid, int(time.time()), count))
+                        self.stats['recorded'] += 1
+                finally:
+                    queue.task_done()
+        finally:
+            connection.close()
+
+    async def _fetch(self, connection: KeepAliveConnection, appid: int) -> Optional[int]:
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            wait = self._paused_until - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                status, body = await connection.get(API_PATH.format(appid=appid))
+                if status == 429 or status >= 500:
+                    raise HTTPError(status)
+                if status != 200:
+                    break
+                data = json.loads(body)
+                response = data.get('response') if isinstance(data, dict) else None
+                # result が1以外（統計の無いアプリなど）は記録しない
+                if not isinstance(response, dict) or response.get('result') != 1:
+                    return None
+                return int(response.get('player_count', 0))
+            except HTTPError as e:
+                if e.status == 429:
+                    self.stats['throttled'] += 1
+                    # レート制限は全ワーカーで共有して待つ
+                    self._paused_until = max(self._paused_until, loop.time() + 2 ** attempt * 5)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, TypeError):
+                pass
+            await asyncio.sleep(2 ** attempt * random.uniform(0.5, 1.0))
+        self.stats['failed'] += 1
+        return None
+
+    async def _flush_periodically(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            records, self._buffer = self._buffer, []
+            if not records:
+                continue
+            try:
+                # ファイル書き込みでイベントループを止めないよう別スレッドで行う
+                await loop.run_in_executor(None, self.store.append_records, 'player_count', records)
+            except Exception as e:
+                # 書き込めなかった分はバッファの先頭に戻し、次の書き込みで再試行する
+                print(f"記録の書き込み中にエラーが発生しました: {e}")
+                self._buffer[:0] = records
+
+    def flush(self) -> int:
+        records, self._buffer = self._buffer, []
+        return self.store.append_records('player_count', records)
+
+
+def load_appids(filename: str) -> List[int]:
+    """
+    ゲームJSON（steam_appid / app_id）またはappidの一覧ファイルからappidを読み込む
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    appids = []
+    for item in data:
+        if isinstance(item, dict):
+            item = item.get('steam_appid') or item.get('app_id')
+        if item:
+            appids.append(int(item))
+    return appids
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python player_poller.py <games.json> [interval_seconds] [history_dir] [concurrency]")
+        return
+
+    appids = load_appids(sys.argv[1])
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_INTERVAL
+    store = TimeSeriesStore(sys.argv[3] if len(sys.argv) > 3 else 'history')
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else DEFAULT_CONCURRENCY
+
+    poller = PlayerCountPoller(appids, store, interval=interval, concurrency=concurrency)
+    print(f"{len(poller.appids)}ゲームの同時接続数を{interval:.0f}秒ごとに取得します。")
+    try:
+        asyncio.run(poller.run())
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    print(poller.stats)
+
+if __name__ == "__main__":
+    main()
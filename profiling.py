@@ -0,0 +1,221 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# LOD_PROFILE=1（または出力先のパス）を設定するか、--profile[=パス] を付けて実行すると有効になる。
+# 各スクリプトが読み込むモジュールなので、cProfile などは有効にしたときだけ読み込む
+PROFILE_ENV = 'LOD_PROFILE'
+PROFILE_FLAG = '--profile'
+DEFAULT_REPORT_FILE = 'profile_report.json'
+
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 20
+TRACEMALLOC_FRAMES = 1
+
+
+class _Profiler:
+    """
+    1回の実行分のステージごとの計測結果を集め、1つのレポートファイルに書き出す
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.report = {
+            'argv': sys.argv[:],
+            'pid': os.getpid(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'stages': [],
+        }
+        self.active: List[str] = []
+        self.lock = threading.Lock()
+
+    def save(self) -> None:
+        import json
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.report, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.path)
+
+
+class _StackSampler(threading.Thread):
+    """
+    全スレッドの呼び出しスタックを一定間隔で取り、折りたたみ形式（flamegraph.pl 用）で数える
+
+    cProfile は呼び出したスレッドしか計測しないため、スレッドプールで動く処理は
+    こちらのサンプルで確認する。
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self) -> List[str]:
+        self.stopped.set()
+        self.join()
+        return [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+
+
+_profiler: Optional[_Profiler] = None
+
+
+def enable(path: Optional[str] = None) -> None:
+    """
+    この実行のプロファイルを有効にする（結果は path に書き出す）
+    """
+    global _profiler
+    _profiler = _Profiler(path or DEFAULT_REPORT_FILE)
+
+
+def enabled() -> bool:
+    return _profiler is not None
+
+
+def init(argv: Optional[List[str]] = None) -> None:
+    """
+    環境変数 LOD_PROFILE と --profile[=パス] 引数を見てプロファイルを有効にする
+
+    --profile は argv（省略時は sys.argv）から取り除くので、各スクリプトの引数の解釈には影響しない。
+    """
+    argv = sys.argv if argv is None else argv
+    path = os.environ.get(PROFILE_ENV)
+    for arg in list(argv[1:]):
+        if arg == PROFILE_FLAG or arg.startswith(PROFILE_FLAG + '='):
+            argv.remove(arg)
+            path = arg.partition('=')[2] or DEFAULT_REPORT_FILE
+    if path and path != '0':
+        enable(None if path == '1' else path)
+
+
+def _function_stats(profile: 'cProfile.Profile') -> List[Dict]:
+    import pstats
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, name), (calls, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': f"{name} ({os.path.basename(filename)}:{line})",
+            'calls': ncalls,
+            'primitive_calls': calls,
+            'tottime': round(tottime, 6),
+            'cumtime': round(cumtime, 6),
+        })
+    rows.sort(key=lambda row: row['cumtime'], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def _allocation_stats(snapshot: 'tracemalloc.Snapshot') -> List[Dict]:
+    return [
+        {'location': str(stat.traceback[0]), 'size_bytes': stat.size, 'count': stat.count}
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+    ]
+
+
+@contextmanager
+def stage(name: str):
+    """
+    ステージ（取得・拡充・変換など）を計測する
+
+    無効のときは何もしない。入れ子になったステージは外側のプロファイルに含まれるので、
+    時間だけを記録する。
+    """
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+
+    nested = bool(profiler.active)
+    profiler.active.append(name)
+    wall, cpu = time.perf_counter(), time.process_time()
+    if nested:
+        try:
+            yield
+        finally:
+            profiler.active.pop()
+            entry = {'name': name, 'parent': profiler.active[-1] if profiler.active else None,
+                     'wall_seconds': round(time.perf_counter() - wall, 6),
+                     'cpu_seconds': round(time.process_time() - cpu, 6)}
+            with profiler.lock:
+                profiler.report['stages'].append(entry)
+                profiler.save()
+        return
+
+    import cProfile
+    import tracemalloc
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    sampler = _StackSampler()
+    sampler.start()
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        stacks = sampler.stop()
+        entry = {
+            'name': name,
+            'wall_seconds': round(time.perf_counter() - wall, 6),
+            'cpu_seconds': round(time.process_time() - cpu, 6),
+            'peak_traced_bytes': tracemalloc.get_traced_memory()[1],
+            'functions': _function_stats(profile),
+            'allocations': _allocation_stats(tracemalloc.take_snapshot()),
+            'collapsed_stacks': stacks,
+        }
+        if started_tracing:
+            tracemalloc.stop()
+        profiler.active.pop()
+        with profiler.lock:
+            profiler.report['stages'].append(entry)
+            profiler.save()
+
+
+def main():
+    import json
+    if len(sys.argv) < 2:
+        print("Usage: python profiling.py <profile_report.json> [stage]")
+        print("       stage を指定するとそのステージの折りたたみスタック（flamegraph.pl 用）を出力します")
+        return
+
+    try:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        if len(sys.argv) > 2:
+            for entry in report['stages']:
+                if entry['name'] == sys.argv[2]:
+                    for line in entry.get('collapsed_stacks', []):
+                        print(line)
+            return
+
+        print(f"{' '.join(report['argv'])}（{report['started_at']}）")
+        for entry in report['stages']:
+            line = f"  {entry['name']}: {entry['wall_seconds']:.3f}s (CPU {entry['cpu_seconds']:.3f}s)"
+            if 'peak_traced_bytes' in entry:
+                line += f", peak {entry['peak_traced_bytes'] / 2 ** 20:.1f}MB"
+                line += f", 最も時間のかかった関数: {entry['functions'][0]['function']}" if entry['functions'] else ''
+            print(line)
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import hashlib
+import heapq
+import json
+import math
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+class FieldPolicy(NamedTuple):
+    """
+    項目ごとの再取得間隔（秒）と1回の取得に使うリクエスト数
+    """
+    interval: float
+    min_interval: float
+    max_interval: float
+    cost: int
+
+
+FIELD_POLICIES = {
+    'details': FieldPolicy(7 * DAY, 1 * DAY, 60 * DAY, 1),
+    'price': FieldPolicy(1 * DAY, 6 * HOUR, 14 * DAY, 1),
+    # レビュー統計と詳細レビューの2リクエスト
+    'reviews': FieldPolicy(2 * DAY, 6 * HOUR, 30 * DAY, 2),
+    'achievements': FieldPolicy(30 * DAY, 7 * DAY, 180 * DAY, 1),
+    'series': FieldPolicy(60 * DAY, 14 * DAY, 365 * DAY, 1),
+    # 開発元ごとに1リクエスト（登録時にゲームの開発元の数を掛ける）
+    'developer': FieldPolicy(30 * DAY, 7 * DAY, 180 * DAY, 1),
+}
+
+# 値が変わったら間隔を縮め、変わらなければ延ばす倍率の範囲
+MIN_BACKOFF = 0.25
+MAX_BACKOFF = 8.0
+# 取得に失敗したときの再試行までの時間
+RETRY_DELAY = HOUR
+# 一度も取得していない項目の超過率
+NEVER_FETCHED = 1000.0
+
+
+class RefreshTask(NamedTuple):
+    appid: int
+    field: str
+    score: float
+    cost: int
+
+
+def value_digest(value) -> str:
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def popularity_factor(popularity: float) -> float:
+    """
+    人気（レビュー数）が高いゲームほど間隔を短くする倍率（0.25〜1）
+    """
+    return max(0.25, 1 / (1 + math.log10(1 + popularity) / 2))
+
+
+class RefreshScheduler:
+    """
+    ゲームと項目ごとの最終取得時刻を記録し、最も古くなったものから再取得を割り当てるスケジューラ
+
+    再取得間隔は項目ごとの基本間隔に、ゲームの人気による倍率と、これまでの
+    変化の頻度による倍率（変化があれば半分、無ければ1.5倍）を掛けて決める。
+    期限を過ぎた項目は期限に対する超過率（人気で重み付け）の高い順に並べ、
+    1時間あたりのリクエスト予算に収まる分だけ取り出す。
+    状態はSQLiteに保存し、期限順のヒープはメモリ上に持つ。
+    """
+
+    def __init__(self, path: str = 'refresh_state.sqlite', policies: Dict[str, FieldPolicy] = FIELD_POLICIES):
+        self.path = path
+        self.policies = policies
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS refresh_state (
+                appid INTEGER NOT NULL,
+                field TEXT NOT NULL,
+                last_fetched REAL,
+                backoff REAL NOT NULL DEFAULT 1.0,
+                popularity REAL NOT NULL DEFAULT 0,
+                cost INTEGER NOT NULL DEFAULT 1,
+                digest TEXT,
+                checks INTEGER NOT NULL DEFAULT 0,
+                changes INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (appid, field)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+        # (appid, field) -> [last_fetched, backoff, popularity, cost, digest]
+        self.state: Dict[Tuple[int, str], list] = {}
+        # (期限, appid, field)。予定が入れ直されると古い要素は取り出し時に読み飛ばす
+        self._heap: List[Tuple[float, int, str]] = []
+        self._scheduled: Dict[Tuple[int, str], float] = {}
+        # 期限を過ぎて割り当てを待っている項目
+        self._ready = set()
+        # commit() までまとめておく取得結果の更新
+        self._updates: List[Tuple] = []
+        for appid, field, last_fetched, backoff, popularity, cost, digest in self.conn.execute(
+                "SELECT appid, field, last_fetched, backoff, popularity, cost, digest FROM refresh_state"):
+            if field in policies:
+                self.state[(appid, field)] = [last_fetched, backoff, popularity, cost, digest]
+        self._scheduled = {key: self.due(key) for key in self.state}
+        self._heap = [(due, key[0], key[1]) for key, due in self._scheduled.items()]
+        heapq.heapify(self._heap)
+
+    def close(self) -> None:
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.state)
+
+    def interval(self, key: Tuple[int, str]) -> float:
+        policy = self.policies[key[1]]
+        _, backoff, popularity, _, _ = self.state[key]
+        interval = policy.interval * popularity_factor(popularity) * backoff
+        return min(max(interval, policy.min_interval), policy.max_interval)
+
+    def due(self, key: Tuple[int, str]) -> float:
+        last_fetched = self.state[key][0]
+        # 一度も取得していない項目は常に期限切れ
+        return 0.0 if last_fetched is None else last_fetched + self.interval(key)
+
+    def _push(self, key: Tuple[int, str], due: Optional[float] = None) -> None:
+        due = self.due(key) if due is None else due
+        self._scheduled[key] = due
+        self._ready.discard(key)
+        heapq.heappush(self._heap, (due, key[0], key[1]))
+
+    def register_games(self, games_data: Iterable[dict]) -> int:
+        """
+        ゲームを登録し、人気（レビュー数）と開発元の数を更新する。新規に登録した項目数を返す
+        """
+        added = 0
+        rows = []
+        for game_data in games_data:
+            appid = game_data.get('steam_appid') or game_data.get('app_id')
+            # appid の無いゲームは再取得できないので登録しない
+            if appid is None:
+                continue
+            appid = int(appid)
+            stats = game_data.get('review_stats') or {}
+            popularity = float(stats.get('total_reviews') or game_data.get('total_reviews') or 0)
+            for field, policy in self.policies.items():
+                cost = policy.cost * max(1, len(game_data.get('developer') or [])) if field == 'developer' else policy.cost
+                key = (appid, field)
+                state = self.state.get(key)
+                if state is None:
+                    state = self.state[key] = [None, 1.0, popularity, cost, None]
+                    self._push(key)
+                    added += 1
+                elif state[2] != popularity or state[3] != cost:
+                    state[2], state[3] = popularity, cost
+                    self._push(key)
+                else:
+                    continue
+                rows.append((appid, field, popularity, cost))
+
+        self.conn.executemany("""
+            INSERT INTO refresh_state (appid, field, popularity, cost) VALUES (?, ?, ?, ?)
+            ON CONFLICT (appid, field) DO UPDATE SET popularity = excluded.popularity, cost = excluded.cost
+        """, rows)
+        self.conn.commit()
+        return added
+
+    def plan(self, budget: int, now: Optional[float] = None) -> List[RefreshTask]:
+        """
+        期限切れの項目から、予算（リクエスト数）に収まる分を優先度順に取り出す
+
+        取り出した項目は complete() か fail() が呼ばれるまで予定から外れる。
+        """
+        now = time.time() if now is None else now
+        while self._heap and self._heap[0][0] <= now:
+            due, appid, field = heapq.heappop(self._heap)
+            key = (appid, field)
+            if self._scheduled.get(key) == due:
+                del self._scheduled[key]
+                self._ready.add(key)
+
+        # 1項目は1リクエスト以上なので、予算分の上位だけを見れば足りる
+        best = heapq.nlargest(budget, ((self.priority(key, now), key) for key in self._ready))
+        tasks = []
+        remaining = budget
+        for score, key in best:
+            cost = self.state[key][3]
+            if cost <= remaining:
+                # 予算に入らなかったものは待ち状態のまま次の計画に回す
+                self._ready.discard(key)
+                tasks.append(RefreshTask(key[0], key[1], score, cost))
+                remaining -= cost
+        return tasks
+
+    def priority(self, key: Tuple[int, str], now: float) -> float:
+        """
+        期限に対する超過率。同じ超過率なら人気のあるゲームを先にする
+        """
+        last_fetched, _, popularity, _, _ = self.state[key]
+        overdue = NEVER_FETCHED if last_fetched is None else (now - last_fetched) / self.interval(key)
+        return overdue * (1 + math.log10(1 + popularity))
+
+    def complete(self, appid: int, field: str, value, now: Optional[float] = None) -> bool:
+        """
+        取得結果を記録し、値が前回から変わったかどうかを返す
+        """
+        now = time.time() if now is None else now
+        key = (int(appid), field)
+        state = self.state[key]
+        digest = value_digest(value)
+        changed = state[4] is not None and digest != state[4]
+        if state[4] is not None:
+            state[1] = max(MIN_BACKOFF, state[1] * 0.5) if changed else min(MAX_BACKOFF, state[1] * 1.5)
+        state[0], state[4] = now, digest
+
+        self._updates.append((now, state[1], digest, int(changed), key[0], field))
+        self._push(key)
+        return changed
+
+    def fail(self, appid: int, field: str, now: Optional[float] = None) -> None:
+        """
+        取得に失敗した項目を少し後にもう一度予定に入れる
+        """
+        now = time.time() if now is None else now
+        self._push((int(appid), field), now + RETRY_DELAY)
+
+    def commit(self) -> None:
+        self.conn.executemany("""
+            UPDATE refresh_state
+            SET last_fetched = ?, backoff = ?, digest = ?, checks = checks + 1, changes = changes + ?
+            WHERE appid = ? AND field = ?
+        """, self._updates)
+        self._updates = []
+        self.conn.commit()
+
+    def summary(self, now: Optional[float] = None) -> Dict[str, Dict[str, int]]:
+        """
+        項目ごとの登録数と期限切れの数
+        """
+        now = time.time() if now is None else now
+        result = {field: {'total': 0, 'overdue': 0} for field in self.policies}
+        for key in self.state:
+            result[key[1]]['total'] += 1
+            if self.due(key) <= now:
+                result[key[1]]['overdue'] += 1
+        return result
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python refresh_scheduler.py <games.json> [state.sqlite] [budget]")
+        return
+
+    input_file = sys.argv[1]
+    state_file = sys.argv[2] if len(sys.argv) > 2 else 'refresh_state.sqlite'
+    budget = int(sys.argv[3]) if len(sys.argv) > 3 else 3600
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            games_data = json.load(f)
+        with RefreshScheduler(state_file) as scheduler:
+            scheduler.register_games(games_data)
+            for field, counts in scheduler.summary().items():
+                print(f"{field}: {counts['overdue']}/{counts['total']} 件が期限切れ")
+            # 計画を表示するだけなので、取り出した項目は記録しない
+            tasks = scheduler.plan(budget)
+            print(f"次の{budget}リクエストで {len(tasks)} 項目を更新します。")
+            for task in tasks[:20]:
+                print(f"  {task.appid} {task.field} (score={task.score:.2f}, cost={task.cost})")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
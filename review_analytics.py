@@ -0,0 +1,282 @@
+import json
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 1レビュー分の数値列（detailed_reviews の各要素から取り出す）
+REVIEW_DTYPE = np.dtype([
+    ('playtime_forever', 'f8'),
+    ('playtime_at_review', 'f8'),
+    ('votes_up', 'i8'),
+    ('weighted_vote_score', 'f8'),
+    ('timestamp_created', 'i8'),
+    ('voted_up', '?'),
+    ('early_access', '?'),
+])
+
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+# 高評価率を集計する期間（日数）。ゲームごとに最新レビューの時刻から遡る
+DEFAULT_WINDOWS = (30, 90, 365)
+# 総プレイ時間の分布の区切り（時間）
+PLAYTIME_BINS = (0, 1, 5, 20, 100, 500)
+
+SECONDS_PER_DAY = 86400
+
+
+def _review_row(review: dict) -> Tuple:
+    author = review.get('author') or {}
+    try:
+        weighted = float(review.get('weighted_vote_score') or 0)
+    except (TypeError, ValueError):
+        weighted = 0.0
+    return (
+        author.get('playtime_forever') or 0,
+        author.get('playtime_at_review') or 0,
+        review.get('votes_up') or 0,
+        weighted,
+        review.get('timestamp_created') or 0,
+        bool(review.get('voted_up')),
+        bool(review.get('written_during_early_access')),
+    )
+
+
+class ReviewArrays:
+    """
+    全ゲームのレビューを列ごとのNumPy配列にまとめたもの
+
+    レビューはゲーム順に連続して並べ、ゲーム i のレビューは
+    offsets[i]:offsets[i + 1] の範囲にある（CSR形式）。
+    """
+
+    def __init__(self, appids: np.ndarray, offsets: np.ndarray, records: np.ndarray):
+        self.appids = appids
+        self.offsets = offsets
+        self.records = records
+        self.counts = np.diff(offsets)
+        # 各レビューが属するゲームの行番号
+        self.game = np.repeat(np.arange(len(appids), dtype=np.int64), self.counts)
+
+    @classmethod
+    def from_games(cls, games_data: Iterable[dict]) -> 'ReviewArrays':
+        appids = []
+        counts = []
+        review_lists = []
+        for game_data in games_data:
+            reviews = game_data.get('detailed_reviews') or []
+            appids.append(int(game_data.get('steam_appid') or game_data.get('app_id') or 0))
+            counts.append(len(reviews))
+            review_lists.append(reviews)
+
+        total = sum(counts)
+        rows = (_review_row(review) for reviews in review_lists for review in reviews)
+        records = np.fromiter(rows, dtype=REVIEW_DTYPE, count=total)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(np.array(appids, dtype=np.int64), offsets, records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.records[field]
+
+
+class ReviewSummary(NamedTuple):
+    """
+    1ゲーム分のレビュー統計（プレイ時間は分、比率は0〜1）
+    """
+    review_count: int
+    positive_ratio: Optional[float]
+    weighted_positive_ratio: Optional[float]
+    average_playtime: Optional[float]
+    playtime_percentiles: Dict[int, float]
+    windowed_positive_ratio: Dict[int, Optional[float]]
+    playtime_histogram: Tuple[int, ...]
+    early_access_ratio: Optional[float]
+    helpful_votes: int
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    out = np.full(len(denominator), np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def _optional(value: float, digits: int) -> Optional[float]:
+    return None if value != value else round(value, digits)
+
+
+class ReviewStatistics:
+    """
+    ReviewArrays から全ゲーム分の統計をまとめて計算した結果
+
+    各統計はゲームの行順に並んだ配列として保持し、summary() でゲームごとに取り出す。
+    """
+
+    def __init__(self, arrays: ReviewArrays,
+                 percentiles: Sequence[int] = DEFAULT_PERCENTILES,
+                 windows: Sequence[int] = DEFAULT_WINDOWS,
+                 now: Optional[int] = None):
+        self.arrays = arrays
+        self.percentiles = tuple(percentiles)
+        self.windows = tuple(windows)
+        self.rows = {int(appid): i for i, appid in enumerate(arrays.appids)}
+
+        games = len(arrays.appids)
+        game = arrays.game
+        counts = arrays.counts
+        voted_up = arrays['voted_up']
+
+        positive = np.bincount(game, weights=voted_up, minlength=games)
+        self.review_count = counts
+        self.positive_ratio = _ratio(positive, counts)
+
+        weights = arrays['weighted_vote_score']
+        self.weighted_positive_ratio = _ratio(
+            np.bincount(game, weights=weights * voted_up, minlength=games),
+            np.bincount(game, weights=weights, minlength=games),
+        )
+        self.average_playtime = _ratio(
+            np.bincount(game, weights=arrays['playtime_at_review'], minlength=games), counts)
+        self.early_access_ratio = _ratio(
+            np.bincount(game, weights=arrays['early_access'], minlength=games), counts)
+        self.helpful_votes = np.bincount(game, weights=arrays['votes_up'], minlength=games).astype(np.int64)
+
+        self.playtime_percentiles = self._percentiles(arrays['playtime_at_review'])
+        self.windowed_positive_ratio = self._windows(now)
+        self.playtime_histogram = self._histogram(arrays['playtime_forever'] / 60)
+        self._lists = None
+
+    def _percentiles(self, values: np.ndarray) -> np.ndarray:
+        """
+        ゲームごとの百分位数（線形補間）を (ゲーム数, 百分位数の数) の配列で返す
+        """
+        arrays = self.arrays
+        counts = arrays.counts
+        # ゲーム内で値を並べ替える（ゲームの並びは保たれる）
+        ordered = values[np.lexsort((values, arrays.game))]
+        starts = arrays.offsets[:-1]
+        result = np.full((len(counts), len(self.percentiles)), np.nan)
+        has_reviews = counts > 0
+        last = (counts - 1)[has_reviews]
+        base = starts[has_reviews]
+        for j, q in enumerate(self.percentiles):
+            position = last * (q / 100)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.minimum(lower + 1, last)
+            fraction = position - lower
+            result[has_reviews, j] = ordered[base + lower] * (1 - fraction) + ordered[base + upper] * fraction
+        return result
+
+    def _windows(self, now: Optional[int]) -> np.ndarray:
+        """
+        期間ごとの高評価率を (ゲーム数, 期間の数) の配列で返す
+
+        now を省略するとゲームごとに最新レビューの時刻を基準にする（出力が実行時刻に依存しない）。
+        """
+        arrays = self.arrays
+        games = len(arrays.appids)
+        game = arrays.game
+        timestamps = arrays['timestamp_created']
+        voted_up = arrays['voted_up']
+
+        if now is None:
+            anchor = np.zeros(games, dtype=np.int64)
+            has_reviews = arrays.counts > 0
+            if has_reviews.any():
+                anchor[has_reviews] = np.maximum.reduceat(timestamps, arrays.offsets[:-1][has_reviews])
+            anchor = anchor[game]
+        else:
+            anchor = now
+
+        known = timestamps > 0
+        result = np.full((games, len(self.windows)), np.nan)
+        for j, days in enumerate(self.windows):
+            in_window = known & (timestamps > anchor - days * SECONDS_PER_DAY)
+            result[:, j] = _ratio(
+                np.bincount(game, weights=in_window & voted_up, minlength=games),
+                np.bincount(game, weights=in_window, minlength=games),
+            )
+        return result
+
+    def _histogram(self, hours: np.ndarray) -> np.ndarray:
+        """
+        総プレイ時間の分布を (ゲーム数, 区間の数) の件数配列で返す
+        """
+        games = len(self.arrays.appids)
+        bins = len(PLAYTIME_BINS)
+        index = np.searchsorted(PLAYTIME_BINS, hours, side='right') - 1
+        index = np.clip(index, 0, bins - 1)
+        counts = np.bincount(self.arrays.game * bins + index, minlength=games * bins)
+        return counts.reshape(games, bins)
+
+    def __contains__(self, appid: int) -> bool:
+        return int(appid) in self.rows
+
+    def summary(self, appid: int) -> Optional[ReviewSummary]:
+        row = self.rows.get(int(appid))
+        if row is None:
+            return None
+        if self._lists is None:
+            # NumPyのスカラーを1件ずつ変換すると遅いので、最初に一度だけPythonのリストにする
+            self._lists = [values.tolist() for values in (
+                self.review_count, self.positive_ratio, self.weighted_positive_ratio,
+                self.average_playtime, self.playtime_percentiles, self.windowed_positive_ratio,
+                self.playtime_histogram, self.early_access_ratio, self.helpful_votes,
+            )]
+        (count, positive, weighted, average, percentiles, windows,
+         histogram, early_access, helpful) = (values[row] for values in self._lists)
+        return ReviewSummary(
+            review_count=count,
+            positive_ratio=_optional(positive, 4),
+            weighted_positive_ratio=_optional(weighted, 4),
+            average_playtime=_optional(average, 1),
+            playtime_percentiles={
+                q: round(v, 1) for q, v in zip(self.percentiles, percentiles) if v == v
+            },
+            windowed_positive_ratio={days: _optional(v, 4) for days, v in zip(self.windows, windows)},
+            playtime_histogram=tuple(histogram),
+            early_access_ratio=_optional(early_access, 4),
+            helpful_votes=helpful,
+        )
+
+    def summaries(self) -> Dict[int, ReviewSummary]:
+        return {appid: self.summary(appid) for appid in self.rows}
+
+
+def analyze_games(games_data: Iterable[dict], **options) -> ReviewStatistics:
+    """
+    ゲーム一覧の detailed_reviews をまとめて配列化し、統計を計算する
+    """
+    return ReviewStatistics(ReviewArrays.from_games(games_data), **options)
+
+
+def summarize_reviews(reviews: List[dict], **options) -> ReviewSummary:
+    """
+    1ゲーム分のレビュー一覧の統計を計算する
+    """
+    return analyze_games([{'steam_appid': 0, 'detailed_reviews': reviews}], **options).summary(0)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python review_analytics.py <input.json> [output.json]")
+        return
+
+    input_file = sys.argv[1]
+    output_file = sys.argv[2] if len(sys.argv) > 2 else 'review_statistics.json'
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            games_data = json.load(f)
+
+        statistics = analyze_games(games_data)
+        result = {str(appid): summary._asdict() for appid, summary in statistics.summaries().items()}
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"{len(result)}ゲーム, {len(statistics.arrays)}件のレビューを集計しました。")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
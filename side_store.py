@@ -0,0 +1,244 @@
+import json
+import os
+import sys
+import zlib
+from typing import Dict, List, Optional
+
+# ゲームレコード内で外部ストアへの参照を表すキー
+REFERENCE_KEY = 'side_store'
+INDEX_SUFFIX = '.index.json'
+
+# ストアに移す項目（レビュー本文と実績スキーマ）
+REVIEW_TEXT = 'review_text'
+ACHIEVEMENTS_LIST = 'achievements_list'
+
+
+class SideStore:
+    """
+    レビュー本文や実績一覧などの大きな値をappidごとに圧縮して保存する外部ストア
+
+    データファイルには zlib 圧縮したJSONを追記していき、(appid, 項目) ごとの
+    バイト位置と長さを索引ファイル（JSON）に記録する。値は get() したときに
+    初めて読み込んで展開する。
+    """
+
+    def __init__(self, path: str, writable: bool = False, level: int = 6):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.writable = writable
+        self.level = level
+        self._reader = None
+        self._writer = None
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index: Dict[str, Dict[str, List[int]]] = json.load(f)
+        except FileNotFoundError:
+            if not writable:
+                raise
+            self.index = {}
+
+        if writable:
+            self._writer = open(path, 'ab')
+            # 索引に無い末尾（前回の書き込み途中で終わった分）は捨てる
+            end = max((offset + length for fields in self.index.values()
+                       for offset, length in fields.values()), default=0)
+            self._writer.truncate(end)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __contains__(self, appid) -> bool:
+        return str(appid) in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def fields(self, appid) -> List[str]:
+        return list(self.index.get(str(appid), {}))
+
+    def put(self, appid, field: str, value) -> None:
+        payload = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        blob = zlib.compress(payload, self.level)
+        self._writer.seek(0, os.SEEK_END)
+        offset = self._writer.tell()
+        self._writer.write(blob)
+        self.index.setdefault(str(appid), {})[field] = [offset, len(blob)]
+
+    def get(self, appid, field: str, default=None):
+        entry = self.index.get(str(appid), {}).get(field)
+        if entry is None:
+            return default
+        offset, length = entry
+        if self._writer is not None:
+            self._writer.flush()
+        if self._reader is None:
+            self._reader = open(self.path, 'rb')
+        self._reader.seek(offset)
+        return json.loads(zlib.decompress(self._reader.read(length)).decode('utf-8'))
+
+    def flush(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.flush()
+        temp_file = self.index_path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, separators=(',', ':'))
+        os.replace(temp_file, self.index_path)
+
+    def close(self) -> None:
+        self.flush()
+        for handle in (self._reader, self._writer):
+            if handle is not None:
+                handle.close()
+        self._reader = self._writer = None
+
+
+def split_game(game_data: dict, store: SideStore, store_name: str) -> dict:
+    """
+    レビュー本文と実績一覧をストアに移し、参照だけを持つゲームレコードを返す
+    """
+    appid = game_data.get('steam_appid') or game_data.get('app_id')
+    game = dict(game_data)
+    moved = []
+
+    reviews = game.get('detailed_reviews')
+    if reviews:
+        store.put(appid, REVIEW_TEXT, [review.get('review_text', '') for review in reviews])
+        game['detailed_reviews'] = [
+            {key: value for key, value in review.items() if key != 'review_text'} for review in reviews
+        ]
+        moved.append(REVIEW_TEXT)
+
+    achievements = game.get('achievements')
+    if isinstance(achievements, dict) and ACHIEVEMENTS_LIST in achievements:
+        store.put(appid, ACHIEVEMENTS_LIST, achievements[ACHIEVEMENTS_LIST])
+        game['achievements'] = {
+            key: value for key, value in achievements.items() if key != ACHIEVEMENTS_LIST
+        }
+        moved.append(ACHIEVEMENTS_LIST)
+
+    if moved:
+        game[REFERENCE_KEY] = {'path': store_name, 'fields': moved}
+    return game
+
+
+def detailed_reviews(game_data: dict, store: Optional[SideStore]) -> List[dict]:
+    """
+    レビュー本文を含む detailed_reviews を返す（ストアにあれば読み込んで結合する）
+    """
+    reviews = game_data.get('detailed_reviews') or []
+    reference = game_data.get(REFERENCE_KEY) or {}
+    if store is None or REVIEW_TEXT not in reference.get('fields', []):
+        return reviews
+    appid = game_data.get('steam_appid') or game_data.get('app_id')
+    texts = store.get(appid, REVIEW_TEXT, [])
+    return [dict(review, review_text=text) for review, text in zip(reviews, texts)]
+
+
+def achievements(game_data: dict, store: Optional[SideStore]) -> dict:
+    """
+    achievements_list を含む実績情報を返す（ストアにあれば読み込んで結合する）
+    """
+    result = game_data.get('achievements') or {}
+    reference = game_data.get(REFERENCE_KEY) or {}
+    if store is None or ACHIEVEMENTS_LIST not in reference.get('fields', []):
+        return result
+    appid = game_data.get('steam_appid') or game_data.get('app_id')
+    return dict(result, achievements_list=store.get(appid, ACHIEVEMENTS_LIST, []))
+
+
+def join_game(game_data: dict, store: Optional[SideStore]) -> dict:
+    """
+    ストアの内容を戻した元の形のゲームレコードを返す
+    """
+    if REFERENCE_KEY not in game_data:
+        return game_data
+    game = {key: value for key, value in game_data.items() if key != REFERENCE_KEY}
+    if 'detailed_reviews' in game:
+        game['detailed_reviews'] = detailed_reviews(game_data, store)
+    if 'achievements' in game:
+        game['achievements'] = achievements(game_data, store)
+    return game
+
+
+def open_store(json_file: str, game_data: dict) -> Optional[SideStore]:
+    """
+    ゲームレコードが参照するストアを開く（パスはJSONファイルからの相対パス）
+    """
+    reference = game_data.get(REFERENCE_KEY)
+    if not reference:
+        return None
+    return SideStore(os.path.join(os.path.dirname(os.path.abspath(json_file)), reference['path']))
+
+
+def split_file(input_file: str, output_file: str, store_file: Optional[str] = None) -> int:
+    """
+    ゲームJSONを、メタデータだけのJSONと圧縮ストアに分割する
+    """
+    store_file = store_file or os.path.splitext(output_file)[0] + '.side'
+    store_name = os.path.relpath(os.path.abspath(store_file), os.path.dirname(os.path.abspath(output_file)))
+
+    with open(input_file, 'r', encoding='utf-8') as f:
+        games_data = json.load(f)
+
+    # 古い内容が残らないよう、ストアは毎回作り直す
+    for path in (store_file, store_file + INDEX_SUFFIX):
+        if os.path.exists(path):
+            os.remove(path)
+    with SideStore(store_file, writable=True) as store:
+        games = [split_game(game_data, store, store_name) for game_data in games_data]
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(games, f, ensure_ascii=False, indent=2)
+    return len(games)
+
+
+def join_file(input_file: str, output_file: str) -> int:
+    """
+    分割したJSONとストアから元の形のゲームJSONを復元する
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        games_data = json.load(f)
+
+    stores: Dict[str, SideStore] = {}
+    games = []
+    try:
+        for game_data in games_data:
+            reference = game_data.get(REFERENCE_KEY)
+            store = None
+            if reference:
+                store = stores.get(reference['path'])
+                if store is None:
+                    store = stores[reference['path']] = open_store(input_file, game_data)
+            games.append(join_game(game_data, store))
+    finally:
+        for store in stores.values():
+            store.close()
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(games, f, ensure_ascii=False, indent=2)
+    return len(games)
+
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[1] not in ('split', 'join'):
+        print("Usage: python side_store.py split <input.json> <output.json> [store.side]")
+        print("       python side_store.py join <input.json> <output.json>")
+        return
+
+    command, input_file, output_file = sys.argv[1:4]
+    try:
+        if command == 'split':
+            count = split_file(input_file, output_file, sys.argv[4] if len(sys.argv) > 4 else None)
+        else:
+            count = join_file(input_file, output_file)
+        print(f"{count}ゲームを {output_file} に保存しました。")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from bisect import bisect_right
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from normalize import normalize_game
+
+DEFAULT_INDEX_FILE = 'similar_games.npz'
+DEFAULT_NEIGHBORS = 10
+
+# 価格帯の区切り（円）
+PRICE_BANDS = (0, 500, 1000, 2000, 3000, 5000, 10000)
+# これ以上のゲームに付いている開発元は密な特徴として扱う（少ないものは共有ペアを直接数える）
+DENSE_MIN_DF = 32
+# この件数までは全ゲームと総当たりで比較する
+EXACT_LIMIT = 20000
+# 近似探索で、クラスタ（転置ファイル）ごとに探索する近いクラスタが合わせて含むゲームの割合。
+# 探索するクラスタ数は少なくともクラスタ数の平方根とする
+PROBE_SHARE = 0.6
+# 近似探索の再現率を確かめるときに全件と比較するゲーム数
+RECALL_SAMPLE = 1000
+# 1回の行列積で作る類似度行列の要素数の上限
+BLOCK_ELEMENTS = 1 << 24
+# 前回の全体構築からの変化がこの割合を超えたら差分更新をやめて作り直す
+REBUILD_RATIO = 0.1
+
+
+def game_features(game_data: dict) -> List[str]:
+    """
+    ゲームを「種類:値」形式の特徴の一覧に変換する
+    """
+    fields = normalize_game(game_data)
+    features = [f"genre:{genre}" for genre in game_data.get('genres') or []]
+    features += [f"category:{category}" for category in game_data.get('categories') or []]
+    features += [f"language:{language}" for language in fields.languages]
+    features += [f"developer:{developer}" for developer in game_data.get('developer') or []]
+
+    if fields.price is not None:
+        features.append(f"price:{bisect_right(PRICE_BANDS, fields.price)}")
+
+    stats = game_data.get('review_stats') or {}
+    total = stats.get('total_reviews') or game_data.get('total_reviews') or 0
+    if total:
+        # レビュー数は桁ごと、高評価率は20%ごとに区切る
+        features.append(f"reviews:volume{int(math.log10(total))}")
+        if 'review_score' in stats:
+            features.append(f"reviews:score{min(int(stats['review_score'] // 20), 4)}")
+    return list(dict.fromkeys(features))
+
+
+def feature_digest(features: Sequence[str]) -> int:
+    payload = '\n'.join(sorted(features)).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), 'little', signed=True)
+
+
+class FeatureMatrix:
+    """
+    ゲームの特徴をTF-IDFで重み付けし、L2正規化したベクトル
+
+    特徴はすべて有無（TF=1）で数え、IDFで重み付けする。ジャンルや言語などの
+    種類の少ない特徴と、多くのゲームに付いた開発元は密行列 dense に持つ。
+    数本のゲームにしか付いていない開発元は密行列に入れず、同じ開発元を
+    持つゲームの組（pair_keys）とその内積への寄与（pair_bonus）として持つ。
+    """
+
+    def __init__(self, features: Sequence[Sequence[str]]):
+        n = len(features)
+        vocabulary: Dict[str, int] = {}
+        flat = list(chain.from_iterable(features))
+        rows = np.repeat(np.arange(n, dtype=np.int64), [len(game_features) for game_features in features])
+        cols = np.array([vocabulary.setdefault(feature, len(vocabulary)) for feature in flat], dtype=np.int64)
+
+        self.size = n
+        self.vocabulary = vocabulary
+        df = np.bincount(cols, minlength=len(vocabulary))
+        self.idf = np.log((1 + n) / (1 + df)) + 1
+        weights = self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n))
+        norms[norms == 0] = 1
+        values = (weights / norms[rows]).astype(np.float32)
+
+        names = list(vocabulary)
+        sparse_feature = np.array(
+            [name.startswith('developer:') for name in names], dtype=bool
+        ) & (df < DENSE_MIN_DF)
+        is_sparse = sparse_feature[cols] if len(cols) else np.zeros(0, dtype=bool)
+
+        # 密な特徴の列番号を詰め直す
+        dense_ids = np.flatnonzero(~sparse_feature)
+        column = np.full(len(vocabulary), -1, dtype=np.int64)
+        column[dense_ids] = np.arange(len(dense_ids))
+        self.dense = np.zeros((n, len(dense_ids)), dtype=np.float32)
+        self.dense[rows[~is_sparse], column[cols[~is_sparse]]] = values[~is_sparse]
+
+        self.pair_keys, self.pair_bonus = self._sparse_pairs(rows[is_sparse], cols[is_sparse], values[is_sparse])
+
+    def _sparse_pairs(self, rows: np.ndarray, cols: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        同じ疎な特徴を持つゲームの組 (a, b) ごとの内積への寄与を、a * n + b の昇順で返す
+        """
+        n = self.size
+        order = np.argsort(cols, kind='stable')
+        rows, cols, values = rows[order], cols[order], values[order]
+        bounds = np.flatnonzero(np.diff(cols)) + 1
+        keys, bonus = [], []
+        for group_rows, group_values in zip(np.split(rows, bounds), np.split(values, bounds)):
+            if len(group_rows) < 2:
+                continue
+            a = np.repeat(group_rows, len(group_rows))
+            b = np.tile(group_rows, len(group_rows))
+            products = np.outer(group_values, group_values).ravel()
+            mask = a != b
+            keys.append(a[mask] * n + b[mask])
+            bonus.append(products[mask])
+        if not keys:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        # 複数の開発元が共通する組は寄与を合計する
+        keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        return keys, np.bincount(inverse, weights=np.concatenate(bonus)).astype(np.float32)
+
+    def bonus(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        組 (a, b) の疎な特徴による内積への寄与
+        """
+        keys = a * self.size + b
+        if not len(self.pair_keys):
+            return np.zeros(len(keys), dtype=np.float32)
+        index = np.minimum(np.searchsorted(self.pair_keys, keys), len(self.pair_keys) - 1)
+        return np.where(self.pair_keys[index] == keys, self.pair_bonus[index], 0).astype(np.float32)
+
+    def similarity(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        組 (a, b) ごとのコサイン類似度
+        """
+        result = np.empty(len(a), dtype=np.float32)
+        step = max(1, BLOCK_ELEMENTS // max(self.dense.shape[1], 1))
+        for start in range(0, len(a), step):
+            end = start + step
+            result[start:end] = np.einsum('ij,ij->i', self.dense[a[start:end]], self.dense[b[start:end]])
+        return result + self.bonus(a, b)
+
+    def sparse_pairs_of(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        疎な特徴を共有する組のうち、a が queries に含まれるもの
+        """
+        a = self.pair_keys // self.size
+        mask = np.isin(a, queries)
+        return a[mask], self.pair_keys[mask] % self.size
+
+    def search(self, queries: np.ndarray, k: int, candidates: Optional[np.ndarray] = None,
+               threshold: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        queries の各ゲームについて、candidates（省略時は全ゲーム）の中から類似度の高い k 件を組で返す
+
+        threshold（行ごとの類似度の下限）を渡すと、候補側から見て下限を超える
+        逆向きの組 (候補, クエリ) も返す。
+        """
+        everything = candidates is None
+        target = self.dense if everything else self.dense[candidates]
+        candidates = np.arange(self.size) if everything else candidates
+        limit = None if threshold is None else threshold[candidates][None, :]
+        step = max(1, BLOCK_ELEMENTS // max(len(candidates), 1))
+        take = min(k, len(candidates))
+        found_a, found_b, found_score = [], [], []
+        for start in range(0, len(queries), step):
+            block = queries[start:start + step]
+            scores = self.dense[block] @ target.T
+            # 自分自身は候補から外す
+            if everything:
+                scores[np.arange(len(block)), block] = -np.inf
+            else:
+                scores[block[:, None] == candidates[None, :]] = -np.inf
+            if take < len(candidates):
+                top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            else:
+                top = np.broadcast_to(np.arange(len(candidates)), scores.shape)
+            found_a.append(np.repeat(block, take))
+            found_b.append(candidates[top].ravel())
+            found_score.append(np.take_along_axis(scores, top, axis=1).ravel())
+            if limit is not None:
+                query, candidate = np.nonzero(scores > limit)
+                found_a.append(candidates[candidate])
+                found_b.append(block[query])
+                found_score.append(scores[query, candidate])
+        a = np.concatenate(found_a) if found_a else np.zeros(0, dtype=np.int64)
+        b = np.concatenate(found_b) if found_b else np.zeros(0, dtype=np.int64)
+        score = np.concatenate(found_score) if found_score else np.zeros(0, dtype=np.float32)
+        return a, b, score + self.bonus(a, b)
+
+    def clusters(self, count: int, iterations: int = 8, seed: int = 0) -> List[np.ndarray]:
+        """
+        密行列を球面k-meansでクラスタに分け、クラスタごとの行番号を返す
+        """
+        rng = np.random.default_rng(seed)
+        sample = self.dense[rng.choice(self.size, min(self.size, count * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), count, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # 空になったクラスタは元の中心のまま残す
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        assign = np.empty(self.size, dtype=np.int64)
+        step = max(1, BLOCK_ELEMENTS // count)
+        for start in range(0, self.size, step):
+            assign[start:start + step] = np.argmax(self.dense[start:start + step] @ centroids.T, axis=1)
+        members = np.split(np.argsort(assign, kind='stable'), np.cumsum(np.bincount(assign, minlength=count))[:-1])
+        self.centroids = centroids
+        return members
+
+    def nearest_neighbors(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        全ゲームの類似ゲーム上位 k 件を求める
+
+        件数が多いときは転置ファイル方式の近似探索を行う。ゲームをクラスタに分け、
+        各クラスタのゲームは、中心が近い順に、合わせて全体の PROBE_SHARE 以上の
+        ゲームを含むまでのクラスタの中から探す（クラスタ数が増えても探索する割合が
+        変わらないので、再現率が件数によって下がらない）。疎な特徴（少数のゲームだけの
+        開発元）を共有する組は常に候補に加える。
+        """
+        if self.size <= EXACT_LIMIT:
+            return self._select(np.arange(self.size), *self.search(np.arange(self.size), k), k)
+
+        members = self.clusters(int(math.sqrt(self.size)))
+        sizes = np.array([len(queries) for queries in members])
+        order = np.argsort(-(self.centroids @ self.centroids.T), axis=1)
+        min_probes = int(math.sqrt(len(members)))
+        found = []
+        for cluster, queries in enumerate(members):
+            if len(queries):
+                covered = np.cumsum(sizes[order[cluster]])
+                probes = max(min_probes, int(np.searchsorted(covered, PROBE_SHARE * self.size)) + 1)
+                candidates = np.concatenate([members[c] for c in order[cluster][:probes]])
+                found.append(self.search(queries, k, candidates))
+        a, b, score = (np.concatenate(parts) for parts in zip(*found))
+        return self._select(np.arange(self.size), a, b, score, k)
+
+    def _select(self, queries: np.ndarray, a: np.ndarray, b: np.ndarray, score: np.ndarray,
+                k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # 疎な特徴を共有する組を加えて、各ゲームの上位 k 件を選ぶ
+        pair_a, pair_b = self.sparse_pairs_of(queries)
+        a = np.concatenate([a, pair_a])
+        b = np.concatenate([b, pair_b])
+        score = np.concatenate([score, self.similarity(pair_a, pair_b)])
+        return top_k(a, b, score, self.size, k)
+
+    def recall(self, neighbors: np.ndarray, scores: np.ndarray, sample: int = RECALL_SAMPLE,
+               seed: int = 0) -> float:
+        """
+        求めた上位 k 件のうち、全件と比較した上位 k 件に入るものの割合（再現率）を標本で求める
+
+        k 番目と同じ類似度の相手は、どれを選んでも正しいので一致として数える。
+        """
+        k = neighbors.shape[1]
+        rows = np.sort(np.random.default_rng(seed).choice(self.size, min(sample, self.size), replace=False))
+        exact_neighbors, exact_scores = self._select(rows, *self.search(rows, k), k)
+        kth = exact_scores[rows, k - 1]
+        hits = (neighbors[rows] >= 0) & (scores[rows] >= kth[:, None] - 1e-5)
+        return float(hits.sum()) / max(int((exact_neighbors[rows] >= 0).sum()), 1)
+
+
+def top_k(a: np.ndarray, b: np.ndarray, score: np.ndarray, n: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    組 (a, b, score) から a ごとに類似度の高い k 件を選び、(n, k) の行番号と類似度の配列にする
+
+    重複した組は1つにまとめ、類似度が0以下の組は除く。足りない分は -1 で埋める。
+    """
+    mask = (score > 0) & (a != b)
+    a, b, score = a[mask], b[mask], score[mask]
+    # np.unique で (a, b) 順に並べてから、類似度順・a 順に安定ソートする
+    _, first = np.unique(a * n + b, return_index=True)
+    a, b, score = a[first], b[first], score[first]
+    order = np.argsort(-score, kind='stable')
+    order = order[np.argsort(a[order], kind='stable')]
+    a, b, score = a[order], b[order], score[order]
+    rank = np.arange(len(a)) - np.searchsorted(a, a)
+    keep = rank < k
+
+    neighbors = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k), dtype=np.float32)
+    neighbors[a[keep], rank[keep]] = b[keep]
+    scores[a[keep], rank[keep]] = score[keep]
+    return neighbors, scores
+
+
+class SimilarityIndex:
+    """
+    ゲームごとの類似ゲーム上位 k 件を保存した索引
+
+    appid の配列と、行ごとの類似ゲームのappid・類似度の (n, k) 配列を .npz に保存する。
+    読み込み時に appid から行番号への辞書を作るので、参照は辞書引き1回で済む。
+    特徴のダイジェストも保存しておき、update() では特徴の変わったゲームだけを
+    全ゲームと比較し直す。
+    """
+
+    def __init__(self, appids: np.ndarray, neighbors: np.ndarray, scores: np.ndarray,
+                 digests: np.ndarray, base_size: int):
+        self.appids = appids
+        self.neighbors = neighbors
+        self.scores = scores
+        self.digests = digests
+        # 最後に全体を構築したときのゲーム数（差分が増えすぎたら作り直す目安）
+        self.base_size = base_size
+        self.rows = {appid: row for row, appid in enumerate(appids.tolist())}
+
+    @property
+    def k(self) -> int:
+        return self.neighbors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.appids)
+
+    def __contains__(self, appid) -> bool:
+        return int(appid) in self.rows
+
+    def similar(self, appid, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        類似ゲームの (appid, 類似度) を類似度の高い順に返す
+        """
+        row = self.rows.get(int(appid))
+        if row is None:
+            return []
+        neighbors = self.neighbors[row, :limit].tolist()
+        scores = self.scores[row, :limit].tolist()
+        return [(neighbor, score) for neighbor, score in zip(neighbors, scores) if neighbor >= 0]
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_FILE) -> 'SimilarityIndex':
+        with np.load(path) as data:
+            return cls(data['appids'], data['neighbors'], data['scores'], data['digests'], int(data['base_size']))
+
+    def save(self, path: str = DEFAULT_INDEX_FILE) -> None:
+        temp_file = path + '.tmp.npz'
+        np.savez(temp_file, appids=self.appids, neighbors=self.neighbors, scores=self.scores,
+                 digests=self.digests, base_size=np.int64(self.base_size))
+        os.replace(temp_file, path)
+
+    @classmethod
+    def build(cls, games_data: Iterable[dict], k: int = DEFAULT_NEIGHBORS) -> 'SimilarityIndex':
+        appids, features = _collect(games_data)
+        return cls._build(appids, features, k)
+
+    @classmethod
+    def _build(cls, appids: np.ndarray, features: List[List[str]], k: int) -> 'SimilarityIndex':
+        matrix = FeatureMatrix(features)
+        neighbors, scores = matrix.nearest_neighbors(k)
+        digests = np.array([feature_digest(f) for f in features], dtype=np.int64)
+        return cls(appids, _to_appids(neighbors, appids), scores, digests, len(appids))
+
+    def update(self, games_data: Iterable[dict]) -> Tuple['SimilarityIndex', Dict[str, int]]:
+        """
+        新しいゲーム一覧に合わせて更新した索引と、変化したゲーム数を返す
+
+        追加されたゲームと特徴の変わったゲーム、および削除されたゲームを
+        類似ゲームに含んでいたゲームだけを全ゲームと比較し直し、他のゲームの
+        一覧には、比較し直したゲームとの新しい類似度を反映する。
+        それ以外の組の類似度はIDFの変化を反映しないため、変化が REBUILD_RATIO を
+        超えたときは全体を作り直す。
+        """
+        appids, features = _collect(games_data)
+        k = self.k
+        digests = np.array([feature_digest(f) for f in features], dtype=np.int64)
+        old_rows = _lookup(self.appids, appids)
+        changed = (old_rows < 0) | (self.digests[np.maximum(old_rows, 0)] != digests)
+        removed = np.setdiff1d(self.appids, appids)
+        stats = {'games': len(appids), 'changed': int(changed.sum()), 'removed': len(removed), 'rebuilt': 0}
+
+        if not stats['changed'] and not stats['removed']:
+            return self, stats
+        if stats['changed'] + stats['removed'] > REBUILD_RATIO * self.base_size:
+            stats['rebuilt'] = 1
+            return self._build(appids, features, k), stats
+
+        matrix = FeatureMatrix(features)
+        n = len(appids)
+
+        # 前回の一覧を新しい行番号で表す（削除されたゲームと特徴の変わったゲームの行は -1）
+        kept = np.flatnonzero(~changed)
+        neighbors = np.full((n, k), -1, dtype=np.int64)
+        scores = np.zeros((n, k), dtype=np.float32)
+        previous = self.neighbors[old_rows[kept]]
+        neighbors[kept] = np.where(previous >= 0, _lookup(appids, previous.ravel()).reshape(previous.shape), -1)
+        scores[kept] = self.scores[old_rows[kept]]
+        lost = kept[((neighbors[kept] < 0) & (previous >= 0)).any(axis=1)]
+
+        queries = np.union1d(np.flatnonzero(changed), lost)
+        # 前回の k 番目の類似度を超えるゲームだけを、他のゲームの一覧に割り込ませる
+        a, b, score = matrix.search(queries, k, threshold=scores[:, k - 1])
+        pair_a, pair_b = matrix.sparse_pairs_of(queries)
+        a = np.concatenate([a, pair_a])
+        b = np.concatenate([b, pair_b])
+        score = np.concatenate([score, matrix.similarity(pair_a, pair_b)])
+
+        # 比較し直したゲームを含む前回の一覧は、その類似度だけを計算し直す
+        requeried = np.zeros(n, dtype=bool)
+        requeried[queries] = True
+        stale_rows, stale_cols = np.nonzero((neighbors >= 0) & requeried[np.maximum(neighbors, 0)])
+        scores[stale_rows, stale_cols] = matrix.similarity(stale_rows, neighbors[stale_rows, stale_cols])
+
+        # 一覧が変わりうる行だけを選び直す。対称性から、比較し直したゲームを
+        # 相手側の候補にも加える（同じ組は新しい値を優先する）
+        affected = np.unique(np.concatenate([a, b, stale_rows]))
+        old_a = np.repeat(affected, k)
+        old_b = neighbors[affected].ravel()
+        old_score = scores[affected].ravel()
+        valid = old_b >= 0
+        selected, selected_scores = top_k(
+            np.concatenate([a, b, old_a[valid]]),
+            np.concatenate([b, a, old_b[valid]]),
+            np.concatenate([score, score, old_score[valid]]),
+            n, k
+        )
+        neighbors[affected] = selected[affected]
+        scores[affected] = selected_scores[affected]
+        return SimilarityIndex(appids, _to_appids(neighbors, appids), scores, digests, self.base_size), stats
+
+
+def _collect(games_data: Iterable[dict]) -> Tuple[np.ndarray, List[List[str]]]:
+    appids, features, seen = [], [], set()
+    for game_data in games_data:
+        appid = game_data.get('steam_appid') or game_data.get('app_id')
+        if appid is None or int(appid) in seen:
+            continue
+        seen.add(int(appid))
+        appids.append(int(appid))
+        features.append(game_features(game_data))
+    return np.array(appids, dtype=np.int64), features
+
+
+def _lookup(appids: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    values の各appidの appids 内での位置（無ければ -1）
+    """
+    if not len(appids):
+        return np.full(len(values), -1, dtype=np.int64)
+    order = np.argsort(appids)
+    position = np.minimum(np.searchsorted(appids, values, sorter=order), len(appids) - 1)
+    return np.where(appids[order[position]] == values, order[position], -1)
+
+
+def _to_appids(neighbors: np.ndarray, appids: np.ndarray) -> np.ndarray:
+    return np.where(neighbors >= 0, appids[np.maximum(neighbors, 0)], -1)
+
+
+def update_index(games_data: Iterable[dict], path: str = DEFAULT_INDEX_FILE,
+                 k: int = DEFAULT_NEIGHBORS) -> Tuple[SimilarityIndex, Dict[str, int]]:
+    """
+    保存済みの索引があれば差分更新し、無ければ（または k が違えば）全体を構築して保存する
+    """
+    games_data = list(games_data)
+    index = None
+    if os.path.exists(path):
+        index = SimilarityIndex.load(path)
+        if index.k != k:
+            index = None
+    if index is None:
+        index = SimilarityIndex.build(games_data, k)
+        stats = {'games': len(index), 'changed': len(index), 'removed': 0, 'rebuilt': 1}
+    else:
+        index, stats = index.update(games_data)
+    index.save(path)
+    return index, stats
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python similarity.py <games.json> [index.npz] [k]")
+        return
+
+    input_file = sys.argv[1]
+    index_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_INDEX_FILE
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_NEIGHBORS
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            games_data = json.load(f)
+
+        start = time.time()
+        index, stats = update_index(games_data, index_file, k)
+        mode = "全体を構築" if stats['rebuilt'] else f"{stats['changed']}件を更新、{stats['removed']}件を削除"
+        print(f"{len(index)}ゲームの類似索引を{mode}しました。（{time.time() - start:.1f}秒）")
+        if stats['rebuilt'] and len(index) > EXACT_LIMIT:
+            # 近似探索で作った場合は、標本で全件比較との一致率を確かめる
+            _, features = _collect(games_data)
+            matrix = FeatureMatrix(features)
+            neighbors = np.where(index.neighbors >= 0, _lookup(index.appids, index.neighbors.ravel()).reshape(index.neighbors.shape), -1)
+            print(f"  再現率@{index.k}（{RECALL_SAMPLE}ゲームの標本）: {matrix.recall(neighbors, index.scores):.3f}")
+
+        titles = {int(g.get('steam_appid') or g.get('app_id') or 0): g.get('title', '') for g in games_data}
+        for game_data in games_data[:5]:
+            appid = int(game_data.get('steam_appid') or game_data.get('app_id'))
+            similar = ", ".join(f"{titles.get(other, other)} ({score:.2f})" for other, score in index.similar(appid, 3))
+            print(f"  {game_data.get('title', appid)}: {similar}")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
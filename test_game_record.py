@@ -0,0 +1,62 @@
+import io
+import json
+
+from catalog_generator import generate_games
+from game_record import Columns, GameRecord, dump_records
+
+
+def _round_trip(game_data: dict) -> dict:
+    return GameRecord.from_dict(game_data).to_dict()
+
+
+def test_generated_games_round_trip():
+    games_data = generate_games(200, enriched=True, reviews=5)
+    for game_data in games_data:
+        restored = _round_trip(game_data)
+        assert restored == game_data
+        # キーの順序も同じ
+        assert json.dumps(restored, ensure_ascii=False) == json.dumps(game_data, ensure_ascii=False)
+
+
+def test_empty_and_nested_containers_round_trip():
+    game_data = {
+        'steam_appid': 10,
+        'title': 'Empty',
+        'genres': [],
+        'price': {},
+        'platforms': {'windows': True, 'mac': False},
+        'review_stats': {},
+        'detailed_reviews': [
+            {'author': {}, 'x': 1, 'tags': []},
+            {'author': {}, 'x': 2, 'tags': ['a']},
+        ],
+        'achievements': {'total_achievements': 0, 'achievements_list': []},
+        'extra': {'nested': {'list': [{}, [], {'a': []}]}},
+        'empty_list': [],
+        'empty_dict': {},
+    }
+    assert _round_trip(game_data) == game_data
+
+
+def test_columns_keep_empty_and_mixed_nested_dicts():
+    cases = [
+        [{'author': {}, 'x': 1}],
+        [{'author': {}, 'x': 1}, {'author': {'steamid': '1'}, 'x': 2}],
+        [{'author': {'steamid': '76561198000000000', 'games': 5}, 'voted_up': True}] * 3,
+        [{'author': {'steamid': '007'}, 'score': 0.5}, {'author': {'steamid': '²'}, 'score': 1.5}],
+        [{'a': {'b': {}}}, {'a': {'b': {'c': 1}}}],
+    ]
+    for records in cases:
+        columns = Columns.from_records(records)
+        restored = records if columns is None else columns.to_records()
+        assert restored == records
+
+
+def test_dump_records_matches_json_dump():
+    games_data = generate_games(20, enriched=True, reviews=3)
+    games_data[0]['detailed_reviews'] = [{'author': {}, 'x': 1}]
+    expected = io.StringIO()
+    json.dump(games_data, expected, ensure_ascii=False, indent=2)
+    actual = io.StringIO()
+    dump_records([GameRecord.from_dict(game_data) for game_data in games_data], actual)
+    assert actual.getvalue() == expected.getvalue()
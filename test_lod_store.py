@@ -0,0 +1,22 @@
+from rdflib import Literal, URIRef
+
+from lod_store import open_game_graph
+
+EX = 'https://example.com/games/'
+
+
+def test_rollback_does_not_reuse_cached_terms(tmp_path):
+    # 取り消した項のidは SQLite が再利用するので、キャッシュに古い項が残っていてはいけない
+    graph = open_game_graph(str(tmp_path / 'games.sqlite'))
+    try:
+        graph.commit()
+        b, p = URIRef(EX + 'b'), URIRef(EX + 'p')
+        graph.add((b, p, Literal('TEMP')))
+        assert list(graph.triples((b, p, None))) == [(b, p, Literal('TEMP'))]
+        graph.rollback()
+
+        c, q = URIRef(EX + 'c'), URIRef(EX + 'q')
+        graph.add((c, q, Literal('NEW')))
+        assert list(graph.triples((None, None, None))) == [(c, q, Literal('NEW'))]
+    finally:
+        graph.close()
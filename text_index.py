@@ -0,0 +1,256 @@
+import hashlib
+import html
+import json
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from side_store import REFERENCE_KEY, SideStore, detailed_reviews, open_store
+
+DEFAULT_INDEX_FILE = 'text_index.sqlite'
+
+# 検索対象の項目と、BM25のスコアに掛ける重み
+FIELDS = ('title', 'description', 'detailed_description', 'reviews')
+FIELD_WEIGHTS = (4.0, 2.0, 1.0, 0.5)
+
+# 日本語（かな・漢字）の連続部分は文字2-gram、それ以外は単語で区切る。
+# 中黒（・）は区切りとして扱うため含めない
+_CJK = '々ぁ-ゖゝ-ゟァ-ヺー-ヿ㐀-䶿一-鿿豈-﫿'
+_TOKEN_PATTERN = re.compile(f'([{_CJK}]+)|([^\\W_{_CJK}]+)')
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS game_text USING fts5(
+    {', '.join(FIELDS)},
+    tokenize = 'unicode61 remove_diacritics 0',
+    prefix = '1'
+);
+CREATE TABLE IF NOT EXISTS game_digest (
+    appid INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    テキストを検索用のトークン列に変換する
+
+    NFKCで正規化して小文字にしたうえで、かな・漢字の連続部分は重なりのある
+    文字2-gram（1文字だけならその文字）に、英数字などは単語に分ける。
+    2-gramは位置が連続するので、語句の一致はフレーズ検索で表せる。
+    """
+    if not text:
+        return []
+    tokens = []
+    for cjk, word in _TOKEN_PATTERN.findall(unicodedata.normalize('NFKC', text).lower()):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def strip_html(text: Optional[str]) -> str:
+    return html.unescape(_TAG_PATTERN.sub(' ', text or ''))
+
+
+def game_text(game_data: dict, store: Optional[SideStore] = None) -> Dict[str, str]:
+    """
+    ゲームの検索対象の項目ごとのテキスト（レビュー本文は外部ストアからも読み込む）
+    """
+    reviews = detailed_reviews(game_data, store)
+    return {
+        'title': game_data.get('title') or game_data.get('name') or '',
+        'description': game_data.get('short_description') or game_data.get('description') or '',
+        'detailed_description': strip_html(game_data.get('detailed_description')),
+        'reviews': '\n'.join(review.get('review_text') or '' for review in reviews),
+    }
+
+
+def parse_query(query: str, fields: Optional[Sequence[str]] = None) -> str:
+    """
+    検索語をFTS5の検索式に変換する
+
+    空白で区切った語はすべてを含むもの（AND）、"..." で囲んだ部分は語順どおりの
+    フレーズとして検索する。日本語の語は2-gramのフレーズになり、1文字だけの
+    語はその文字で始まるトークンの前方一致にする。
+    """
+    parts = []
+    for phrase, word in _QUERY_PATTERN.findall(query):
+        tokens = tokenize(phrase or word)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1 and _TOKEN_PATTERN.fullmatch(tokens[0]).group(1):
+            parts.append(f'"{tokens[0]}" *')
+        else:
+            parts.append('"' + ' '.join(tokens) + '"')
+    if not parts:
+        raise ValueError("検索語が空です")
+    expression = ' AND '.join(parts)
+    if fields:
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"不明な項目です: {', '.join(sorted(unknown))}")
+        expression = '{' + ' '.join(fields) + '} : (' + expression + ')'
+    return expression
+
+
+class TextIndex:
+    """
+    タイトル・説明文・詳細説明・レビュー本文の全文検索索引（SQLite FTS5）
+
+    トークン化は tokenize() で済ませ、FTS5には空白区切りのトークン列を渡す。
+    そのためFTS5の転置索引・位置情報・BM25をそのまま日本語にも使える。
+    ゲームごとにテキストのダイジェストを記録し、index_games() では
+    内容の変わったゲームだけを入れ替える。
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM game_digest").fetchone()[0]
+
+    def index_games(self, games_data: Iterable[dict], store_for=None, prune: bool = False) -> Dict[str, int]:
+        """
+        ゲームを索引に追加・更新する
+
+        store_for はゲームを受け取って外部ストアを返す関数（レビュー本文を分割保存している場合）。
+        prune=True のときは、渡したゲームに含まれないゲームを索引から削除する。
+        """
+        digests = dict(self.conn.execute("SELECT appid, digest FROM game_digest"))
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+        seen = set()
+        with self.conn:
+            for game_data in games_data:
+                appid = game_data.get('steam_appid') or game_data.get('app_id')
+                # appid の無いゲームは検索結果から引けないので索引に入れない
+                if appid is None:
+                    continue
+                appid = int(appid)
+                seen.add(appid)
+                store = store_for(game_data) if store_for is not None else None
+                texts = game_text(game_data, store)
+                digest = hashlib.sha1(json.dumps(texts, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+                previous = digests.get(appid)
+                if previous == digest:
+                    stats['unchanged'] += 1
+                    continue
+                if previous is not None:
+                    self.conn.execute("DELETE FROM game_text WHERE rowid = ?", (appid,))
+                self.conn.execute(
+                    f"INSERT INTO game_text (rowid, {', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                    [appid] + [' '.join(tokenize(texts[field])) for field in FIELDS]
+                )
+                self.conn.execute("INSERT OR REPLACE INTO game_digest (appid, digest) VALUES (?, ?)", (appid, digest))
+                digests[appid] = digest
+                stats['updated' if previous is not None else 'added'] += 1
+
+            if prune:
+                removed = [(appid,) for appid in digests if appid not in seen]
+                self.conn.executemany("DELETE FROM game_text WHERE rowid = ?", removed)
+                self.conn.executemany("DELETE FROM game_digest WHERE appid = ?", removed)
+                stats['removed'] = len(removed)
+        return stats
+
+    def optimize(self) -> None:
+        """
+        FTS5の索引セグメントを1つにまとめる（大量に追加した後の検索を速くする）
+        """
+        with self.conn:
+            self.conn.execute("INSERT INTO game_text (game_text) VALUES ('optimize')")
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               fields: Optional[Sequence[str]] = None) -> List[Tuple[int, float]]:
+        """
+        BM25のスコアが高い順に (appid, スコア) を返す
+        """
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+        rows = self.conn.execute(
+            f"SELECT rowid, bm25(game_text, {weights}) AS score FROM game_text "
+            "WHERE game_text MATCH ? ORDER BY score LIMIT ? OFFSET ?",
+            (parse_query(query, fields), limit, offset)
+        )
+        # FTS5のbm25()は小さいほど良い値を返すので符号を反転する
+        return [(appid, -score) for appid, score in rows]
+
+    def count(self, query: str, fields: Optional[Sequence[str]] = None) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM game_text WHERE game_text MATCH ?", (parse_query(query, fields),)
+        ).fetchone()[0]
+
+
+def index_file(json_file: str, index_path: str = DEFAULT_INDEX_FILE) -> Dict[str, int]:
+    """
+    ゲームJSON（side_store で分割したものも可）の内容で索引を更新する
+    """
+    with open(json_file, 'r', encoding='utf-8') as f:
+        games_data = json.load(f)
+
+    stores: Dict[str, SideStore] = {}
+
+    def store_for(game_data: dict) -> Optional[SideStore]:
+        reference = game_data.get(REFERENCE_KEY)
+        if not reference:
+            return None
+        if reference['path'] not in stores:
+            stores[reference['path']] = open_store(json_file, game_data)
+        return stores[reference['path']]
+
+    try:
+        with TextIndex(index_path) as index:
+            stats = index.index_games(games_data, store_for, prune=True)
+            if stats['added'] + stats['updated'] + stats['removed']:
+                index.optimize()
+            return stats
+    finally:
+        for store in stores.values():
+            store.close()
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('build', 'search'):
+        print("Usage: python text_index.py build <games.json> [index.sqlite]")
+        print("       python text_index.py search <query> [index.sqlite]")
+        return
+
+    command, argument = sys.argv[1:3]
+    index_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_INDEX_FILE
+    try:
+        start = time.time()
+        if command == 'build':
+            stats = index_file(argument, index_path)
+            print(f"索引を更新しました: {stats}（{time.time() - start:.1f}秒）")
+            return
+
+        with TextIndex(index_path) as index:
+            results = index.search(argument)
+            total = index.count(argument)
+        print(f"{total}件（{(time.time() - start) * 1000:.1f}ms）")
+        for appid, score in results:
+            print(f"  {appid}: {score:.3f}")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import json
+import os
+import struct
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from normalize import normalize_game
+
+MAGIC = b'LODTS\x00\x00\x01'
+# マジック, 系列数, 点の数, 時刻の差分の型, 値の差分の型
+_HEADER = struct.Struct('<8sQQ4s4s')
+
+# 追記ログの1レコード
+LOG_DTYPE = np.dtype([('appid', '<u4'), ('timestamp', '<i8'), ('value', '<i8')])
+
+METRICS = ('price', 'discount_percent', 'review_count', 'positive_reviews', 'player_count')
+# 価格は最小単位（1/100）の整数で保存する
+PRICE_SCALE = 100
+
+# 追記ログがこの件数を超えたら読み込み時に圧縮ファイルへまとめる
+COMPACT_THRESHOLD = 1_000_000
+
+
+class SeriesColumns(NamedTuple):
+    """
+    1指標分の全系列（appid昇順、系列内は時刻順）
+
+    appid appids[i] の点は offsets[i]:offsets[i + 1] の範囲にある。
+    """
+    appids: np.ndarray
+    offsets: np.ndarray
+    timestamps: np.ndarray
+    values: np.ndarray
+
+
+def _empty_columns() -> SeriesColumns:
+    return SeriesColumns(np.zeros(0, dtype=np.uint32), np.zeros(1, dtype=np.int64),
+                         np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+
+def _narrow(deltas: np.ndarray) -> np.ndarray:
+    """
+    差分が収まる最小の整数型に変換する
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if deltas.size == 0 or (deltas.min() >= info.min and deltas.max() <= info.max):
+            return deltas.astype(dtype)
+    return deltas.astype(np.int64)
+
+
+def _encode(column: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    系列ごとの先頭値と、直前の点との差分（系列の先頭は0）に分ける
+    """
+    deltas = np.zeros(len(column), dtype=np.int64)
+    deltas[1:] = column[1:] - column[:-1]
+    deltas[starts] = 0
+    return column[starts], _narrow(deltas)
+
+
+def _decode(firsts: np.ndarray, deltas: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    total = np.cumsum(deltas, dtype=np.int64)
+    starts = offsets[:-1]
+    return total - np.repeat(total[starts] - firsts, np.diff(offsets))
+
+
+def _group(appids: np.ndarray, timestamps: np.ndarray, values: np.ndarray) -> SeriesColumns:
+    """
+    点の列を (appid, 時刻) 順に並べ、同じ時刻の重複は後のものを残して系列にまとめる
+    """
+    order = np.lexsort((timestamps, appids))
+    appids, timestamps, values = appids[order], timestamps[order], values[order]
+    if len(appids):
+        keep = np.ones(len(appids), dtype=bool)
+        keep[:-1] = (appids[:-1] != appids[1:]) | (timestamps[:-1] != timestamps[1:])
+        appids, timestamps, values = appids[keep], timestamps[keep], values[keep]
+
+    unique, starts = np.unique(appids, return_index=True)
+    offsets = np.append(starts, len(appids)).astype(np.int64)
+    return SeriesColumns(unique.astype(np.uint32), offsets, timestamps, values)
+
+
+class TimeSeriesStore:
+    """
+    appidと指標ごとのスナップショットを蓄積する追記型の時系列ストア
+
+    指標ごとに2つのファイルを持つ。
+      <metric>.log  クロールのたびに (appid, 時刻, 値) の固定長レコードを追記する
+      <metric>.ts   系列ごとに先頭値と差分（最小の整数型）で保存した圧縮ファイル
+    読み込み時に両者を結合し、NumPy配列として範囲検索や間引きを行う。
+    """
+
+    def __init__(self, directory: str = 'history', compact_threshold: int = COMPACT_THRESHOLD):
+        self.directory = directory
+        self.compact_threshold = compact_threshold
+        self._columns: Dict[str, SeriesColumns] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, metric: str, ext: str) -> str:
+        if metric not in METRICS:
+            raise ValueError(f"未知の指標です: {metric}")
+        return os.path.join(self.directory, f"{metric}.{ext}")
+
+    # 書き込み
+
+    def append(self, metric: str, points: Iterable[Tuple[int, int]], timestamp: Optional[int] = None) -> int:
+        """
+        同じ時刻の (appid, 値) の組をまとめて追記する
+        """
+        timestamp = int(time.time()) if timestamp is None else int(timestamp)
+        return self.append_records(metric, ((appid, timestamp, value) for appid, value in points))
+
+    def append_records(self, metric: str, records: Iterable[Tuple[int, int, int]]) -> int:
+        """
+        時刻がそれぞれ異なる (appid, 時刻, 値) の組をまとめて追記する
+        """
+        records = np.array(list(records), dtype=LOG_DTYPE)
+        if len(records):
+            with open(self._path(metric, 'log'), 'ab') as f:
+                records.tofile(f)
+            self._columns.pop(metric, None)
+        return len(records)
+
+    def record_games(self, games_data: Iterable[dict], timestamp: Optional[int] = None) -> Dict[str, int]:
+        """
+        ゲームデータから価格・割引率・レビュー数・同時接続数を取り出して追記する
+        """
+        points: Dict[str, List[Tuple[int, int]]] = {metric: [] for metric in METRICS}
+        for game_data in games_data:
+            appid = int(game_data.get('steam_appid') or game_data.get('app_id'))
+            for metric, value in snapshot_values(game_data).items():
+                points[metric].append((appid, value))
+        return {metric: self.append(metric, values, timestamp) for metric, values in points.items()}
+
+    def compact(self, metric: Optional[str] = None) -> None:
+        """
+        追記ログを圧縮ファイルにまとめ、ログを空にする
+        """
+        for name in ([metric] if metric else METRICS):
+            log_path = self._path(name, 'log')
+            if not os.path.exists(log_path) or os.path.getsize(log_path) == 0:
+                continue
+            columns = self._load(name)
+            self._write(name, columns)
+            # 置き換え後にログを消す（途中で止まっても重複は読み込み時に除かれる）
+            os.remove(log_path)
+            self._columns[name] = columns
+
+    def _write(self, metric: str, columns: SeriesColumns) -> None:
+        starts = columns.offsets[:-1]
+        first_ts, ts_deltas = _encode(columns.timestamps, starts)
+        first_values, value_deltas = _encode(columns.values, starts)
+
+        path = self._path(metric, 'ts')
+        temp_file = path + '.tmp'
+        with open(temp_file, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(columns.appids), len(columns.timestamps),
+                                 ts_deltas.dtype.str.encode(), value_deltas.dtype.str.encode()))
+            for array in (columns.appids.astype('<u4'), columns.offsets.astype('<i8'),
+                          first_ts.astype('<i8'), first_values.astype('<i8'), ts_deltas, value_deltas):
+                f.write(array.tobytes())
+        os.replace(temp_file, path)
+
+    # 読み込み
+
+    def _read(self, metric: str) -> SeriesColumns:
+        try:
+            with open(self._path(metric, 'ts'), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return _empty_columns()
+
+        magic, series, points, ts_type, value_type = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"時系列ファイルの形式が正しくありません: {metric}")
+
+        position = _HEADER.size
+        arrays = []
+        for dtype, count in (('<u4', series), ('<i8', series + 1), ('<i8', series), ('<i8', series),
+                             (ts_type.rstrip(b'\0').decode(), points), (value_type.rstrip(b'\0').decode(), points)):
+            array = np.frombuffer(data, dtype=dtype, count=count, offset=position)
+            position += array.nbytes
+            arrays.append(array)
+        appids, offsets, first_ts, first_values, ts_deltas, value_deltas = arrays
+        return SeriesColumns(appids, offsets,
+                             _decode(first_ts, ts_deltas, offsets),
+                             _decode(first_values, value_deltas, offsets))
+
+    def _load(self, metric: str) -> SeriesColumns:
+        columns = self._read(metric)
+        log_path = self._path(metric, 'log')
+        try:
+            # 途中で切れた末尾のレコードは読み飛ばす
+            count = os.path.getsize(log_path) // LOG_DTYPE.itemsize
+        except OSError:
+            return columns
+        if not count:
+            return columns
+        log = np.fromfile(log_path, dtype=LOG_DTYPE, count=count)
+        return _group(
+            np.concatenate([np.repeat(columns.appids, np.diff(columns.offsets)), log['appid']]),
+            np.concatenate([columns.timestamps, log['timestamp']]),
+            np.concatenate([columns.values, log['value']]),
+        )
+
+    def columns(self, metric: str) -> SeriesColumns:
+        columns = self._columns.get(metric)
+        if columns is None:
+            log_path = self._path(metric, 'log')
+            if os.path.exists(log_path) and os.path.getsize(log_path) > self.compact_threshold * LOG_DTYPE.itemsize:
+                self.compact(metric)
+                columns = self._columns[metric]
+            else:
+                columns = self._columns[metric] = self._load(metric)
+        return columns
+
+    # 検索
+
+    def appids(self, metric: str) -> np.ndarray:
+        return self.columns(metric).appids
+
+    def range(self, appid: int, metric: str, start: Optional[int] = None,
+              end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        1系列の [start, end) の範囲の (時刻, 値) を返す
+        """
+        columns = self.columns(metric)
+        appid = int(appid)
+        row = np.searchsorted(columns.appids, appid)
+        if row >= len(columns.appids) or columns.appids[row] != appid:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        lo, hi = columns.offsets[row], columns.offsets[row + 1]
+        timestamps = columns.timestamps[lo:hi]
+        i = 0 if start is None else np.searchsorted(timestamps, start)
+        j = len(timestamps) if end is None else np.searchsorted(timestamps, end)
+        return timestamps[i:j], columns.values[lo:hi][i:j]
+
+    def downsample(self, appid: int, metric: str, interval: int, start: Optional[int] = None,
+                   end: Optional[int] = None, how: str = 'mean') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        1系列を interval 秒ごとの区間にまとめる（how: mean, min, max, first, last）
+        """
+        timestamps, values = self.range(appid, metric, start, end)
+        if not len(timestamps):
+            return timestamps, values.astype(np.float64)
+        buckets = timestamps // interval
+        unique, starts = np.unique(buckets, return_index=True)
+        if how == 'mean':
+            result = np.add.reduceat(values, starts) / np.diff(np.append(starts, len(values)))
+        elif how == 'min':
+            result = np.minimum.reduceat(values, starts)
+        elif how == 'max':
+            result = np.maximum.reduceat(values, starts)
+        elif how == 'first':
+            result = values[starts]
+        elif how == 'last':
+            result = values[np.append(starts[1:], len(values)) - 1]
+        else:
+            raise ValueError(f"未知の集計方法です: {how}")
+        return unique * interval, result.astype(np.float64)
+
+    def trend(self, metric: str, start: Optional[int] = None,
+              end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        全系列について [start, end) の範囲の最初と最後の値を返す (appids, 最初の値, 最後の値)
+        """
+        columns = self.columns(metric)
+        series = np.repeat(np.arange(len(columns.appids)), np.diff(columns.offsets))
+        mask = np.ones(len(series), dtype=bool)
+        if start is not None:
+            mask &= columns.timestamps >= start
+        if end is not None:
+            mask &= columns.timestamps < end
+        series, values = series[mask], columns.values[mask]
+
+        rows, first = np.unique(series, return_index=True)
+        last = np.append(first[1:], len(series))[:len(first)].astype(np.int64) - 1
+        return columns.appids[rows], values[first], values[last]
+
+
+def snapshot_values(game_data: dict) -> Dict[str, int]:
+    """
+    1ゲーム分のスナップショットから記録する指標の値を取り出す
+    """
+    values = {}
+    fields = normalize_game(game_data)
+    if fields.price is not None:
+        values['price'] = int(fields.price * PRICE_SCALE)
+        values['discount_percent'] = fields.discount_percent
+
+    stats = game_data.get('review_stats') or {}
+    if 'total_reviews' in stats:
+        values['review_count'] = int(stats['total_reviews'])
+    if 'positive_reviews' in stats:
+        values['positive_reviews'] = int(stats['positive_reviews'])
+
+    # en.py は playtime_stats、test.py は player_stats に同時接続数を保存する
+    for key in ('playtime_stats', 'player_stats'):
+        players = (game_data.get(key) or {}).get('current_players')
+        if players is not None:
+            values['player_count'] = int(players)
+            break
+    return values
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('record', 'show', 'compact'):
+        print("Usage: python timeseries.py record <games.json> [history_dir]")
+        print("       python timeseries.py show <appid> <metric> [history_dir]")
+        print("       python timeseries.py compact <history_dir>")
+        return
+
+    command = sys.argv[1]
+    try:
+        if command == 'record':
+            store = TimeSeriesStore(sys.argv[3] if len(sys.argv) > 3 else 'history')
+            with open(sys.argv[2], 'r', encoding='utf-8') as f:
+                games_data = json.load(f)
+            counts = store.record_games(games_data)
+            print("記録しました: " + ", ".join(f"{metric}={count}" for metric, count in counts.items()))
+        elif command == 'show':
+            store = TimeSeriesStore(sys.argv[4] if len(sys.argv) > 4 else 'history')
+            timestamps, values = store.range(int(sys.argv[2]), sys.argv[3])
+            for timestamp, value in zip(timestamps.tolist(), values.tolist()):
+                print(time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)), value)
+        else:
+            TimeSeriesStore(sys.argv[2]).compact()
+            print("圧縮しました。")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()
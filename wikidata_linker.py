@@ -0,0 +1,351 @@
+import bz2
+import gzip
+import json
+import re
+import sys
+import time
+import unicodedata
+from collections import deque
+from multiprocessing import Pool
+from typing import Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from lod_writer import EX, PREFIXES, LODStreamWriter, ResourceDictionary, Triple, uri
+from normalize import normalize_game
+
+OWL = "http://www.w3.org/2002/07/owl#"
+WIKIDATA = "http://www.wikidata.org/entity/"
+
+# P31（インスタンスの元）の値でエンティティの種類を判定する
+GAME_CLASSES = {'Q7889', 'Q4393107', 'Q21125433'}
+SERIES_CLASSES = {'Q7058673', 'Q196600'}
+COMPANY_CLASSES = {'Q210167', 'Q1137109', 'Q4830453', 'Q783794', 'Q6881511', 'Q891723', 'Q1589009'}
+
+# 名前として照合するラベル・別名の言語
+LABEL_LANGUAGES = ('ja', 'en', 'mul')
+
+# 1回にワーカーへ渡す行数と、先読みするチャンク数（ワーカー数に掛ける）
+CHUNK_LINES = 2000
+PREFETCH_PER_WORKER = 2
+
+_COMPANY_SUFFIX = re.compile(
+    r'(株式会社|有限会社|合同会社|\b(inc|ltd|llc|co|corp|corporation|company|limited|gmbh|srl|sarl|kk|oy|ab|s\.?a)\b\.?)'
+)
+_SERIES_MARKERS = re.compile(r'フランチャイズ|シリーズ|franchise|series|[:：]', re.IGNORECASE)
+# NFKCでは ™ が "TM" になるため、正規化の前に取り除く
+_MARKS = re.compile('[™®©℠]')
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_name(text: Optional[str], company: bool = False) -> str:
+    """
+    照合用に名前を正規化する（NFKC・小文字化・記号と空白の除去。company=True なら法人格も除く）
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', _MARKS.sub('', text)).casefold()
+    if company:
+        text = _COMPANY_SUFFIX.sub(' ', text)
+    return _NON_WORD.sub('', text)
+
+
+def series_keys(series_name: Optional[str]) -> Set[str]:
+    """
+    franchise_notice の文字列から照合キーを作る（「〜フランチャイズ」などの定型部分を除いた候補も含める）
+    """
+    keys = {normalize_name(series_name)}
+    keys.update(normalize_name(part) for part in _SERIES_MARKERS.split(series_name or ''))
+    keys.discard('')
+    return keys
+
+
+class Candidate(NamedTuple):
+    """
+    ダンプ中でブロッキング索引に当たったエンティティ
+    """
+    qid: str
+    classes: Tuple[str, ...]
+    steam_appids: Tuple[str, ...]
+    names: Tuple[str, ...]
+    company_names: Tuple[str, ...]
+    years: Tuple[int, ...]
+    # 開発元・販売元・シリーズとして参照しているエンティティ
+    organizations: Tuple[str, ...]
+    series: Tuple[str, ...]
+
+
+class BlockingIndex(NamedTuple):
+    """
+    カタログ側の照合キー（ダンプの各エンティティはこれに当たるかだけを調べる）
+    """
+    appids: Set[str]
+    titles: Dict[str, List[str]]
+    organizations: Dict[str, List[str]]
+    series: Dict[str, List[str]]
+    # タイトルとシリーズ名のキーをまとめたもの
+    names: Set[str]
+
+
+def build_blocking_index(games_data: Iterable[dict]) -> BlockingIndex:
+    appids, titles, organizations, series = set(), {}, {}, {}
+    for game_data in games_data:
+        appid = str(game_data.get('steam_appid') or game_data.get('app_id'))
+        appids.add(appid)
+        key = normalize_name(game_data.get('title') or game_data.get('name'))
+        if key:
+            titles.setdefault(key, []).append(appid)
+        for name in (game_data.get('developer') or []) + (game_data.get('publisher') or []):
+            key = normalize_name(name, company=True)
+            if key and name not in organizations.setdefault(key, []):
+                organizations[key].append(name)
+        info = game_data.get('series_info') or {}
+        if info.get('is_series') and info.get('series_name'):
+            for key in series_keys(info['series_name']):
+                if info['series_name'] not in series.setdefault(key, []):
+                    series[key].append(info['series_name'])
+    return BlockingIndex(appids, titles, organizations, series, titles.keys() | series.keys())
+
+
+def open_dump(path: str) -> IO[str]:
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def _claim_values(entity: dict, prop: str) -> Iterator:
+    for statement in entity.get('claims', {}).get(prop, []):
+        datavalue = statement.get('mainsnak', {}).get('datavalue')
+        if datavalue is not None:
+            yield datavalue.get('value')
+
+
+def _item_ids(entity: dict, prop: str) -> Tuple[str, ...]:
+    return tuple(value['id'] for value in _claim_values(entity, prop) if isinstance(value, dict) and 'id' in value)
+
+
+def _labels(entity: dict) -> Set[str]:
+    labels = set()
+    for language in LABEL_LANGUAGES:
+        label = entity.get('labels', {}).get(language)
+        if label:
+            labels.add(label['value'])
+        labels.update(alias['value'] for alias in entity.get('aliases', {}).get(language, []))
+    return labels
+
+
+def match_entity(entity: dict, blocks: BlockingIndex) -> Optional[Candidate]:
+    """
+    エンティティがSteam appid・タイトル・開発元名・シリーズ名のいずれかのキーに当たれば候補として返す
+    """
+    steam_appids = tuple(value for value in _claim_values(entity, 'P1733')
+                         if isinstance(value, str) and value in blocks.appids)
+    labels = _labels(entity)
+    names = tuple({normalize_name(label) for label in labels} & blocks.names)
+    company_names = tuple({normalize_name(label, company=True) for label in labels} & blocks.organizations.keys())
+    if not steam_appids and not names and not company_names:
+        return None
+
+    years = []
+    for value in _claim_values(entity, 'P577'):
+        try:
+            years.append(int(value['time'][1:5]))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return Candidate(
+        qid=entity['id'],
+        classes=_item_ids(entity, 'P31'),
+        steam_appids=steam_appids,
+        names=names,
+        company_names=company_names,
+        years=tuple(years),
+        organizations=_item_ids(entity, 'P178') + _item_ids(entity, 'P123'),
+        series=_item_ids(entity, 'P179') + _item_ids(entity, 'P8345'),
+    )
+
+
+_blocks: Optional[BlockingIndex] = None
+
+
+def _init_worker(blocks: BlockingIndex) -> None:
+    global _blocks
+    _blocks = blocks
+
+
+def _scan_lines(lines: List[str]) -> List[Candidate]:
+    """
+    ダンプの行（1行1エンティティ、末尾のカンマ付き）から候補を取り出す
+    """
+    candidates = []
+    for line in lines:
+        line = line.strip().rstrip(',')
+        if not line.startswith('{'):
+            continue
+        entity = json.loads(line)
+        candidate = match_entity(entity, _blocks)
+        if candidate is not None:
+            candidates.append(candidate)
+    return candidates
+
+
+def _chunks(fp: IO[str]) -> Iterator[List[str]]:
+    chunk = []
+    for line in fp:
+        chunk.append(line)
+        if len(chunk) >= CHUNK_LINES:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def scan_dump(path: str, blocks: BlockingIndex, workers: int = 1) -> Iterator[Candidate]:
+    """
+    ダンプを1回だけ読み、候補のエンティティを順に返す
+
+    読み込みはチャンク単位で、ワーカーに渡しているチャンクは一定数までに抑えるため、
+    ダンプの大きさに関係なくメモリ使用量は一定になる。
+    """
+    with open_dump(path) as fp:
+        if workers <= 1:
+            _init_worker(blocks)
+            for chunk in _chunks(fp):
+                yield from _scan_lines(chunk)
+            return
+
+        with Pool(processes=workers, initializer=_init_worker, initargs=(blocks,)) as pool:
+            pending = deque()
+            for chunk in _chunks(fp):
+                pending.append(pool.apply_async(_scan_lines, (chunk,)))
+                if len(pending) >= workers * PREFETCH_PER_WORKER:
+                    yield from pending.popleft().get()
+            while pending:
+                yield from pending.popleft().get()
+
+
+def _choose(candidates: List[Candidate], referenced: Set[str], classes: Set[str]) -> Optional[str]:
+    """
+    同じ名前の候補から1つを選ぶ（リンク済みのゲームから参照されているもの、次に種類の合うものが1つだけなら採用）
+    """
+    for accept in (lambda c: c.qid in referenced, lambda c: classes.intersection(c.classes)):
+        chosen = {c.qid for c in candidates if accept(c)}
+        if len(chosen) == 1:
+            return chosen.pop()
+        if chosen:
+            return None
+    return None
+
+
+def link_entities(games_data: List[dict], candidates: Iterable[Candidate],
+                  blocks: Optional[BlockingIndex] = None) -> Dict[str, Dict[str, str]]:
+    """
+    候補からゲーム・開発元（販売元）・シリーズのリンク先を決める
+
+    ゲームは P1733（Steam appid）が一致すればそれを採用し、無ければタイトルが一致する
+    ゲームのうち発売年が一致するもの（年が分からなければ候補が1つだけのもの）を採用する。
+    開発元とシリーズは、リンクしたゲームから P178/P123・P179/P8345 で参照されている候補を優先する。
+    """
+    blocks = blocks or build_blocking_index(games_data)
+    years = {}
+    for game_data in games_data:
+        release_date = normalize_game(game_data).release_date
+        if release_date:
+            years[str(game_data.get('steam_appid') or game_data.get('app_id'))] = int(release_date[:4])
+
+    by_appid: Dict[str, List[str]] = {}
+    by_title: Dict[str, List[Candidate]] = {}
+    by_company: Dict[str, List[Candidate]] = {}
+    by_series: Dict[str, List[Candidate]] = {}
+    references: Dict[str, Candidate] = {}
+    for candidate in candidates:
+        references[candidate.qid] = candidate
+        for appid in candidate.steam_appids:
+            by_appid.setdefault(appid, []).append(candidate.qid)
+        for name in candidate.names:
+            if name in blocks.titles:
+                by_title.setdefault(name, []).append(candidate)
+            if name in blocks.series:
+                by_series.setdefault(name, []).append(candidate)
+        for name in candidate.company_names:
+            by_company.setdefault(name, []).append(candidate)
+
+    games: Dict[str, str] = {}
+    for appid, qids in by_appid.items():
+        games[appid] = min(qids, key=lambda qid: int(qid[1:]))
+    for key, appids in blocks.titles.items():
+        for appid in appids:
+            if appid in games:
+                continue
+            found = [c for c in by_title.get(key, []) if GAME_CLASSES.intersection(c.classes) or c.steam_appids]
+            if appid in years:
+                dated = [c for c in found if years[appid] in c.years]
+                found = dated if dated else [c for c in found if not c.years]
+            if len({c.qid for c in found}) == 1:
+                games[appid] = found[0].qid
+
+    linked = [references[qid] for qid in set(games.values()) if qid in references]
+    referenced_organizations = {qid for c in linked for qid in c.organizations}
+    referenced_series = {qid for c in linked for qid in c.series}
+
+    organizations: Dict[str, str] = {}
+    for key, names in blocks.organizations.items():
+        qid = _choose(by_company.get(key, []), referenced_organizations, COMPANY_CLASSES)
+        if qid:
+            for name in names:
+                organizations[name] = qid
+
+    series: Dict[str, str] = {}
+    for key, names in blocks.series.items():
+        qid = _choose(by_series.get(key, []), referenced_series, SERIES_CLASSES)
+        if qid:
+            for name in names:
+                series.setdefault(name, qid)
+
+    return {'games': games, 'organizations': organizations, 'series': series}
+
+
+def iter_link_triples(links: Dict[str, Dict[str, str]]) -> Iterator[Triple]:
+    """
+    リンクを owl:sameAs のトリプルにする（開発元・シリーズはLOD出力と同じ共有リソースのIRIを使う）
+    """
+    same_as = uri(OWL + 'sameAs')
+    resources = ResourceDictionary()
+    for appid, qid in sorted(links['games'].items()):
+        yield (uri(EX + appid), same_as, uri(WIKIDATA + qid))
+    for name, qid in sorted(links['organizations'].items()):
+        yield (resources.intern('organization', name), same_as, uri(WIKIDATA + qid))
+    for name, qid in sorted(links['series'].items()):
+        yield (resources.intern('series', name), same_as, uri(WIKIDATA + qid))
+
+
+def link_dump(games_data: List[dict], dump_path: str, output_file: str, workers: int = 1) -> Dict[str, int]:
+    blocks = build_blocking_index(games_data)
+    links = link_entities(games_data, scan_dump(dump_path, blocks, workers), blocks)
+    prefixes = dict(PREFIXES, owl=OWL, wd=WIKIDATA)
+    format = 'nt' if output_file.endswith('.nt') else 'turtle'
+    with LODStreamWriter(output_file, format=format, prefixes=prefixes) as writer:
+        writer.write_triples(iter_link_triples(links))
+    return {kind: len(values) for kind, values in links.items()}
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python wikidata_linker.py <games.json> <wikidata-dump.json[.gz|.bz2]> [output.ttl] [workers]")
+        return
+
+    input_file, dump_path = sys.argv[1:3]
+    output_file = sys.argv[3] if len(sys.argv) > 3 else 'wikidata_links.ttl'
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            games_data = json.load(f)
+
+        start = time.time()
+        counts = link_dump(games_data, dump_path, output_file, workers)
+        print(f"ゲーム {counts['games']}件、開発元・販売元 {counts['organizations']}件、"
+              f"シリーズ {counts['series']}件をリンクしました。（{time.time() - start:.1f}秒）")
+    except Exception as e:
+        print(f"エラーが発生しました: {e}")
+
+if __name__ == "__main__":
+    main()